@@ -34,10 +34,16 @@ def create_app(config_class=DevelopmentConfig):
     
     # 初始化数据库迁移（需要在db.init_app之后）
     migrate.init_app(app, db)
-    socketio.init_app(app, async_mode='eventlet')
+    # 配置了消息队列时，房间广播经由队列转发到所有工作进程
+    from .utils.socket_queue import socketio_options
+    socketio.init_app(app, async_mode='eventlet', **socketio_options(app.config))
+    
+    # 签名下载链接在进入Flask路由前直接处理
+    from .utils.signed_url import SignedFileMiddleware
+    app.wsgi_app = SignedFileMiddleware(app.wsgi_app, app)
     
     # 注册蓝图
-    from .routes import auth, courses, assignments, groups, ai, ws, projects, tasks, writing, dashboard
+    from .routes import auth, courses, assignments, groups, ai, ws, projects, tasks, writing, dashboard, admin, uploads
     app.register_blueprint(auth.bp, url_prefix='/api/auth')
     app.register_blueprint(courses.bp, url_prefix='/api/courses')
     app.register_blueprint(assignments.bp, url_prefix='/api/assignments')
@@ -48,10 +54,31 @@ def create_app(config_class=DevelopmentConfig):
     app.register_blueprint(tasks.bp, url_prefix='/api')
     app.register_blueprint(writing.bp, url_prefix='/api/writing')
     app.register_blueprint(dashboard.bp, url_prefix='/api/dashboard')
+    app.register_blueprint(admin.bp, url_prefix='/api/admin')
+    app.register_blueprint(uploads.bp, url_prefix='/api/uploads')
     
     # 注册SocketIO事件
     ws.register_socketio_events(socketio)
     
+    # 聊天消息由后台线程批量写入，进程退出时写完缓冲
+    from .utils import chat_writer
+    chat_writer.init_app(app)
+    
+    # 注册文件记录删除事件，物理文件由后台任务回收
+    from .utils import file_gc, storage_quota
+    file_gc.register_events()
+    # 注册存储用量计数事件
+    storage_quota.register_events()
+    # 注册在线编辑对象删除事件，清理修订记录
+    from .utils import content_edit
+    content_edit.register_events()
+    # 注册小组成员变更事件，使成员关系缓存失效
+    from .utils import membership_cache
+    membership_cache.register_events()
+    # 注册消息提醒事件，维护未读计数并在提交后推送
+    from .utils import notification_push
+    notification_push.register_events()
+    
     with app.app_context():
         db.create_all()
         # 确保上传目录存在
@@ -60,6 +87,11 @@ def create_app(config_class=DevelopmentConfig):
         if upload_folder and not os.path.exists(upload_folder):
             os.makedirs(upload_folder, exist_ok=True)
     
+    # 启动后台定时任务（清理过期上传会话等）
+    if app.config.get('SCHEDULER_ENABLED'):
+        from .utils.scheduler import start_scheduler
+        start_scheduler(app)
+    
     return app
 
 
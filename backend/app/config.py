@@ -47,6 +47,93 @@ class Config:
     # 文件上传配置
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
     UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), '../uploads')
+    
+    # 文件下载配置
+    # SENDFILE_MODE: 为空时由Flask传输；x-sendfile 或 x-accel 时交给前端代理传输文件
+    SENDFILE_MODE = os.getenv('SENDFILE_MODE') or None
+    X_ACCEL_REDIRECT_PREFIX = os.getenv('X_ACCEL_REDIRECT_PREFIX', '/protected-uploads/')
+    
+    # 签名下载链接配置
+    SIGNED_URL_SECRET = os.getenv('SIGNED_URL_SECRET', SECRET_KEY)
+    SIGNED_URL_TTL = int(os.getenv('SIGNED_URL_TTL', 300))  # 5分钟
+    SIGNED_URL_PREFIX = os.getenv('SIGNED_URL_PREFIX', '/files/signed')
+    
+    # 分片上传配置（单个分片请求受MAX_CONTENT_LENGTH限制）
+    UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', 4 * 1024 * 1024))  # 默认分片大小4MB
+    UPLOAD_MAX_FILE_SIZE = int(os.getenv('UPLOAD_MAX_FILE_SIZE', 2 * 1024 * 1024 * 1024))  # 分片上传文件上限2GB
+    UPLOAD_SESSION_TTL = int(os.getenv('UPLOAD_SESSION_TTL', 24 * 3600))  # 上传会话无活动多久后过期（秒）
+    UPLOAD_SESSION_CLEANUP_INTERVAL = 600  # 过期会话清理间隔（秒）
+    
+    # 后台定时任务开关
+    SCHEDULER_ENABLED = os.getenv('SCHEDULER_ENABLED', 'true').lower() == 'true'
+    
+    # 存储配额配置（0表示不限）
+    STORAGE_QUOTA_USER_BYTES = int(os.getenv('STORAGE_QUOTA_USER_BYTES', 1024 * 1024 * 1024))  # 每个用户1GB
+    STORAGE_QUOTA_GROUP_BYTES = int(os.getenv('STORAGE_QUOTA_GROUP_BYTES', 5 * 1024 * 1024 * 1024))  # 每个小组5GB
+    STORAGE_USAGE_RECOMPUTE_INTERVAL = 6 * 3600  # 重新汇总用量、修正计数偏差的间隔（秒）
+    
+    # 物理文件回收配置
+    FILE_GC_INTERVAL = 60  # 删除待删除文件的间隔（秒）
+    FILE_GC_BATCH_SIZE = 100  # 每次最多删除的文件数
+    FILE_GC_GRACE_PERIOD = 3600  # 内容块无引用多久后删除；对账时跳过在此时间内修改过的文件（秒）
+    FILE_RECONCILE_INTERVAL = int(os.getenv('FILE_RECONCILE_INTERVAL', 24 * 3600))  # 孤立文件对账间隔（秒）
+    FILE_RECONCILE_BATCH_SIZE = 200  # 对账时每批查询数据库的文件数
+    FILE_RECONCILE_RATE = 500  # 对账扫描速度上限（文件/秒）
+    FILE_RECONCILE_CLEAN = os.getenv('FILE_RECONCILE_CLEAN', 'false').lower() == 'true'  # 定期对账是否自动清理孤立文件
+    
+    # 内容缓存配置（提取文本和AI分析结果按内容哈希缓存）
+    CONTENT_CACHE_MAX_BYTES = int(os.getenv('CONTENT_CACHE_MAX_BYTES', 256 * 1024 * 1024))  # 256MB
+    
+    # 文本提取配置
+    EXTRACT_WORKERS = int(os.getenv('EXTRACT_WORKERS', 4))  # 按页并行提取的线程数
+    EXTRACT_MAX_CHARS = int(os.getenv('EXTRACT_MAX_CHARS', 200000))  # 提取字符上限，达到后停止解析剩余页面
+    EXTRACT_PARALLEL_MAX_BYTES = int(os.getenv('EXTRACT_PARALLEL_MAX_BYTES', 64 * 1024 * 1024))  # 并行提取时各线程文档副本的总大小上限（64MB）
+    
+    # 图片预览配置
+    PREVIEW_WORKERS = int(os.getenv('PREVIEW_WORKERS', 2))  # 生成预览图的线程数
+    PREVIEW_THUMBNAIL_SIZES = [128, 256]  # 缩略图边长（像素）
+    PREVIEW_MAX_SIZE = 1600  # 网页预览图最大边长（像素）
+    PREVIEW_QUALITY = 80  # WebP压缩质量
+    PREVIEW_CACHE_MAX_AGE = 365 * 24 * 3600  # 预览图浏览器缓存时间（秒）
+    PREVIEW_RETRY_INTERVAL = 300  # 重新提交未完成预览图任务的间隔（秒）
+    
+    # 项目文件配置
+    PROJECT_TEXT_INLINE_MAX = int(os.getenv('PROJECT_TEXT_INLINE_MAX', 1024 * 1024))  # 上传的文本不超过该大小时保存到数据库以便在线编辑（1MB）
+    
+    CONTENT_REVISION_KEEP = 50  # 在线编辑保留的历史版本数（用作三方合并的基础）
+    
+    # 项目版本库配置
+    VCS_MAX_DELTA_CHAIN = int(os.getenv('VCS_MAX_DELTA_CHAIN', 16))  # 增量链最大长度，达到后保存完整版本（0表示不使用增量）
+    VCS_DELTA_MIN_SIZE = 512  # 小于该大小（字节）的文本直接保存完整版本
+    VCS_CACHE_MAX_BYTES = int(os.getenv('VCS_CACHE_MAX_BYTES', 32 * 1024 * 1024))  # 重建版本的进程内缓存容量（32MB）
+    VCS_DIFF_MAX_BYTES = int(os.getenv('VCS_DIFF_MAX_BYTES', 1024 * 1024))  # 超过该大小的文件只记录哈希变化，不计算差异（1MB）
+    VCS_DIFF_MAX_EDITS = int(os.getenv('VCS_DIFF_MAX_EDITS', 1000))  # Myers算法的编辑距离上限，超过时改用difflib比较
+    VCS_DIFF_CACHE_SIZE = 256  # 缓存的差异结果数
+    ARCHIVE_CACHE_MAX_BYTES = int(os.getenv('ARCHIVE_CACHE_MAX_BYTES', 2 * 1024 * 1024 * 1024))  # 提交打包缓存容量（2GB），按最近使用时间淘汰
+    ARCHIVE_CACHE_CLEAN_INTERVAL = 3600  # 清理提交打包缓存的间隔（秒）
+    VCS_GC_INTERVAL = 24 * 3600  # 回收不再被提交引用的版本快照、释放其内容块的间隔（秒）
+    
+    # Socket.IO消息队列（多进程部署时必须配置，如redis://localhost:6379/0；本地测试可用sqlite:////tmp/socketio-queue.db）
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE')
+    SOCKETIO_CHANNEL = os.getenv('SOCKETIO_CHANNEL', 'flask-socketio')  # 同一队列上区分不同部署的频道名
+    
+    # 小组聊天配置
+    MEMBERSHIP_CACHE_TTL = 60  # 成员关系缓存时间（秒），移出小组经消息队列通知各进程，TTL只用于兜底
+    CHAT_HISTORY_PAGE_SIZE = 50  # 每页历史消息数
+    CHAT_HISTORY_MAX_PAGE_SIZE = 200  # 客户端可请求的每页最大条数
+    CHAT_RESYNC_MAX = 200  # 重连时最多补发的消息数，超过时改为发送最新一页并标记缺口
+    CHAT_RESYNC_OVERLAP = 0.5  # 补发时尽量覆盖最后收到的消息之前多少秒（其他进程延迟送达或写入的消息），客户端按ID去重
+    CHAT_WRITE_BATCH_SIZE = 200  # 后台每批写入的最大消息数
+    CHAT_FLUSH_INTERVAL = float(os.getenv('CHAT_FLUSH_INTERVAL', 0.05))  # 攒批等待时间（秒）
+    CHAT_ACK_MODE = os.getenv('CHAT_ACK_MODE', 'buffered')  # buffered: 进入写入缓冲即确认; durable: 写入数据库后确认
+    CHAT_ACK_TIMEOUT = 5  # durable模式下等待写入的超时时间（秒）
+    CHAT_WORKER_ID = int(os.environ['CHAT_WORKER_ID']) if os.getenv('CHAT_WORKER_ID') else None  # 雪花ID的工作进程号（0-1023，单进程默认为0），配置了SOCKETIO_MESSAGE_QUEUE时必须为每个进程配置不同的值
+    
+    # 消息提醒推送配置
+    NOTIFICATION_COUNT_RECOMPUTE_INTERVAL = 6 * 3600  # 重新统计未读数、修正计数偏差的间隔（秒）
+    
+    # 管理员配置（逗号分隔的邮箱列表，可访问 /api/admin 接口）
+    ADMIN_EMAILS = [e.strip() for e in os.getenv('ADMIN_EMAILS', '').split(',') if e.strip()]
 
 
 class DevelopmentConfig(Config):
@@ -76,6 +163,7 @@ class TestingConfig(Config):
     DEBUG = True
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SCHEDULER_ENABLED = False
 
 
 # 配置字典
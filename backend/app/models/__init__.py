@@ -9,6 +9,7 @@ db = SQLAlchemy()
 from .user import User
 from .course import Course
 from .assignment import Assignment
+from .blob import Blob
 from .assignment_file import AssignmentFile
 from .study_plan import StudyPlan
 from .group import Group, GroupMember
@@ -16,16 +17,23 @@ from .group_task import GroupTask
 from .message import Message
 from .file import File
 from .project import Project, ProjectFile
-from .commit import Commit, FileChange
+from .snapshot import SnapshotBlob, SnapshotTree
+from .commit import Commit, FileChange, FileBlame
 from .ai_chat import AIChatSession, AIChatMessage
 from .writing_space import WritingSession, WritingItem
-from .notification import Notification
+from .notification import Notification, NotificationCounter
+from .content_cache import ExtractedText, AnalysisResult
+from .upload_session import UploadSession, UploadChunk
+from .file_tombstone import FileTombstone
+from .storage_usage import StorageUsage
+from .content_revision import ContentRevision
 
 __all__ = [
     'db',
     'User',
     'Course',
     'Assignment',
+    'Blob',
     'AssignmentFile',
     'StudyPlan',
     'Group',
@@ -35,12 +43,23 @@ __all__ = [
     'File',
     'Project',
     'ProjectFile',
+    'SnapshotBlob',
+    'SnapshotTree',
     'Commit',
     'FileChange',
+    'FileBlame',
     'AIChatSession',
     'AIChatMessage',
     'WritingSession',
     'WritingItem',
-    'Notification'
+    'Notification',
+    'NotificationCounter',
+    'ExtractedText',
+    'AnalysisResult',
+    'UploadSession',
+    'UploadChunk',
+    'FileTombstone',
+    'StorageUsage',
+    'ContentRevision'
 ]
 
@@ -3,7 +3,6 @@
 """
 from datetime import datetime
 from app.models import db
-import os
 
 
 class AssignmentFile(db.Model):
@@ -15,9 +14,11 @@ class AssignmentFile(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     filename = db.Column(db.String(255), nullable=False)  # 原始文件名
     file_path = db.Column(db.String(500), nullable=False)  # 服务器存储路径
+    blob_hash = db.Column(db.String(64), db.ForeignKey('blobs.hash'), index=True)  # 内容块哈希（旧文件为空）
     file_size = db.Column(db.BigInteger)  # 文件大小（字节）
     file_type = db.Column(db.String(50))  # 文件类型（MIME类型，如image/jpeg, application/pdf等）
     file_category = db.Column(db.String(20))  # 文件分类：image, document, other
+    preview_status = db.Column(db.String(20))  # 预览图状态：pending, ready, failed（无预览图时为空）
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # 关联关系
@@ -31,27 +32,33 @@ class AssignmentFile(db.Model):
             'user_id': self.user_id,
             'filename': self.filename,
             'file_path': self.file_path,
+            'content_hash': self.blob_hash,
             'file_size': self.file_size,
             'file_type': self.file_type,
             'file_category': self.file_category,
+            'preview_status': self.preview_status,
+            'previews': self.preview_urls(),
             'created_at': self.created_at.isoformat() if self.created_at else None,
         }
     
-    def delete_file(self):
+    def preview_urls(self):
         """
-        删除服务器上的物理文件
+        各规格预览图的短期签名地址，预览图生成完成前返回None
         
-        注意：调用此方法后需要手动提交数据库事务
+        签名链接不需要Authorization头，可直接用于<img src>；过期后重新获取文件列表即可
         """
-        try:
-            if os.path.exists(self.file_path):
-                os.remove(self.file_path)
-                return True
-        except Exception as e:
-            # 记录错误但不抛出异常，避免影响数据库操作
-            print(f'删除文件失败: {self.file_path}, 错误: {str(e)}')
-            return False
-        return False
+        if self.preview_status != 'ready':
+            return None
+        from flask import current_app
+        from app.utils.previews import variant_names
+        from app.utils.signed_url import make_signed_path
+        stem = self.filename.rsplit('.', 1)[0]
+        return {
+            variant: make_signed_path(
+                current_app.config, self.blob_hash, f'{stem}_{variant}.webp', variant=variant
+            )[0]
+            for variant in variant_names()
+        }
     
     def __repr__(self):
         return f'<AssignmentFile {self.filename}>'
@@ -0,0 +1,34 @@
+"""
+文件内容块模型 - 按内容哈希去重存储上传文件
+"""
+from datetime import datetime
+from app.models import db
+
+
+class Blob(db.Model):
+    """
+    文件内容块模型
+
+    相同内容的文件只在磁盘上保存一份，由AssignmentFile、ProjectFile、File通过blob_hash引用，
+    ref_count记录引用数，降为0后记录released_at，超过宽限期由后台清理任务删除记录和物理文件
+    """
+    __tablename__ = 'blobs'
+    
+    hash = db.Column(db.String(64), primary_key=True)  # 内容SHA-256
+    size = db.Column(db.BigInteger, nullable=False)  # 文件大小（字节）
+    ref_count = db.Column(db.Integer, nullable=False, default=0)  # 引用计数
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    released_at = db.Column(db.DateTime, index=True)  # 引用计数降为0的时间（仍被引用时为空）
+    
+    def to_dict(self) -> dict:
+        """转换为字典格式"""
+        return {
+            'hash': self.hash,
+            'size': self.size,
+            'ref_count': self.ref_count,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'released_at': self.released_at.isoformat() if self.released_at else None,
+        }
+    
+    def __repr__(self):
+        return f'<Blob {self.hash[:8]}... refs={self.ref_count}>'
@@ -6,7 +6,12 @@ from app.models import db
 
 
 class Commit(db.Model):
-    """提交历史模型"""
+    """
+    提交历史模型
+    
+    每个提交指向一棵目录树快照和父提交，哈希覆盖树、父提交、提交者、时间和提交信息，
+    任何历史内容被修改都会改变后续所有提交的哈希
+    """
     __tablename__ = 'commits'
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
@@ -14,23 +19,44 @@ class Commit(db.Model):
     committer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     message = db.Column(db.Text, nullable=False)  # 提交信息
     hash = db.Column(db.String(64), unique=True, index=True)  # 提交哈希值
+    parent_hash = db.Column(db.String(64), index=True)  # 父提交哈希（第一个提交为空）
+    tree_hash = db.Column(db.String(64), db.ForeignKey('snapshot_trees.hash'))  # 目录树快照哈希
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
     # 关联关系
     committer = db.relationship('User')
     file_changes = db.relationship('FileChange', backref='commit', lazy='dynamic', cascade='all, delete-orphan')
+    blames = db.relationship('FileBlame', lazy='dynamic', cascade='all, delete-orphan')
     
-    def to_dict(self) -> dict:
-        """转换为字典格式"""
+    def to_dict(self, file_changes=None, include_diff=True) -> dict:
+        """
+        转换为字典格式
+
+        Args:
+            file_changes: 已批量加载的FileChange列表（可选，不传时查询本提交的所有变更）
+            include_diff: 是否包含每个文件的差异内容
+
+        Returns:
+            提交信息字典（不包含文件内容）
+        """
+        if file_changes is None:
+            file_changes = self.file_changes.order_by(FileChange.filename).all()
         return {
             'id': self.id,
             'project_id': self.project_id,
             'committer_id': self.committer_id,
             'message': self.message,
             'hash': self.hash,
+            'parent_hash': self.parent_hash,
+            'tree_hash': self.tree_hash,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'committer': self.committer.to_dict() if self.committer else None,
-            'file_changes': [fc.to_dict() for fc in self.file_changes],
+            'file_changes': [fc.to_dict(include_diff=include_diff) for fc in file_changes],
+            'stats': {
+                'files': len(file_changes),
+                'additions': sum(fc.additions or 0 for fc in file_changes),
+                'deletions': sum(fc.deletions or 0 for fc in file_changes),
+            },
         }
     
     def __repr__(self):
@@ -38,29 +64,75 @@ class Commit(db.Model):
 
 
 class FileChange(db.Model):
-    """文件变更记录模型"""
+    """文件变更记录模型，由服务器比较父提交和本次提交的目录树生成"""
     __tablename__ = 'file_changes'
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     commit_id = db.Column(db.Integer, db.ForeignKey('commits.id'), nullable=False, index=True)
-    file_id = db.Column(db.Integer, db.ForeignKey('project_files.id'), nullable=False)
+    file_id = db.Column(db.Integer, db.ForeignKey('project_files.id', ondelete='SET NULL'))  # 文件删除后为空
+    filename = db.Column(db.String(255))  # 文件路径
     change_type = db.Column(db.String(20), nullable=False)  # add, modify, delete
-    diff_content = db.Column(db.Text)  # 变更内容或差异
+    old_hash = db.Column(db.String(64))  # 变更前的内容哈希（新增文件为空）
+    new_hash = db.Column(db.String(64))  # 变更后的内容哈希（删除文件为空）
+    diff_status = db.Column(db.String(20))  # text: 已计算差异, binary: 二进制文件, too_large: 超过大小上限只记录哈希
+    diff_content = db.Column(db.Text)  # 统一差异格式（diff_status为text时）
+    additions = db.Column(db.Integer)  # 新增行数
+    deletions = db.Column(db.Integer)  # 删除行数
     
     # 关联关系
     file = db.relationship('ProjectFile')
     
-    def to_dict(self) -> dict:
-        """转换为字典格式"""
-        return {
+    def to_dict(self, include_diff=True) -> dict:
+        """
+        转换为字典格式
+
+        Args:
+            include_diff: 是否包含差异内容（提交列表中不包含）
+
+        Returns:
+            文件变更字典
+        """
+        data = {
             'id': self.id,
             'commit_id': self.commit_id,
             'file_id': self.file_id,
+            'filename': self.filename,
             'change_type': self.change_type,
-            'diff_content': self.diff_content,
-            'file': self.file.to_dict() if self.file else None,
+            'old_hash': self.old_hash,
+            'new_hash': self.new_hash,
+            'diff_status': self.diff_status,
+            'additions': self.additions,
+            'deletions': self.deletions,
         }
+        if include_diff:
+            data['diff_content'] = self.diff_content
+        return data
     
     def __repr__(self):
         return f'<FileChange {self.change_type} in commit {self.commit_id}>'
 
+
+
+class FileBlame(db.Model):
+    """
+    逐行来源记录模型
+
+    每个提交为修改过的文本文件保存一条记录：文件每一行最早由哪个提交写入，
+    以游程编码保存为[[行数, 提交ID], ...]，连续来自同一提交的行合并为一段
+    """
+    __tablename__ = 'file_blames'
+    __table_args__ = (
+        db.UniqueConstraint('commit_id', 'path', name='_blame_commit_path_uc'),
+        db.Index('ix_file_blames_lookup', 'project_id', 'path', 'commit_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id', ondelete='CASCADE'), nullable=False)
+    commit_id = db.Column(db.Integer, db.ForeignKey('commits.id', ondelete='CASCADE'), nullable=False)
+    path = db.Column(db.String(255), nullable=False)  # 文件路径
+    content_hash = db.Column(db.String(64), nullable=False)  # 该版本的内容哈希
+    line_count = db.Column(db.Integer, nullable=False, default=0)  # 总行数
+    ranges = db.Column(db.JSON, nullable=False)  # [[行数, 提交ID], ...]
+    
+    def __repr__(self):
+        return f'<FileBlame {self.path} @ commit {self.commit_id}>'
@@ -0,0 +1,84 @@
+"""
+内容缓存模型 - 按文件内容哈希缓存提取文本和AI分析结果
+"""
+from datetime import datetime
+from app.models import db
+
+
+class ExtractedText(db.Model):
+    """
+    提取文本缓存模型，以上传文件的SHA-256 + 提取器版本 + 字符上限为键
+
+    提取器升级或字符上限调整后旧条目不再命中，由容量淘汰自然清除
+    """
+    __tablename__ = 'extracted_texts'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    content_hash = db.Column(db.String(64), nullable=False, index=True)  # 原始文件内容哈希
+    extractor_version = db.Column(db.String(20), nullable=False, server_default='0')  # 提取器版本（0为注册表之前的旧条目）
+    max_chars = db.Column(db.Integer, nullable=False, default=0)  # 提取时的字符上限（0表示不限）
+    truncated = db.Column(db.Boolean, nullable=False, default=False)  # 是否因达到字符上限被截断
+    text = db.Column(db.Text, nullable=False)  # 提取出的文本
+    size_bytes = db.Column(db.BigInteger, nullable=False, default=0)  # 缓存占用字节数
+    hit_count = db.Column(db.Integer, nullable=False, default=0)  # 命中次数（重复上传次数）
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # 用于LRU淘汰
+
+    __table_args__ = (
+        db.UniqueConstraint('content_hash', 'extractor_version', 'max_chars', name='_extracted_text_key_uc'),
+    )
+
+    def to_dict(self) -> dict:
+        """转换为字典格式"""
+        return {
+            'id': self.id,
+            'content_hash': self.content_hash,
+            'extractor_version': self.extractor_version,
+            'max_chars': self.max_chars,
+            'truncated': self.truncated,
+            'size_bytes': self.size_bytes,
+            'hit_count': self.hit_count,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'last_used_at': self.last_used_at.isoformat() if self.last_used_at else None,
+        }
+
+    def __repr__(self):
+        return f'<ExtractedText {self.content_hash[:8]}...>'
+
+
+class AnalysisResult(db.Model):
+    """AI分析结果缓存模型，以文本哈希 + 文件类型 + 提示词版本 + 模型为键"""
+    __tablename__ = 'analysis_results'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    text_hash = db.Column(db.String(64), nullable=False, index=True)  # 被分析文本的哈希
+    file_type = db.Column(db.String(50), nullable=False, default='text')
+    prompt_version = db.Column(db.String(20), nullable=False)  # 提示词版本，升级提示词后旧结果自动失效
+    model = db.Column(db.String(100), nullable=False, server_default='')  # 生成结果的提供商和模型（如openai:gpt-4），切换模型后旧结果不再命中
+    result = db.Column(db.Text, nullable=False)  # 分析结果（JSON字符串）
+    size_bytes = db.Column(db.BigInteger, nullable=False, default=0)
+    hit_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    # 唯一约束：同一文本在同一提示词版本和模型下只保存一份分析
+    __table_args__ = (
+        db.UniqueConstraint('text_hash', 'file_type', 'prompt_version', 'model', name='_analysis_key_uc'),
+    )
+
+    def to_dict(self) -> dict:
+        """转换为字典格式"""
+        return {
+            'id': self.id,
+            'text_hash': self.text_hash,
+            'file_type': self.file_type,
+            'prompt_version': self.prompt_version,
+            'model': self.model,
+            'size_bytes': self.size_bytes,
+            'hit_count': self.hit_count,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'last_used_at': self.last_used_at.isoformat() if self.last_used_at else None,
+        }
+
+    def __repr__(self):
+        return f'<AnalysisResult {self.text_hash[:8]}... v{self.prompt_version}>'
@@ -0,0 +1,41 @@
+"""
+内容修订模型 - 在线编辑的历史版本
+"""
+from datetime import datetime
+from app.models import db
+
+
+class ContentRevision(db.Model):
+    """
+    内容修订模型
+
+    项目文件和写作项目每次保存内容都会增加版本号，并记录该版本的内容哈希（内容保存在版本对象存储中）。
+    客户端基于旧版本提交修改时，以该版本为共同基础进行三方合并
+    """
+    __tablename__ = 'content_revisions'
+    __table_args__ = (
+        db.UniqueConstraint('target_type', 'target_id', 'version', name='_content_revision_uc'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    target_type = db.Column(db.String(20), nullable=False)  # project_file 或 writing_item
+    target_id = db.Column(db.Integer, nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    content_hash = db.Column(db.String(64), nullable=False)  # 版本对象存储中的内容哈希
+    author_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self) -> dict:
+        """转换为字典格式"""
+        return {
+            'id': self.id,
+            'target_type': self.target_type,
+            'target_id': self.target_id,
+            'version': self.version,
+            'content_hash': self.content_hash,
+            'author_id': self.author_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
+
+    def __repr__(self):
+        return f'<ContentRevision {self.target_type}:{self.target_id} v{self.version}>'
@@ -14,6 +14,7 @@ class File(db.Model):
     uploader_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     filename = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(500), nullable=False)
+    blob_hash = db.Column(db.String(64), db.ForeignKey('blobs.hash'), index=True)  # 内容块哈希（旧文件为空）
     file_size = db.Column(db.BigInteger)  # 文件大小（字节）
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -28,6 +29,7 @@ class File(db.Model):
             'uploader_id': self.uploader_id,
             'filename': self.filename,
             'file_path': self.file_path,
+            'content_hash': self.blob_hash,
             'file_size': self.file_size,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'uploader': self.uploader.to_dict() if self.uploader else None,
@@ -0,0 +1,38 @@
+"""
+待删除文件模型 - 物理文件的删除请求队列
+"""
+from datetime import datetime
+from app.models import db
+
+
+class FileTombstone(db.Model):
+    """
+    待删除文件模型
+
+    文件记录删除时（包括级联删除）在同一事务中写入，由后台清理任务分批删除物理文件，
+    删除失败会延后重试，不会丢失
+    """
+    __tablename__ = 'file_tombstones'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    path = db.Column(db.String(500), nullable=False, index=True)  # 待删除的文件路径
+    reason = db.Column(db.String(20), nullable=False, default='deleted')  # deleted: 记录已删除, orphan: 对账发现的孤立文件
+    attempts = db.Column(db.Integer, nullable=False, default=0)  # 已尝试删除次数
+    last_error = db.Column(db.String(500))  # 最近一次删除失败的原因
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # 下次尝试删除的时间
+
+    def to_dict(self) -> dict:
+        """转换为字典格式"""
+        return {
+            'id': self.id,
+            'path': self.path,
+            'reason': self.reason,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'next_attempt_at': self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+        }
+
+    def __repr__(self):
+        return f'<FileTombstone {self.path}>'
@@ -8,8 +8,15 @@ from app.models import db
 class Message(db.Model):
     """消息模型"""
     __tablename__ = 'messages'
+    __table_args__ = (
+        # 按小组分页读取历史消息（created_at, id）
+        db.Index('ix_messages_group_created_id', 'group_id', 'created_at', 'id'),
+        # 重连时按ID补发缺少的消息
+        db.Index('ix_messages_group_id_id', 'group_id', 'id'),
+    )
     
-    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    # 雪花ID由chat_writer在进程内分配（SQLite中INTEGER主键即为64位）
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
     group_id = db.Column(db.Integer, db.ForeignKey('groups.id'), nullable=False, index=True)
     sender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     content = db.Column(db.Text, nullable=False)
@@ -19,17 +26,28 @@ class Message(db.Model):
     # 关联关系
     sender = db.relationship('User')
     
-    def to_dict(self) -> dict:
-        """转换为字典格式"""
-        return {
-            'id': self.id,
+    def to_dict(self, include_sender=True) -> dict:
+        """
+        转换为字典格式
+
+        Args:
+            include_sender: 是否包含发送者信息（历史消息分页时发送者单独批量返回）
+
+        Returns:
+            消息字典
+        """
+        data = {
+            # 雪花ID超过JavaScript的安全整数范围（2^53），以字符串传给客户端
+            'id': str(self.id),
             'group_id': self.group_id,
             'sender_id': self.sender_id,
             'content': self.content,
             'message_type': self.message_type,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'sender': self.sender.to_dict() if self.sender else None,
         }
+        if include_sender:
+            data['sender'] = self.sender.to_dict() if self.sender else None
+        return data
     
     def __repr__(self):
         return f'<Message {self.id} from {self.sender_id}>'
@@ -36,3 +36,19 @@ class Notification(db.Model):
     
     def __repr__(self):
         return f'<Notification {self.id} for user {self.user_id}>'
+
+
+class NotificationCounter(db.Model):
+    """
+    未读提醒计数模型
+
+    提醒增删和已读状态变化时由SQLAlchemy事件增量维护，定期任务从提醒表重新统计并修正偏差
+    """
+    __tablename__ = 'notification_counters'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    unread_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<NotificationCounter user {self.user_id}: {self.unread_count}>'
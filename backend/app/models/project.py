@@ -1,6 +1,7 @@
 """
 项目模型 - Git for Learning协作系统
 """
+import hashlib
 from datetime import datetime
 from app.models import db
 
@@ -14,6 +15,7 @@ class Project(db.Model):
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
     creator_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    head_commit_hash = db.Column(db.String(64))  # 最新提交的哈希
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -22,18 +24,28 @@ class Project(db.Model):
     files = db.relationship('ProjectFile', backref='project', lazy='dynamic', cascade='all, delete-orphan')
     commits = db.relationship('Commit', backref='project', lazy='dynamic', cascade='all, delete-orphan')
     
-    def to_dict(self) -> dict:
-        """转换为字典格式"""
+    def to_dict(self, file_count=None, commit_count=None) -> dict:
+        """
+        转换为字典格式
+
+        Args:
+            file_count: 已批量统计的文件数（可选，不传时单独查询）
+            commit_count: 已批量统计的提交数（可选，不传时单独查询）
+
+        Returns:
+            项目信息字典
+        """
         return {
             'id': self.id,
             'group_id': self.group_id,
             'name': self.name,
             'description': self.description,
             'creator_id': self.creator_id,
+            'head_commit_hash': self.head_commit_hash,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'file_count': self.files.count(),
-            'commit_count': self.commits.count(),
+            'file_count': self.files.count() if file_count is None else file_count,
+            'commit_count': self.commits.count() if commit_count is None else commit_count,
         }
     
     def __repr__(self):
@@ -47,10 +59,13 @@ class ProjectFile(db.Model):
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False, index=True)
     filename = db.Column(db.String(255), nullable=False)
-    content = db.Column(db.Text)  # 文件内容
+    content = db.Column(db.Text)  # 文本内容（保存在内容块存储中的文件为空）
     file_path = db.Column(db.String(500))  # 上传文件的路径（可选）
+    blob_hash = db.Column(db.String(64), db.ForeignKey('blobs.hash'), index=True)  # 上传文件的内容块哈希（可选）
     file_type = db.Column(db.String(50))  # 文件类型（如：text, image, document等）
     file_size = db.Column(db.BigInteger)  # 文件大小（字节）
+    content_hash = db.Column(db.String(64))  # 内容SHA-256，与版本快照中的内容哈希一致，客户端据此跳过未变化的文件
+    version = db.Column(db.Integer, nullable=False, default=1)  # 内容版本号，每次在线编辑加1，用作ETag
     creator_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -58,20 +73,50 @@ class ProjectFile(db.Model):
     # 关联关系
     creator = db.relationship('User')
     
-    def to_dict(self) -> dict:
-        """转换为字典格式"""
-        return {
+    @property
+    def is_text(self):
+        """
+        是否按文本管理（版本快照和打包时使用content，否则使用存储的原文件）
+        
+        在线创建的文件和不超过PROJECT_TEXT_INLINE_MAX的上传文本只保存在content中，
+        其他上传文件只保存在内容块存储中
+        """
+        return not self.blob_hash
+    
+    def refresh_content_hash(self):
+        """修改content、blob_hash或file_type后调用，更新content_hash"""
+        if self.is_text:
+            self.content_hash = hashlib.sha256((self.content or '').encode('utf-8')).hexdigest()
+        else:
+            self.content_hash = self.blob_hash
+    
+    def to_dict(self, include_content=True) -> dict:
+        """
+        转换为字典格式
+
+        Args:
+            include_content: 是否包含文件内容（文件列表中不包含）
+
+        Returns:
+            文件信息字典
+        """
+        data = {
             'id': self.id,
             'project_id': self.project_id,
             'filename': self.filename,
-            'content': self.content,
             'file_path': self.file_path,
+            'blob_hash': self.blob_hash,
             'file_type': self.file_type,
             'file_size': self.file_size,
+            'content_hash': self.content_hash,
+            'version': self.version,
             'creator_id': self.creator_id,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
         }
+        if include_content:
+            data['content'] = self.content
+        return data
     
     def __repr__(self):
         return f'<ProjectFile {self.filename}>'
@@ -0,0 +1,45 @@
+"""
+版本快照模型 - Git for Learning协作系统的对象存储
+"""
+from datetime import datetime
+from app.models import db
+
+
+class SnapshotBlob(db.Model):
+    """
+    文件内容快照模型
+
+    以内容SHA-256为主键，内容不可变，不同提交、不同项目中相同内容的文件共用一条记录。
+    文本内容压缩后保存在data中：完整版本（关键帧）或相对于上一版本的增量，增量链长度不超过VCS_MAX_DELTA_CHAIN；
+    上传的二进制文件保存在内容块存储中（storage为blob），本记录持有其一个引用
+    """
+    __tablename__ = 'snapshot_blobs'
+
+    hash = db.Column(db.String(64), primary_key=True)  # 内容SHA-256
+    size = db.Column(db.BigInteger, nullable=False)  # 内容大小（字节）
+    storage = db.Column(db.String(10), nullable=False, default='full')  # full: 完整内容, delta: 增量, blob: 内容块存储
+    data = db.Column(db.LargeBinary)  # zlib压缩的完整内容或增量（storage为full或delta时）
+    stored_size = db.Column(db.BigInteger, nullable=False, default=0)  # data的字节数
+    base_hash = db.Column(db.String(64), db.ForeignKey('snapshot_blobs.hash'))  # 增量的基础版本
+    chain_depth = db.Column(db.Integer, nullable=False, default=0)  # 到最近关键帧需要应用的增量数，关键帧为0
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)  # 创建时间，文本快照被复用时刷新（回收宽限期据此计算）
+
+    def __repr__(self):
+        return f'<SnapshotBlob {self.hash[:8]}...>'
+
+
+class SnapshotTree(db.Model):
+    """
+    目录树快照模型
+
+    记录一次提交时项目中所有文件的路径和内容哈希，以规范化内容的SHA-256为主键，
+    文件未变化的提交共用同一棵树
+    """
+    __tablename__ = 'snapshot_trees'
+
+    hash = db.Column(db.String(64), primary_key=True)  # 树内容SHA-256
+    entries = db.Column(db.JSON, nullable=False)  # [{"path": 文件名, "hash": 内容哈希, "size": 大小, "kind": "text"或"binary", "file_type": MIME类型}]
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<SnapshotTree {self.hash[:8]}... ({len(self.entries or [])} entries)>'
@@ -0,0 +1,39 @@
+"""
+存储用量模型 - 按用户和小组统计文件占用空间
+"""
+from datetime import datetime
+from app.models import db
+
+
+class StorageUsage(db.Model):
+    """
+    存储用量计数模型
+
+    文件记录增删改时由SQLAlchemy事件增量维护，定期任务从文件表重新汇总并修正偏差。
+    统计的是文件记录的逻辑大小，内容去重节省的磁盘空间不计入
+    """
+    __tablename__ = 'storage_usage'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    owner_type = db.Column(db.String(10), nullable=False)  # user, group
+    owner_id = db.Column(db.Integer, nullable=False)  # 用户ID或小组ID
+    bytes_used = db.Column(db.BigInteger, nullable=False, default=0)  # 已用字节数
+    file_count = db.Column(db.Integer, nullable=False, default=0)  # 文件数
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('owner_type', 'owner_id', name='_storage_owner_uc'),
+    )
+
+    def to_dict(self) -> dict:
+        """转换为字典格式"""
+        return {
+            'owner_type': self.owner_type,
+            'owner_id': self.owner_id,
+            'bytes_used': self.bytes_used,
+            'file_count': self.file_count,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+    def __repr__(self):
+        return f'<StorageUsage {self.owner_type}:{self.owner_id} {self.bytes_used}>'
@@ -0,0 +1,70 @@
+"""
+分片上传会话模型
+"""
+from datetime import datetime
+from app.models import db
+
+
+class UploadSession(db.Model):
+    """分片上传会话模型，记录一次可断点续传的上传"""
+    __tablename__ = 'upload_sessions'
+
+    id = db.Column(db.String(32), primary_key=True)  # 会话ID（uuid hex）
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    target_type = db.Column(db.String(20), nullable=False)  # assignment, project
+    target_id = db.Column(db.Integer, nullable=False)  # 作业ID或项目ID
+    filename = db.Column(db.String(255), nullable=False)
+    file_size = db.Column(db.BigInteger, nullable=False)  # 文件总大小（字节）
+    chunk_size = db.Column(db.Integer, nullable=False)  # 分片大小（字节，最后一片可以更小）
+    chunk_count = db.Column(db.Integer, nullable=False)  # 分片总数
+    status = db.Column(db.String(20), nullable=False, default='uploading')  # uploading, completed
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    # 关联关系
+    chunks = db.relationship('UploadChunk', backref='session', lazy='dynamic', cascade='all, delete-orphan')
+
+    def to_dict(self, received_chunks=None) -> dict:
+        """
+        转换为字典格式
+
+        Args:
+            received_chunks: 已接收的分片序号列表（可选，断点续传时客户端据此补传缺失分片）
+        """
+        result = {
+            'id': self.id,
+            'user_id': self.user_id,
+            'target_type': self.target_type,
+            'target_id': self.target_id,
+            'filename': self.filename,
+            'file_size': self.file_size,
+            'chunk_size': self.chunk_size,
+            'chunk_count': self.chunk_count,
+            'status': self.status,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
+        if received_chunks is not None:
+            result['received_chunks'] = received_chunks
+        return result
+
+    def __repr__(self):
+        return f'<UploadSession {self.id} {self.filename}>'
+
+
+class UploadChunk(db.Model):
+    """已接收分片记录模型"""
+    __tablename__ = 'upload_chunks'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    session_id = db.Column(db.String(32), db.ForeignKey('upload_sessions.id'), nullable=False, index=True)
+    index = db.Column(db.Integer, nullable=False)  # 分片序号（从0开始）
+    size = db.Column(db.Integer, nullable=False)
+    checksum = db.Column(db.String(64), nullable=False)  # 分片SHA-256
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # 唯一约束：同一分片只记录一次，并发重传时由数据库去重
+    __table_args__ = (db.UniqueConstraint('session_id', 'index', name='_upload_chunk_uc'),)
+
+    def __repr__(self):
+        return f'<UploadChunk {self.index} of {self.session_id}>'
@@ -14,6 +14,7 @@ class WritingItem(db.Model):
     session_id = db.Column(db.Integer, db.ForeignKey('writing_sessions.id'), nullable=True, index=True)
     title = db.Column(db.String(200), nullable=False)  # 文档标题
     content = db.Column(db.Text)  # 文档内容
+    version = db.Column(db.Integer, nullable=False, default=1)  # 内容版本号，每次修改内容加1，用作ETag
     item_type = db.Column(db.String(20), nullable=False, default='text')  # text 或 image
     position_x = db.Column(db.Integer, default=100)
     position_y = db.Column(db.Integer, default=100)
@@ -34,6 +35,7 @@ class WritingItem(db.Model):
             'session_id': self.session_id,
             'title': self.title,
             'content': self.content,
+            'version': self.version,
             'item_type': self.item_type,
             'position_x': self.position_x,
             'position_y': self.position_y,
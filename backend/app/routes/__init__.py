@@ -1,7 +1,7 @@
 """
 路由模块初始化
 """
-from . import auth, courses, assignments, groups, ai, ws, projects, tasks, writing
+from . import auth, courses, assignments, groups, ai, ws, projects, tasks, writing, dashboard, admin, uploads
 
-__all__ = ['auth', 'courses', 'assignments', 'groups', 'ai', 'ws', 'projects', 'tasks', 'writing']
+__all__ = ['auth', 'courses', 'assignments', 'groups', 'ai', 'ws', 'projects', 'tasks', 'writing', 'dashboard', 'admin', 'uploads']
 
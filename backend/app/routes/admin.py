@@ -0,0 +1,212 @@
+"""
+管理员路由 - 系统运行统计和存储维护
+"""
+from flask import Blueprint, request, jsonify, current_app
+from app.utils.auth import admin_required
+from app.models.storage_usage import StorageUsage
+from app.utils import content_cache, file_gc, storage_quota, vcs
+
+bp = Blueprint('admin', __name__)
+
+
+@bp.route('/content-cache/stats', methods=['GET'])
+@admin_required
+def content_cache_stats():
+    """
+    获取内容缓存统计（提取文本和AI分析的去重率）
+
+    返回:
+        {
+            "success": true,
+            "stats": {
+                "max_bytes": 缓存容量上限,
+                "total_bytes": 当前占用字节数,
+                "extracted_text": {"entries": 条目数, "hits": 命中次数, "dedupe_ratio": 去重率, ...},
+                "analysis": {...}
+            }
+        }
+    """
+    try:
+        return jsonify({
+            'success': True,
+            'stats': content_cache.get_stats()
+        }), 200
+
+    except Exception as e:
+        current_app.logger.error(f'获取缓存统计失败: {str(e)}')
+        return jsonify({
+            'success': False,
+            'error': f'获取缓存统计失败: {str(e)}'
+        }), 500
+
+
+@bp.route('/storage/gc', methods=['GET'])
+@admin_required
+def storage_gc_status():
+    """
+    获取物理文件回收状态和最近一次孤立文件对账报告
+
+    返回:
+        {
+            "success": true,
+            "status": {
+                "pending_files": 待删除文件数,
+                "failed_files": [删除失败的记录],
+                "released_blobs": 待回收内容块数,
+                "reconciling": 是否正在对账,
+                "last_report": {"scanned": 扫描文件数, "orphan_count": 孤立文件数, "orphans": [...], ...}
+            }
+        }
+    """
+    try:
+        return jsonify({
+            'success': True,
+            'status': file_gc.get_status()
+        }), 200
+
+    except Exception as e:
+        current_app.logger.error(f'获取文件回收状态失败: {str(e)}')
+        return jsonify({
+            'success': False,
+            'error': f'获取文件回收状态失败: {str(e)}'
+        }), 500
+
+
+@bp.route('/storage/reconcile', methods=['POST'])
+@admin_required
+def storage_reconcile():
+    """
+    在后台启动一次孤立文件对账，结果通过 GET /storage/gc 查看
+
+    请求体:
+        {
+            "clean": false（可选，true时把孤立文件加入待删除队列）
+        }
+    """
+    from app import socketio
+
+    try:
+        if file_gc.get_status()['reconciling']:
+            return jsonify({'success': False, 'error': '对账任务正在运行'}), 409
+
+        data = request.get_json(silent=True) or {}
+        app = current_app._get_current_object()
+
+        def run():
+            with app.app_context():
+                try:
+                    file_gc.reconcile_upload_folder(clean=bool(data.get('clean')))
+                except Exception as e:
+                    app.logger.error(f'孤立文件对账失败: {str(e)}')
+                finally:
+                    from app.models import db
+                    db.session.remove()
+
+        socketio.start_background_task(run)
+        return jsonify({'success': True, 'message': '对账任务已开始'}), 202
+
+    except Exception as e:
+        current_app.logger.error(f'启动对账任务失败: {str(e)}')
+        return jsonify({
+            'success': False,
+            'error': f'启动对账任务失败: {str(e)}'
+        }), 500
+
+
+@bp.route('/storage/usage', methods=['GET'])
+@admin_required
+def storage_usage():
+    """
+    获取存储用量排行
+
+    查询参数:
+        owner_type: user或group（可选，默认user）
+        limit: 返回数量（可选，默认20）
+    """
+    try:
+        owner_type = request.args.get('owner_type', 'user')
+        limit = min(request.args.get('limit', 20, type=int), 200)
+        rows = StorageUsage.query.filter_by(owner_type=owner_type).order_by(
+            StorageUsage.bytes_used.desc()
+        ).limit(limit).all()
+
+        return jsonify({
+            'success': True,
+            'quota_bytes': storage_quota.get_quota(owner_type),
+            'usage': [row.to_dict() for row in rows]
+        }), 200
+
+    except Exception as e:
+        current_app.logger.error(f'获取存储用量失败: {str(e)}')
+        return jsonify({
+            'success': False,
+            'error': f'获取存储用量失败: {str(e)}'
+        }), 500
+
+
+@bp.route('/storage/usage/recompute', methods=['POST'])
+@admin_required
+def recompute_storage_usage():
+    """立即从文件表重新汇总存储用量，返回修正的计数条数"""
+    try:
+        corrected = storage_quota.recompute_usage()
+        return jsonify({'success': True, 'corrected': corrected}), 200
+
+    except Exception as e:
+        from app.models import db
+        db.session.rollback()
+        current_app.logger.error(f'重新汇总存储用量失败: {str(e)}')
+        return jsonify({
+            'success': False,
+            'error': f'重新汇总存储用量失败: {str(e)}'
+        }), 500
+
+
+@bp.route('/storage/versions', methods=['GET'])
+@admin_required
+def storage_versions():
+    """
+    获取项目版本库的存储统计
+
+    返回:
+        {
+            "success": true,
+            "stats": {
+                "by_storage": {"full": {"count", "bytes", "stored_bytes"}, "delta": {...}, "blob": {...}},
+                "text_bytes": 文本版本的原始总大小,
+                "text_stored_bytes": 文本版本的实际占用,
+                "compression_ratio": 实际占用/原始大小,
+                "max_chain_depth": 当前最长增量链,
+                "cache": {"entries", "bytes", "hits", "misses", "hit_ratio", ...}
+            }
+        }
+    """
+    try:
+        return jsonify({
+            'success': True,
+            'stats': vcs.storage_stats()
+        }), 200
+
+    except Exception as e:
+        current_app.logger.error(f'获取版本库存储统计失败: {str(e)}')
+        return jsonify({
+            'success': False,
+            'error': f'获取版本库存储统计失败: {str(e)}'
+        }), 500
+
+
+@bp.route('/storage/versions/gc', methods=['POST'])
+@admin_required
+def collect_versions():
+    """立即回收不再被提交或在线编辑修订引用的版本快照，并释放其内容块引用"""
+    try:
+        return jsonify({'success': True, 'result': vcs.collect_unreachable()}), 200
+
+    except Exception as e:
+        from app.models import db
+        db.session.rollback()
+        current_app.logger.error(f'回收版本快照失败: {str(e)}')
+        return jsonify({
+            'success': False,
+            'error': f'回收版本快照失败: {str(e)}'
+        }), 500
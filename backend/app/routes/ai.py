@@ -3,11 +3,15 @@ AI智能功能路由
 """
 from flask import Blueprint, request, jsonify, current_app, send_file
 from app.utils.auth import login_required
-from app.utils.xunfei_api import analyze_file_content, get_daily_motivation_and_music, break_down_learning_goal, chat_with_ai
+from app.utils.xunfei_api import analyze_file_content, get_daily_motivation_and_music, break_down_learning_goal, chat_with_ai, ANALYSIS_PROMPT_VERSION
+from app.utils.file_hash import save_stream_with_hash, hash_bytes
+from app.utils import content_cache
+from app.utils.extractors import ExtractionError, ExtractorUnavailableError
+from app.utils.llm_providers import current_model_id
 from app.models import AIChatSession, AIChatMessage, db
 from datetime import datetime
+from werkzeug.utils import secure_filename
 import os
-import tempfile
 
 bp = Blueprint('ai', __name__)
 
@@ -16,7 +20,7 @@ bp = Blueprint('ai', __name__)
 @login_required
 def extract_text():
     """
-    从上传的文件中提取文本内容（支持Word文档）
+    从上传的文件中提取文本内容（支持Word、PDF、PowerPoint、Excel和纯文本）
     
     请求:
         multipart/form-data
@@ -26,7 +30,10 @@ def extract_text():
         {
             "success": true,
             "content": "提取的文本内容",
-            "filename": "文件名"
+            "filename": "文件名",
+            "content_hash": "文件内容SHA-256",
+            "cached": 是否命中缓存,
+            "truncated": 是否因超过字符上限被截断
         }
     """
     try:
@@ -44,56 +51,55 @@ def extract_text():
             }), 400
         
         filename = file.filename
-        ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
-        
-        # 保存临时文件
-        temp_dir = tempfile.gettempdir()
-        temp_path = os.path.join(temp_dir, filename)
-        file.save(temp_path)
+        # 临时文件后缀只取安全文件名中的扩展名，原始文件名中的路径字符不能进入mkstemp
+        safe_name = secure_filename(filename)
+        ext = safe_name.rsplit('.', 1)[1].lower() if '.' in safe_name else ''
+        if not ext.isalnum() or len(ext) > 10:
+            ext = ''
+        
+        # 保存临时文件，同时计算内容哈希
+        temp_path, content_hash, _ = save_stream_with_hash(
+            file.stream,
+            suffix=f'.{ext}' if ext else ''
+        )
         
         try:
-            content = ''
-            
-            # Word文档处理
-            if ext in ['docx', 'doc']:
-                try:
-                    import docx
-                    doc = docx.Document(temp_path)
-                    content = '\n'.join([para.text for para in doc.paragraphs])
-                except ImportError:
-                    # 如果没有python-docx库，返回错误提示
-                    return jsonify({
-                        'success': False,
-                        'error': 'Word文档解析需要安装python-docx库。请运行: pip install python-docx'
-                    }), 500
-                except Exception as e:
-                    current_app.logger.error(f'Word文档解析失败: {str(e)}')
-                    return jsonify({
-                        'success': False,
-                        'error': f'Word文档解析失败: {str(e)}'
-                    }), 500
-            else:
-                # 文本文件直接读取
-                with open(temp_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-            
-            # 清理临时文件
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
+            # 同一文件重复上传时直接返回缓存的文本，跳过解析
+            try:
+                content, truncated, cached = content_cache.extract_cached(temp_path, filename, content_hash)
+            except ExtractorUnavailableError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 500
+            except ExtractionError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
+            except Exception as e:
+                current_app.logger.error(f'文档解析失败: {str(e)}')
+                return jsonify({
+                    'success': False,
+                    'error': f'文档解析失败: {str(e)}'
+                }), 500
             
             return jsonify({
                 'success': True,
                 'content': content,
-                'filename': filename
+                'filename': filename,
+                'content_hash': content_hash,
+                'cached': cached,
+                'truncated': truncated
             }), 200
             
-        except Exception as e:
-            # 确保清理临时文件
+        finally:
+            # 清理临时文件
             if os.path.exists(temp_path):
                 os.remove(temp_path)
-            raise e
             
     except Exception as e:
+        db.session.rollback()
         current_app.logger.error(f'文本提取失败: {str(e)}')
         return jsonify({
             'success': False,
@@ -119,7 +125,8 @@ def analyze_file():
             "success": true,
             "summary": "内容摘要",
             "estimated_hours": 预估小时数,
-            "suggestions": ["建议1", "建议2", ...]
+            "suggestions": ["建议1", "建议2", ...],
+            "cached": 是否命中缓存
         }
     """
     try:
@@ -141,6 +148,14 @@ def analyze_file():
         # 不再限制内容长度，让AI处理完整内容
         # 如果内容过长，可以考虑分段处理，但现在先不限制
         
+        # 相同文本在相同提示词版本和模型下的分析结果直接复用，不再调用大模型
+        text_hash = hash_bytes(content)
+        model_id = current_model_id()
+        cached = content_cache.get_analysis(text_hash, file_type, ANALYSIS_PROMPT_VERSION, model_id)
+        if cached is not None:
+            current_app.logger.info(f'命中分析缓存: {text_hash[:8]}')
+            return jsonify({**cached, 'cached': True}), 200
+        
         # 调用AI分析
         current_app.logger.info('调用AI分析接口...')
         try:
@@ -148,7 +163,8 @@ def analyze_file():
             current_app.logger.info(f'AI分析结果: success={result.get("success")}')
             
             if result.get('success'):
-                return jsonify(result), 200
+                content_cache.put_analysis(text_hash, file_type, ANALYSIS_PROMPT_VERSION, model_id, result)
+                return jsonify({**result, 'cached': False}), 200
             else:
                 error_msg = result.get('error', '分析失败，请稍后重试')
                 error_detail = result.get('raw', {})
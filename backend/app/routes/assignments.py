@@ -7,8 +7,13 @@ from app.models import db
 from app.models.assignment import Assignment
 from app.models.assignment_file import AssignmentFile
 from app.utils.auth import login_required
+from app.utils.extractors import ExtractionError
+from app.utils import blob_store, content_cache, previews, storage_quota
+from app.utils.storage_quota import QuotaExceeded
+from app.utils.file_response import send_stored_file, stream_response
+from app.utils.zip_stream import ZipEntry, stream_zip
+from app.utils.signed_url import make_signed_path
 import os
-import uuid
 from werkzeug.utils import secure_filename
 
 bp = Blueprint('assignments', __name__)
@@ -24,6 +29,9 @@ ALLOWED_EXTENSIONS_FLAT = set()
 for category in ALLOWED_EXTENSIONS.values():
     ALLOWED_EXTENSIONS_FLAT.update(category)
 
+# 单次最多生成的签名链接数
+MAX_SIGNED_URLS = 200
+
 
 def allowed_file(filename):
     """
@@ -234,10 +242,7 @@ def assignment_detail(assignment_id):
             }), 200
         
         if request.method == 'DELETE':
-            # 删除关联的文件
-            for file in assignment.files:
-                file.delete_file()
-            
+            # 关联的文件记录级联删除，物理文件由后台任务回收
             db.session.delete(assignment)
             db.session.commit()
             
@@ -259,6 +264,9 @@ def upload_file(assignment_id):
         if not assignment:
             return jsonify({'error': '作业不存在或无权限访问'}), 404
         
+        # 在解析请求体（写入临时文件）之前检查配额，请求体大小是文件大小的上限
+        storage_quota.check_quota(request.content_length, user_id=user.id)
+        
         # 检查是否有文件
         if 'file' not in request.files:
             return jsonify({'error': '未选择文件'}), 400
@@ -274,20 +282,10 @@ def upload_file(assignment_id):
                 'error': f'不支持的文件类型。允许的类型：图片（png, jpg, jpeg, gif等）、文档（pdf, doc, docx等）、压缩包（zip, rar等）'
             }), 400
         
-        # 确保上传目录存在
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        assignment_folder = os.path.join(upload_folder, 'assignments', str(assignment_id))
-        os.makedirs(assignment_folder, exist_ok=True)
-        
-        # 生成唯一文件名
+        # 按内容哈希存储，相同文件只保存一份
         filename = secure_filename(file.filename)
-        file_ext = filename.rsplit('.', 1)[1].lower()
-        unique_filename = f"{uuid.uuid4().hex}.{file_ext}"
-        file_path = os.path.join(assignment_folder, unique_filename)
-        
-        # 保存文件
-        file.save(file_path)
-        file_size = os.path.getsize(file_path)
+        file_ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+        blob = blob_store.store_stream(file.stream)
         
         # 获取MIME类型
         from mimetypes import guess_type
@@ -300,20 +298,28 @@ def upload_file(assignment_id):
             assignment_id=assignment.id,
             user_id=user.id,
             filename=filename,
-            file_path=file_path,
-            file_size=file_size,
+            file_path=blob_store.blob_path(blob.hash),
+            blob_hash=blob.hash,
+            file_size=blob.size,
             file_type=file_type,
-            file_category=category
+            file_category=category,
+            preview_status=previews.initial_status(file_type, blob.hash)
         )
         
         db.session.add(assignment_file)
         db.session.commit()
         
+        # 预览图在后台生成，不占用上传请求
+        previews.schedule([assignment_file])
+        
         return jsonify({
             'message': '文件上传成功',
             'file': assignment_file.to_dict()
         }), 201
         
+    except QuotaExceeded as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), e.status_code
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'文件上传失败: {str(e)}'}), 500
@@ -339,10 +345,7 @@ def delete_file(assignment_id, file_id):
         if not assignment_file:
             return jsonify({'error': '文件不存在或无权限访问'}), 404
         
-        # 删除物理文件
-        assignment_file.delete_file()
-        
-        # 删除数据库记录
+        # 删除数据库记录，物理文件由后台任务回收
         db.session.delete(assignment_file)
         db.session.commit()
         
@@ -377,9 +380,11 @@ def get_files(assignment_id):
 @bp.route('/<int:assignment_id>/files/<int:file_id>/download', methods=['GET'])
 @login_required
 def download_file(assignment_id, file_id):
-    """下载作业文件"""
-    from flask import send_file
+    """
+    下载作业文件
     
+    支持Range断点续传和If-None-Match条件请求，ETag为文件内容哈希
+    """
     user = request.current_user
     
     try:
@@ -399,11 +404,200 @@ def download_file(assignment_id, file_id):
         if not os.path.exists(assignment_file.file_path):
             return jsonify({'error': '文件不存在'}), 404
         
-        return send_file(
+        return send_stored_file(
             assignment_file.file_path,
-            as_attachment=True,
-            download_name=assignment_file.filename
+            download_name=assignment_file.filename,
+            etag=assignment_file.blob_hash,
+            mimetype=assignment_file.file_type
         )
         
     except Exception as e:
         return jsonify({'error': f'文件下载失败: {str(e)}'}), 500
+
+
+@bp.route('/<int:assignment_id>/files/archive', methods=['GET'])
+@login_required
+def download_archive(assignment_id):
+    """
+    把作业的所有文件打包为ZIP下载
+
+    压缩包边生成边发送，不在服务器上生成临时文件
+    """
+    user = request.current_user
+
+    try:
+        assignment = Assignment.query.filter_by(id=assignment_id, user_id=user.id).first()
+        if not assignment:
+            return jsonify({'error': '作业不存在或无权限访问'}), 404
+
+        files = AssignmentFile.query.filter_by(
+            assignment_id=assignment_id,
+            user_id=user.id
+        ).order_by(AssignmentFile.created_at).all()
+        if not files:
+            return jsonify({'error': '该作业没有文件'}), 404
+
+        entries = [ZipEntry(f.filename, path=f.file_path, modified=f.created_at) for f in files]
+        return stream_response(stream_zip(entries), f'{assignment.title}.zip', 'application/zip')
+
+    except Exception as e:
+        return jsonify({'error': f'打包下载失败: {str(e)}'}), 500
+
+
+@bp.route('/<int:assignment_id>/files/<int:file_id>/previews/<variant>', methods=['GET'])
+@login_required
+def get_file_preview(assignment_id, file_id, variant):
+    """
+    获取图片文件的缩略图或预览图（WebP）
+
+    预览图按内容哈希生成，内容不会变化，响应可被浏览器长期缓存
+    """
+    user = request.current_user
+
+    try:
+        assignment_file = AssignmentFile.query.join(
+            Assignment, AssignmentFile.assignment_id == Assignment.id
+        ).filter(
+            AssignmentFile.id == file_id,
+            AssignmentFile.assignment_id == assignment_id,
+            AssignmentFile.user_id == user.id,
+            Assignment.user_id == user.id
+        ).first()
+
+        if not assignment_file:
+            return jsonify({'error': '文件不存在或无权限访问'}), 404
+
+        if variant not in previews.variant_names():
+            return jsonify({'error': '不支持的预览图规格'}), 400
+
+        if assignment_file.preview_status != 'ready':
+            return jsonify({
+                'error': '预览图尚未生成',
+                'preview_status': assignment_file.preview_status
+            }), 404
+
+        path = previews.variant_path(assignment_file.blob_hash, variant)
+        if not os.path.exists(path):
+            return jsonify({'error': '预览图不存在'}), 404
+
+        stem = assignment_file.filename.rsplit('.', 1)[0]
+        rv = send_stored_file(
+            path,
+            download_name=f'{stem}_{variant}.webp',
+            etag=f'{assignment_file.blob_hash}-{variant}',
+            mimetype='image/webp',
+            as_attachment=False,
+            max_age=current_app.config['PREVIEW_CACHE_MAX_AGE']
+        )
+        rv.cache_control.immutable = True
+        return rv
+
+    except Exception as e:
+        return jsonify({'error': f'获取预览图失败: {str(e)}'}), 500
+
+
+@bp.route('/files/signed-urls', methods=['POST'])
+@login_required
+def create_signed_urls():
+    """
+    批量生成作业文件的短期签名下载链接
+
+    签名链接的请求不经过登录鉴权和数据库查询，适合图片预览等批量加载场景
+
+    请求体:
+        {
+            "file_ids": [文件ID, ...],
+            "as_attachment": false（可选，true时作为附件下载）
+        }
+
+    返回:
+        {
+            "urls": [{"file_id": 文件ID, "url": "签名链接", "expires_at": 过期时间戳}],
+            "missing": [不存在或无权限的文件ID]
+        }
+    """
+    user = request.current_user
+
+    try:
+        data = request.get_json(silent=True) or {}
+        file_ids = data.get('file_ids')
+        if not isinstance(file_ids, list) or not file_ids:
+            return jsonify({'error': 'file_ids必须是非空数组'}), 400
+        if len(file_ids) > MAX_SIGNED_URLS:
+            return jsonify({'error': f'单次最多生成{MAX_SIGNED_URLS}个链接'}), 400
+
+        # 一次查询完成所有文件的权限校验
+        files = AssignmentFile.query.join(
+            Assignment, AssignmentFile.assignment_id == Assignment.id
+        ).filter(
+            AssignmentFile.id.in_(file_ids),
+            AssignmentFile.user_id == user.id,
+            Assignment.user_id == user.id
+        ).all()
+
+        as_attachment = bool(data.get('as_attachment'))
+        base_url = request.host_url.rstrip('/')
+        urls = []
+        for assignment_file in files:
+            if assignment_file.blob_hash:
+                path, expires = make_signed_path(
+                    current_app.config,
+                    assignment_file.blob_hash,
+                    assignment_file.filename,
+                    as_attachment=as_attachment
+                )
+            else:
+                # 旧文件没有内容哈希，只能通过需要登录的下载接口获取
+                path = f'/api/assignments/{assignment_file.assignment_id}/files/{assignment_file.id}/download'
+                expires = None
+            urls.append({
+                'file_id': assignment_file.id,
+                'url': base_url + path,
+                'expires_at': expires
+            })
+
+        found_ids = {assignment_file.id for assignment_file in files}
+        return jsonify({
+            'urls': urls,
+            'missing': [file_id for file_id in file_ids if file_id not in found_ids]
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': f'生成下载链接失败: {str(e)}'}), 500
+
+
+@bp.route('/<int:assignment_id>/files/<int:file_id>/text', methods=['GET'])
+@login_required
+def get_file_text(assignment_id, file_id):
+    """提取作业文件的文本内容（用于预览或AI分析）"""
+    user = request.current_user
+    
+    try:
+        assignment_file = AssignmentFile.query.filter_by(
+            id=file_id,
+            assignment_id=assignment_id,
+            user_id=user.id
+        ).first()
+        
+        if not assignment_file:
+            return jsonify({'error': '文件不存在或无权限访问'}), 404
+        
+        if not os.path.exists(assignment_file.file_path):
+            return jsonify({'error': '文件不存在'}), 404
+        
+        # 同一内容的文件只提取一次
+        try:
+            content, truncated, _ = content_cache.extract_cached(
+                assignment_file.file_path, assignment_file.filename, assignment_file.blob_hash
+            )
+        except ExtractionError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'content': content,
+            'truncated': truncated,
+            'filename': assignment_file.filename
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'文本提取失败: {str(e)}'}), 500
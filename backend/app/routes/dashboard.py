@@ -10,6 +10,7 @@ from app.models.notification import Notification
 from app.models.group import Group, GroupMember
 from app.models.group_task import GroupTask
 from app.utils.xunfei_api import analyze_file_content, XunfeiAPI
+from app.utils import notification_push, storage_quota
 from datetime import datetime, timedelta
 import json
 import re
@@ -443,11 +444,42 @@ def get_overview():
         }), 500
 
 
+@bp.route('/storage', methods=['GET'])
+@login_required
+def get_storage_usage():
+    """
+    获取当前用户和所在小组的存储用量
+
+    返回:
+        {
+            "success": true,
+            "user": {"bytes_used": 已用字节数, "file_count": 文件数, "quota_bytes": 配额},
+            "groups": [{"owner_id": 小组ID, "bytes_used": ..., "file_count": ..., "quota_bytes": ...}]
+        }
+    """
+    user = request.current_user
+
+    try:
+        group_ids = [row[0] for row in db.session.query(GroupMember.group_id).filter_by(user_id=user.id).all()]
+        return jsonify({
+            'success': True,
+            'user': storage_quota.get_usage('user', user.id),
+            'groups': [storage_quota.get_usage('group', group_id) for group_id in group_ids]
+        }), 200
+
+    except Exception as e:
+        current_app.logger.error(f'获取存储用量失败: {str(e)}')
+        return jsonify({
+            'success': False,
+            'error': f'获取存储用量失败: {str(e)}'
+        }), 500
+
+
 @bp.route('/notifications', methods=['GET'])
 @login_required
 def get_notifications():
     """
-    获取用户的消息提醒列表
+    获取用户的消息提醒列表（页面首次加载时调用，之后的新提醒和未读数通过Socket.IO推送）
     
     查询参数:
         unread_only: 是否只获取未读消息（可选）
@@ -488,11 +520,8 @@ def get_notifications():
             Notification.created_at.desc()
         ).limit(limit).all()
         
-        # 获取未读消息数量
-        unread_count = Notification.query.filter_by(
-            user_id=user.id,
-            is_read=False
-        ).count()
+        # 未读数由事件增量维护，直接读取计数
+        unread_count = notification_push.get_unread_count(user.id)
         
         return jsonify({
             'success': True,
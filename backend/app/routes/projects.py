@@ -1,13 +1,26 @@
 """
 项目管理路由 - Git for Learning协作系统
 """
-from flask import Blueprint, request, jsonify
+import os
+from flask import Blueprint, request, jsonify, stream_with_context, current_app
+from mimetypes import guess_type
+from sqlalchemy import func
+from sqlalchemy.orm import defer
 from app.models import db
 from app.models.project import Project, ProjectFile
+from app.models.commit import Commit, FileChange
 from app.models.group import Group, GroupMember
 from app.utils.auth import login_required
-import os
-import hashlib
+from app.utils import blob_store, content_cache, storage_quota
+from app.utils.storage_quota import QuotaExceeded
+from app.utils import vcs
+from app.utils.vcs import VersionControlError, archive
+from app.utils.file_response import send_stored_file, stream_response
+from app.utils.zip_stream import ZipEntry, stream_zip
+from app.utils.file_hash import TextSniffer
+from app.utils import content_edit
+from app.utils.content_edit import EditConflict
+from app.utils.extractors import ExtractionError
 
 bp = Blueprint('projects', __name__)
 
@@ -26,19 +39,42 @@ def verify_group_member(group_id, user_id):
     return GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first()
 
 
-def generate_commit_hash(message, timestamp):
+def ingest_upload(project_id, file, user_id):
     """
-    生成提交哈希值
-    
+    一次读取上传流完成哈希、文本检测和存储
+
+    不超过PROJECT_TEXT_INLINE_MAX的UTF-8文本只保存到content（删除临时文件），
+    其他文件纳入内容块存储、content为空；整个过程内存占用与文件大小无关
+
     Args:
-        message: 提交信息
-        timestamp: 时间戳
-        
+        project_id: 项目ID
+        file: 上传的FileStorage
+        user_id: 上传用户ID
+
     Returns:
-        哈希值字符串
+        未保存的ProjectFile对象
     """
-    content = f"{message}{timestamp}".encode('utf-8')
-    return hashlib.sha256(content).hexdigest()
+    sniffer = TextSniffer(current_app.config['PROJECT_TEXT_INLINE_MAX'])
+    temp_path, content_hash, size = blob_store.stage_stream(file.stream, on_chunk=sniffer.feed)
+    text = sniffer.finish()
+
+    project_file = ProjectFile(
+        project_id=project_id,
+        filename=file.filename,
+        file_type=file.content_type,
+        file_size=size,
+        creator_id=user_id
+    )
+    if text is not None:
+        os.remove(temp_path)
+        project_file.content = text
+        if not project_file.file_type or project_file.file_type == 'application/octet-stream':
+            project_file.file_type = 'text/plain'
+    else:
+        blob = blob_store.store_staged(temp_path, content_hash, size)
+        project_file.blob_hash = blob.hash
+        project_file.file_path = blob_store.blob_path(blob.hash)
+    return project_file
 
 
 @bp.route('/groups/<int:group_id>/projects', methods=['GET', 'POST'])
@@ -54,10 +90,18 @@ def group_projects(group_id):
     
     if request.method == 'GET':
         try:
-            # 获取小组的所有项目
-            projects = Project.query.filter_by(group_id=group_id).all()
+            # 获取小组的所有项目，文件数和提交数用关联子查询在同一条语句中统计
+            file_count = db.session.query(func.count(ProjectFile.id)).filter(
+                ProjectFile.project_id == Project.id
+            ).correlate(Project).scalar_subquery()
+            commit_count = db.session.query(func.count(Commit.id)).filter(
+                Commit.project_id == Project.id
+            ).correlate(Project).scalar_subquery()
+            rows = db.session.query(Project, file_count, commit_count).filter(
+                Project.group_id == group_id
+            ).all()
             return jsonify({
-                'projects': [p.to_dict() for p in projects]
+                'projects': [p.to_dict(file_count=files, commit_count=commits) for p, files, commits in rows]
             }), 200
             
         except Exception as e:
@@ -84,7 +128,7 @@ def group_projects(group_id):
             
             return jsonify({
                 'message': '项目创建成功',
-                'project': project.to_dict()
+                'project': project.to_dict(file_count=0, commit_count=0)
             }), 201
             
         except Exception as e:
@@ -159,13 +203,18 @@ def project_files(project_id):
             return jsonify({'error': '无权访问该项目'}), 403
         
         if request.method == 'GET':
-            files = ProjectFile.query.filter_by(project_id=project_id).all()
+            # 列表只返回元数据，文件内容通过 GET /<project_id>/files/<file_id> 获取
+            files = ProjectFile.query.options(defer(ProjectFile.content)).filter_by(project_id=project_id).all()
             return jsonify({
-                'files': [f.to_dict() for f in files]
+                'files': [f.to_dict(include_content=False) for f in files]
             }), 200
         
         if request.method == 'POST':
-            data = request.json
+            # 在解析上传的请求体（写入临时文件）之前检查配额，请求体大小是文件大小的上限
+            if request.mimetype == 'multipart/form-data':
+                storage_quota.check_quota(request.content_length, user_id=user.id, group_id=project.group_id)
+            
+            data = request.get_json(silent=True)
             
             # 支持两种方式：直接创建文本文件或上传文件
             if 'filename' in request.form and 'file' in request.files:
@@ -174,35 +223,14 @@ def project_files(project_id):
                 if file.filename == '':
                     return jsonify({'error': '未选择文件'}), 400
                 
-                filename = file.filename
-                content = file.read().decode('utf-8', errors='ignore')
-                
-                # 保存文件到磁盘（可选）
-                upload_folder = request.app.config.get('UPLOAD_FOLDER')
-                if upload_folder:
-                    project_folder = os.path.join(upload_folder, 'projects', str(project_id))
-                    os.makedirs(project_folder, exist_ok=True)
-                    
-                    file_path = os.path.join(project_folder, filename)
-                    with open(file_path, 'wb') as f:
-                        f.write(file.read())
-                else:
-                    file_path = None
-                
-                project_file = ProjectFile(
-                    project_id=project_id,
-                    filename=filename,
-                    content=content,
-                    file_path=file_path,
-                    file_type=file.content_type,
-                    file_size=len(content),
-                    creator_id=user.id
-                )
+                project_file = ingest_upload(project_id, file, user.id)
             else:
                 # 直接创建文本文件
                 if not data or not data.get('filename') or not data.get('content'):
                     return jsonify({'error': '缺少必要字段：filename, content'}), 400
                 
+                storage_quota.check_quota(len(data['content']), user_id=user.id, group_id=project.group_id)
+                
                 project_file = ProjectFile(
                     project_id=project_id,
                     filename=data['filename'],
@@ -212,6 +240,7 @@ def project_files(project_id):
                     creator_id=user.id
                 )
             
+            project_file.refresh_content_hash()
             db.session.add(project_file)
             db.session.commit()
             
@@ -220,11 +249,110 @@ def project_files(project_id):
                 'file': project_file.to_dict()
             }), 201
             
+    except QuotaExceeded as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), e.status_code
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 
+@bp.route('/<int:project_id>/files/archive', methods=['GET'])
+@login_required
+def download_project_archive(project_id):
+    """
+    把项目的所有文件打包为ZIP下载
+
+    文本文件的内容在写入压缩包时才逐个从数据库读取，上传的文件直接从存储读取
+    """
+    user = request.current_user
+
+    try:
+        project = Project.query.get(project_id)
+        if not project:
+            return jsonify({'error': '项目不存在'}), 404
+
+        member = verify_group_member(project.group_id, user.id)
+        if not member:
+            return jsonify({'error': '无权访问该项目'}), 403
+
+        files = ProjectFile.query.options(defer(ProjectFile.content)).filter_by(
+            project_id=project_id
+        ).order_by(ProjectFile.filename).all()
+        if not files:
+            return jsonify({'error': '该项目没有文件'}), 404
+
+        def load_content(file_id):
+            return lambda: db.session.query(ProjectFile.content).filter_by(id=file_id).scalar() or ''
+
+        entries = []
+        for f in files:
+            # 文本文件以数据库内容为准（可能已在线编辑），其他上传文件使用存储的原文件
+            if not f.is_text:
+                entries.append(ZipEntry(f.filename, path=f.file_path, modified=f.updated_at))
+            else:
+                entries.append(ZipEntry(f.filename, load=load_content(f.id), modified=f.updated_at))
+
+        return stream_response(
+            stream_with_context(stream_zip(entries)),
+            f'{project.name}.zip',
+            'application/zip'
+        )
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/<int:project_id>/archive', methods=['GET'])
+@login_required
+def download_commit_archive(project_id):
+    """
+    把某个提交时的项目文件打包为tar.gz下载
+
+    查询参数:
+        commit: 提交哈希、至少7位的哈希前缀或HEAD（默认HEAD）
+
+    首次下载时边打包边发送并写入缓存；同一提交的打包结果不变，以提交哈希作为强ETag，
+    之后的下载直接发送缓存文件，客户端已有该版本时返回304
+    """
+    user = request.current_user
+
+    try:
+        project, error = get_member_project(project_id, user.id)
+        if error:
+            return error
+
+        commit = vcs.get_commit(project_id, request.args.get('commit') or 'HEAD')
+        download_name = f'{project.name}-{commit.hash[:8]}{archive.ARCHIVE_SUFFIX}'
+        etag = archive.archive_etag(commit.hash)
+
+        path = archive.cached_archive(commit.hash)
+        if path:
+            return send_stored_file(path, download_name=download_name, etag=etag, mimetype='application/gzip')
+
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+
+        entries = vcs.read_tree(commit.tree_hash)
+        if not entries:
+            return jsonify({'error': '该提交没有文件'}), 404
+
+        chunks = archive.stream_and_cache(commit.hash, archive.stream_tar_gz(entries, commit.created_at))
+        return stream_response(
+            stream_with_context(chunks),
+            download_name,
+            'application/gzip',
+            etag=etag
+        )
+
+    except VersionControlError as e:
+        return jsonify({'error': str(e)}), e.status_code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @bp.route('/<int:project_id>/files/<int:file_id>', methods=['GET', 'PUT', 'DELETE'])
 @login_required
 def project_file_detail(project_id, file_id):
@@ -246,44 +374,136 @@ def project_file_detail(project_id, file_id):
             return jsonify({'error': '无权访问该文件'}), 403
         
         if request.method == 'GET':
-            return jsonify({'file': project_file.to_dict()}), 200
+            response = jsonify({'file': project_file.to_dict()})
+            response.set_etag(content_edit.etag(project_file.version))
+            return response, 200
         
         if request.method == 'PUT':
             data = request.json
+            merged = False
             
             # 更新字段
             if 'content' in data:
-                project_file.content = data['content']
-                project_file.file_size = len(data['content'])
+                if not project_file.is_text:
+                    return jsonify({'error': '二进制文件或大文件不能在线编辑'}), 400
+                
+                # If-Match为客户端编辑时的版本，已被他人修改时自动三方合并
+                try:
+                    base_version = content_edit.parse_if_match(request)
+                except ValueError as e:
+                    return jsonify({'error': str(e)}), 412
+                result = content_edit.apply_content_edit(
+                    project_file, 'project_file', data['content'], base_version, user.id
+                )
+                merged = result['merged']
+                
+                content = project_file.content
+                if len(content.encode('utf-8')) > current_app.config['PROJECT_TEXT_INLINE_MAX']:
+                    db.session.rollback()
+                    return jsonify({'error': '文件内容过大，不能在线编辑'}), 413
+                # 内容变大时检查配额
+                growth = len(content) - (project_file.file_size or 0)
+                if growth > 0:
+                    storage_quota.check_quota(growth, user_id=user.id, group_id=project.group_id)
+                project_file.file_size = len(content)
+                project_file.refresh_content_hash()
             if 'filename' in data:
                 project_file.filename = data['filename']
             
             db.session.commit()
             
-            return jsonify({
-                'message': '文件更新成功',
+            response = jsonify({
+                'message': '文件已与他人的修改自动合并' if merged else '文件更新成功',
+                'merged': merged,
                 'file': project_file.to_dict()
-            }), 200
+            })
+            response.set_etag(content_edit.etag(project_file.version))
+            return response, 200
         
         if request.method == 'DELETE':
-            # 删除文件物理文件（如果存在）
-            if project_file.file_path and os.path.exists(project_file.file_path):
-                os.remove(project_file.file_path)
-            
+            # 物理文件由后台任务回收
             db.session.delete(project_file)
             db.session.commit()
             
             return jsonify({'message': '文件删除成功'}), 200
             
+    except EditConflict as e:
+        db.session.rollback()
+        db.session.refresh(project_file)
+        return jsonify({
+            'error': str(e),
+            'current_version': e.current_version,
+            'conflicts': e.conflicts,
+            'file': project_file.to_dict()
+        }), e.status_code
+    except QuotaExceeded as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), e.status_code
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 
+@bp.route('/<int:project_id>/files/<int:file_id>/text', methods=['GET'])
+@login_required
+def get_project_file_text(project_id, file_id):
+    """
+    提取项目文件的文本内容（用于预览或AI分析）
+
+    在线编辑的文本文件直接返回内容；上传的文件通过提取器注册表解析（支持Word、PDF、PowerPoint、Excel），
+    同一内容只提取一次
+    """
+    user = request.current_user
+
+    try:
+        project, error = get_member_project(project_id, user.id)
+        if error:
+            return error
+
+        project_file = ProjectFile.query.filter_by(id=file_id, project_id=project.id).first()
+        if not project_file:
+            return jsonify({'error': '文件不存在'}), 404
+
+        if project_file.content is not None:
+            return jsonify({
+                'content': project_file.content,
+                'truncated': False,
+                'filename': project_file.filename
+            }), 200
+
+        if not project_file.file_path or not os.path.exists(project_file.file_path):
+            return jsonify({'error': '文件不存在'}), 404
+
+        try:
+            content, truncated, _ = content_cache.extract_cached(
+                project_file.file_path, project_file.filename, project_file.blob_hash
+            )
+        except ExtractionError as e:
+            return jsonify({'error': str(e)}), 400
+
+        return jsonify({
+            'content': content,
+            'truncated': truncated,
+            'filename': project_file.filename
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'文本提取失败: {str(e)}'}), 500
+
+
 @bp.route('/<int:project_id>/commits', methods=['GET', 'POST'])
 @login_required
 def project_commits(project_id):
-    """获取提交历史或创建新提交"""
+    """
+    获取提交历史或创建新提交
+
+    GET查询参数:
+        limit: 每页数量（可选，默认50，最大200）
+        cursor: 上一页返回的next_cursor（可选）
+
+    提交列表只包含文件变更摘要，差异内容通过 GET /<project_id>/commits/<ref> 获取
+    """
     user = request.current_user
     
     try:
@@ -297,47 +517,23 @@ def project_commits(project_id):
             return jsonify({'error': '无权访问该项目'}), 403
         
         if request.method == 'GET':
-            from app.models.commit import Commit
-            commits = Commit.query.filter_by(project_id=project_id).order_by(Commit.created_at.desc()).all()
+            # 键集分页：cursor为上一页返回的next_cursor
+            limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+            commits, next_cursor = vcs.list_commits(project_id, limit, request.args.get('cursor', type=int))
             return jsonify({
-                'commits': [c.to_dict() for c in commits]
+                'commits': commits,
+                'next_cursor': next_cursor
             }), 200
         
         if request.method == 'POST':
-            from app.models.commit import Commit, FileChange
-            data = request.json
+            data = request.get_json(silent=True)
             
             # 验证必填字段
             if not data or not data.get('message'):
                 return jsonify({'error': '缺少必要字段：message'}), 400
             
-            # 生成提交哈希
-            from datetime import datetime
-            timestamp = datetime.utcnow().isoformat()
-            commit_hash = generate_commit_hash(data['message'], timestamp)
-            
-            # 创建提交
-            commit = Commit(
-                project_id=project_id,
-                committer_id=user.id,
-                message=data['message'],
-                hash=commit_hash
-            )
-            
-            db.session.add(commit)
-            db.session.flush()  # 获取commit.id
-            
-            # 记录文件变更（如果有）
-            file_changes = data.get('file_changes', [])
-            for fc_data in file_changes:
-                file_change = FileChange(
-                    commit_id=commit.id,
-                    file_id=fc_data['file_id'],
-                    change_type=fc_data.get('change_type', 'modify'),
-                    diff_content=fc_data.get('diff_content')
-                )
-                db.session.add(file_change)
-            
+            # 文件变更由服务器比较目录树快照生成，不再使用客户端提交的file_changes
+            commit, _ = vcs.create_commit(project, user.id, data['message'])
             db.session.commit()
             
             return jsonify({
@@ -345,7 +541,276 @@ def project_commits(project_id):
                 'commit': commit.to_dict()
             }), 201
             
+    except VersionControlError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), e.status_code
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+
+
+def get_member_project(project_id, user_id):
+    """
+    获取用户所在小组的项目
+
+    Returns:
+        tuple: (Project对象, 错误响应)，出错时Project为None
+    """
+    project = Project.query.get(project_id)
+    if not project:
+        return None, (jsonify({'error': '项目不存在'}), 404)
+    if not verify_group_member(project.group_id, user_id):
+        return None, (jsonify({'error': '无权访问该项目'}), 403)
+    return project, None
+
+
+@bp.route('/<int:project_id>/commits/<ref>', methods=['GET'])
+@login_required
+def commit_detail(project_id, ref):
+    """
+    获取单个提交的详细信息，包括每个文件的差异
+
+    ref可以是提交哈希、至少7位的哈希前缀或HEAD
+    """
+    user = request.current_user
+
+    try:
+        project, error = get_member_project(project_id, user.id)
+        if error:
+            return error
+
+        commit = vcs.get_commit(project_id, ref)
+        return jsonify({'commit': commit.to_dict()}), 200
+
+    except VersionControlError as e:
+        return jsonify({'error': str(e)}), e.status_code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/<int:project_id>/commits/<ref>/tree', methods=['GET'])
+@login_required
+def commit_tree(project_id, ref):
+    """
+    获取某个提交时项目的文件列表（不含文件内容）
+
+    ref可以是提交哈希、至少7位的哈希前缀或HEAD
+    """
+    user = request.current_user
+
+    try:
+        project, error = get_member_project(project_id, user.id)
+        if error:
+            return error
+
+        commit = vcs.get_commit(project_id, ref)
+        return jsonify({
+            'commit': {'hash': commit.hash, 'parent_hash': commit.parent_hash, 'tree_hash': commit.tree_hash},
+            'entries': vcs.read_tree(commit.tree_hash)
+        }), 200
+
+    except VersionControlError as e:
+        return jsonify({'error': str(e)}), e.status_code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/<int:project_id>/commits/<ref>/file', methods=['GET'])
+@login_required
+def commit_file(project_id, ref):
+    """
+    获取某个提交时文件的内容
+
+    查询参数:
+        path: 文件路径（必填）
+
+    文本文件返回JSON内容，二进制文件直接下载
+    """
+    user = request.current_user
+
+    try:
+        project, error = get_member_project(project_id, user.id)
+        if error:
+            return error
+
+        path = request.args.get('path')
+        if not path:
+            return jsonify({'error': '缺少参数：path'}), 400
+
+        commit = vcs.get_commit(project_id, ref)
+        entry = next((e for e in vcs.read_tree(commit.tree_hash) if e['path'] == path), None)
+        if entry is None:
+            return jsonify({'error': '该提交中不存在此文件'}), 404
+
+        if entry['kind'] == 'binary':
+            return send_stored_file(
+                blob_store.blob_path(entry['hash']),
+                download_name=path.rsplit('/', 1)[-1],
+                etag=entry['hash'],
+                mimetype=entry.get('file_type') or guess_type(path)[0]
+            )
+
+        return jsonify({
+            'commit_hash': commit.hash,
+            'path': path,
+            'hash': entry['hash'],
+            'size': entry['size'],
+            'file_type': entry.get('file_type'),
+            'content': vcs.load_text(entry['hash'])
+        }), 200
+
+    except VersionControlError as e:
+        return jsonify({'error': str(e)}), e.status_code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/<int:project_id>/commits/<ref>/diff', methods=['GET'])
+@login_required
+def commit_diff(project_id, ref):
+    """
+    获取提交相对于父提交的文件差异
+
+    查询参数:
+        path: 只返回该文件的差异（可选）
+        context: 上下文行数（可选，默认3，使用默认值时直接返回提交时保存的差异）
+    """
+    user = request.current_user
+
+    try:
+        project, error = get_member_project(project_id, user.id)
+        if error:
+            return error
+
+        commit = vcs.get_commit(project_id, ref)
+        context = min(max(request.args.get('context', 3, type=int), 0), 100)
+        path = request.args.get('path')
+
+        changes = commit.file_changes.order_by(FileChange.filename)
+        if path:
+            changes = changes.filter(FileChange.filename == path)
+        changes = changes.all()
+        if path and not changes:
+            return jsonify({'error': '该提交没有修改此文件'}), 404
+
+        if context != 3:
+            old_entries = {e['path']: e for e in vcs.read_tree(
+                db.session.query(Commit.tree_hash).filter_by(project_id=project_id, hash=commit.parent_hash).scalar()
+            )} if commit.parent_hash else {}
+            new_entries = {e['path']: e for e in vcs.read_tree(commit.tree_hash)}
+
+        result = []
+        for change in changes:
+            item = {
+                'filename': change.filename,
+                'change_type': change.change_type,
+                'old_hash': change.old_hash,
+                'new_hash': change.new_hash,
+                'status': change.diff_status,
+                'diff': change.diff_content,
+                'additions': change.additions,
+                'deletions': change.deletions
+            }
+            if context != 3 and change.diff_status == 'text':
+                item.update(vcs.diff_entries(
+                    change.filename,
+                    old_entries.get(change.filename),
+                    new_entries.get(change.filename),
+                    context=context
+                ))
+            result.append(item)
+
+        return jsonify({
+            'commit_hash': commit.hash,
+            'parent_hash': commit.parent_hash,
+            'files': result
+        }), 200
+
+    except VersionControlError as e:
+        return jsonify({'error': str(e)}), e.status_code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/<int:project_id>/commits/<ref>/blame', methods=['GET'])
+@login_required
+def commit_blame(project_id, ref):
+    """
+    获取文件在某个提交时每一行的来源（最早写入该行的提交和提交者）
+
+    查询参数:
+        path: 文件路径（必填）
+
+    ref为HEAD时查询最新版本
+    """
+    user = request.current_user
+
+    try:
+        project, error = get_member_project(project_id, user.id)
+        if error:
+            return error
+
+        path = request.args.get('path')
+        if not path:
+            return jsonify({'error': '缺少参数：path'}), 400
+
+        commit = vcs.get_commit(project_id, ref)
+        result = vcs.annotate(commit, path)
+        if result is None:
+            return jsonify({'error': '该提交中不存在此文本文件，或文件过大未记录逐行来源'}), 404
+
+        return jsonify({'commit_hash': commit.hash, 'blame': result}), 200
+
+    except VersionControlError as e:
+        return jsonify({'error': str(e)}), e.status_code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/<int:project_id>/commits/<ref>/restore', methods=['POST'])
+@login_required
+def restore_commit(project_id, ref):
+    """
+    把项目文件恢复为某个提交时的内容
+
+    请求体:
+        {
+            "paths": ["文件路径", ...]（可选，不传时整体恢复，提交中不存在的文件会被删除）,
+            "commit_message": "提交信息"（可选，传入时恢复后立即创建提交）
+        }
+    """
+    user = request.current_user
+
+    try:
+        project, error = get_member_project(project_id, user.id)
+        if error:
+            return error
+
+        data = request.get_json(silent=True) or {}
+        paths = data.get('paths')
+        if paths is not None and not isinstance(paths, list):
+            return jsonify({'error': 'paths必须是数组'}), 400
+
+        commit = vcs.get_commit(project_id, ref)
+        result = vcs.restore(project, commit, user.id, paths=paths)
+
+        new_commit = None
+        if data.get('commit_message'):
+            db.session.flush()
+            new_commit, _ = vcs.create_commit(project, user.id, data['commit_message'])
+
+        db.session.commit()
+
+        return jsonify({
+            'message': '恢复成功',
+            'result': result,
+            'commit': new_commit.to_dict() if new_commit else None
+        }), 200
+
+    except VersionControlError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), e.status_code
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
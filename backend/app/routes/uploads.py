@@ -0,0 +1,254 @@
+"""
+分片上传路由 - 大文件断点续传
+"""
+from flask import Blueprint, request, jsonify, current_app
+from mimetypes import guess_type
+from werkzeug.utils import secure_filename
+from app.models import db
+from app.models.assignment import Assignment
+from app.models.assignment_file import AssignmentFile
+from app.models.project import Project, ProjectFile
+from app.models.group import GroupMember
+from app.models.upload_session import UploadSession
+from app.utils.auth import login_required
+from app.utils.file_hash import TextSniffer
+from app.utils import blob_store, chunked_upload, previews, storage_quota
+from app.utils.chunked_upload import UploadError
+from app.utils.storage_quota import QuotaExceeded
+from app.routes.assignments import allowed_file
+
+bp = Blueprint('uploads', __name__)
+
+
+def get_upload_session(session_id, user_id):
+    """获取属于当前用户的上传会话"""
+    return UploadSession.query.filter_by(id=session_id, user_id=user_id).first()
+
+
+def check_target(user, target_type, target_id, filename):
+    """
+    检查上传目标是否存在且当前用户有权限上传
+
+    Returns:
+        错误信息和状态码，检查通过时返回None
+    """
+    if target_type == 'assignment':
+        assignment = Assignment.query.filter_by(id=target_id, user_id=user.id).first()
+        if not assignment:
+            return '作业不存在或无权限访问', 404
+        is_allowed, _ = allowed_file(filename)
+        if not is_allowed:
+            return '不支持的文件类型', 400
+        return None
+
+    if target_type == 'project':
+        project = Project.query.get(target_id)
+        if not project:
+            return '项目不存在', 404
+        if not GroupMember.query.filter_by(group_id=project.group_id, user_id=user.id).first():
+            return '无权访问该项目', 403
+        return None
+
+    return 'target_type必须是 assignment 或 project', 400
+
+
+def check_target_quota(user, target_type, target_id, file_size):
+    """检查上传目标的存储配额（作业文件计入个人，项目文件同时计入小组）"""
+    group_id = None
+    if target_type == 'project':
+        group_id = db.session.query(Project.group_id).filter_by(id=target_id).scalar()
+    storage_quota.check_quota(file_size, user_id=user.id, group_id=group_id)
+
+
+@bp.route('', methods=['POST'])
+@login_required
+def create_upload():
+    """
+    创建分片上传会话
+
+    请求体:
+        {
+            "target_type": "assignment 或 project",
+            "target_id": 作业ID或项目ID,
+            "filename": "文件名",
+            "file_size": 文件总大小（字节）,
+            "chunk_size": 分片大小（可选）
+        }
+
+    返回:
+        {
+            "session": {..., "chunk_count": 分片总数, "received_chunks": []}
+        }
+    """
+    user = request.current_user
+
+    try:
+        data = request.get_json(silent=True) or {}
+        required_fields = ['target_type', 'target_id', 'filename', 'file_size']
+        if not all(data.get(field) for field in required_fields):
+            return jsonify({'error': '缺少必要字段：target_type, target_id, filename, file_size'}), 400
+
+        error = check_target(user, data['target_type'], data['target_id'], data['filename'])
+        if error:
+            return jsonify({'error': error[0]}), error[1]
+
+        # 文件大小已知，创建会话时即检查配额，不会写入任何分片
+        check_target_quota(user, data['target_type'], data['target_id'], data['file_size'])
+
+        upload = chunked_upload.create_session(
+            user_id=user.id,
+            target_type=data['target_type'],
+            target_id=data['target_id'],
+            filename=data['filename'],
+            file_size=data['file_size'],
+            chunk_size=data.get('chunk_size')
+        )
+
+        return jsonify({'session': upload.to_dict(received_chunks=[])}), 201
+
+    except (UploadError, QuotaExceeded) as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), e.status_code
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'创建上传会话失败: {str(e)}'}), 500
+
+
+@bp.route('/<session_id>', methods=['GET', 'DELETE'])
+@login_required
+def upload_detail(session_id):
+    """查询上传进度（用于断点续传）或放弃上传"""
+    user = request.current_user
+
+    try:
+        upload = get_upload_session(session_id, user.id)
+        if not upload:
+            return jsonify({'error': '上传会话不存在或已过期'}), 404
+
+        if request.method == 'GET':
+            return jsonify({
+                'session': upload.to_dict(received_chunks=chunked_upload.received_chunks(upload))
+            }), 200
+
+        if request.method == 'DELETE':
+            chunked_upload.discard(upload)
+            return jsonify({'message': '上传已取消'}), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/<session_id>/chunks/<int:index>', methods=['PUT'])
+@login_required
+def upload_chunk(session_id, index):
+    """
+    上传单个分片
+
+    请求:
+        请求体为分片的原始字节
+        X-Chunk-Checksum: 分片的SHA-256（十六进制）
+    """
+    user = request.current_user
+
+    try:
+        upload = get_upload_session(session_id, user.id)
+        if not upload:
+            return jsonify({'error': '上传会话不存在或已过期'}), 404
+
+        chunk = chunked_upload.write_chunk(
+            upload,
+            index,
+            request.stream,
+            request.headers.get('X-Chunk-Checksum')
+        )
+
+        return jsonify({
+            'index': chunk.index,
+            'size': chunk.size,
+            'checksum': chunk.checksum
+        }), 200
+
+    except UploadError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), e.status_code
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'分片上传失败: {str(e)}'}), 500
+
+
+@bp.route('/<session_id>/complete', methods=['POST'])
+@login_required
+def complete_upload(session_id):
+    """所有分片上传完成后提交，生成作业文件或项目文件记录"""
+    user = request.current_user
+
+    try:
+        upload = get_upload_session(session_id, user.id)
+        if not upload:
+            return jsonify({'error': '上传会话不存在或已过期'}), 404
+
+        # 提交前再次检查权限，会话创建后用户可能已被移出小组
+        error = check_target(user, upload.target_type, upload.target_id, upload.filename)
+        if error:
+            return jsonify({'error': error[0]}), error[1]
+
+        # 并行的其他上传可能已占用配额，提交前再检查一次
+        check_target_quota(user, upload.target_type, upload.target_id, upload.file_size)
+
+        target_type, target_id, filename = upload.target_type, upload.target_id, upload.filename
+        # 项目文件在计算哈希的同一次读取中检测文本
+        sniffer = TextSniffer(current_app.config['PROJECT_TEXT_INLINE_MAX']) if target_type == 'project' else None
+        blob = chunked_upload.finalize(upload, on_chunk=sniffer.feed if sniffer else None)
+        file_type, _ = guess_type(filename)
+
+        if target_type == 'assignment':
+            _, category = allowed_file(filename)
+            record = AssignmentFile(
+                assignment_id=target_id,
+                user_id=user.id,
+                filename=secure_filename(filename),
+                file_path=blob_store.blob_path(blob.hash),
+                blob_hash=blob.hash,
+                file_size=blob.size,
+                file_type=file_type or 'application/octet-stream',
+                file_category=category,
+                preview_status=previews.initial_status(file_type, blob.hash)
+            )
+        else:
+            record = ProjectFile(
+                project_id=target_id,
+                filename=filename,
+                file_type=file_type or 'application/octet-stream',
+                file_size=blob.size,
+                creator_id=user.id
+            )
+            text = sniffer.finish()
+            if text is not None:
+                # 小文本只保存到content以便在线编辑，不再引用内容块
+                blob_store.release(blob.hash)
+                record.content = text
+                if record.file_type == 'application/octet-stream':
+                    record.file_type = 'text/plain'
+            else:
+                record.blob_hash = blob.hash
+                record.file_path = blob_store.blob_path(blob.hash)
+            record.refresh_content_hash()
+
+        db.session.add(record)
+        db.session.commit()
+
+        if target_type == 'assignment':
+            previews.schedule([record])
+
+        return jsonify({
+            'message': '文件上传成功',
+            'file': record.to_dict()
+        }), 201
+
+    except (UploadError, QuotaExceeded) as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), e.status_code
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'提交上传失败: {str(e)}'}), 500
@@ -4,6 +4,8 @@
 from flask import Blueprint, request, jsonify, current_app
 from app.utils.auth import login_required
 from app.models import WritingSession, WritingItem, db
+from app.utils import content_edit
+from app.utils.content_edit import EditConflict
 from datetime import datetime
 
 bp = Blueprint('writing', __name__)
@@ -274,11 +276,23 @@ def update_item(item_id):
                 'error': '项目不存在'
             }), 404
         
+        merged = False
+        
         # 更新字段
         if 'title' in data:
             item.title = data['title']
         if 'content' in data:
-            item.content = data['content']
+            # If-Match为客户端编辑时的版本，已被修改时自动三方合并
+            try:
+                base_version = content_edit.parse_if_match(request)
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 412
+            merged = content_edit.apply_content_edit(
+                item, 'writing_item', data['content'] or '', base_version, user_id
+            )['merged']
         if 'position_x' in data:
             item.position_x = data['position_x']
         if 'position_y' in data:
@@ -297,11 +311,24 @@ def update_item(item_id):
         
         db.session.commit()
         
-        return jsonify({
+        response = jsonify({
             'success': True,
+            'merged': merged,
             'item': item.to_dict()
-        }), 200
+        })
+        response.set_etag(content_edit.etag(item.version))
+        return response, 200
         
+    except EditConflict as e:
+        db.session.rollback()
+        db.session.refresh(item)
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'current_version': e.current_version,
+            'conflicts': e.conflicts,
+            'item': item.to_dict()
+        }), e.status_code
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f'更新写作项目失败: {str(e)}')
@@ -364,7 +391,11 @@ def clear_all_sessions():
     try:
         user_id = request.current_user_id
         
-        # 删除用户的所有会话（级联删除项目）
+        # 删除用户的所有会话；与删除单个会话一致，会话中的项目保留（解除关联），其修订记录也保留
+        session_ids = db.session.query(WritingSession.id).filter_by(user_id=user_id)
+        WritingItem.query.filter(WritingItem.session_id.in_(session_ids.scalar_subquery())).update(
+            {WritingItem.session_id: None}, synchronize_session=False
+        )
         WritingSession.query.filter_by(user_id=user_id).delete()
         db.session.commit()
         
@@ -1,52 +1,135 @@
 """
 WebSocket路由 - 小组聊天功能
+
+连接时验证JWT（auth参数{"token": ...}、查询参数token或Authorization头），
+用户信息保存在连接的session中，之后的事件不再信任客户端传来的用户ID；
+小组权限通过进程内的成员关系缓存检查，每个事件只做内存查找
 """
-from flask import Blueprint
-from flask_socketio import emit, join_room, leave_room
+from flask import Blueprint, request, session
+from flask_socketio import ConnectionRefusedError, emit, join_room, leave_room
 from app.models import db
-from app.models.message import Message
+from app.models.user import User
+from app.utils import chat_history, chat_writer, membership_cache
+from app.utils.auth import verify_token
+from app.utils.chat_writer import ChatWriteError
 
 bp = Blueprint('ws', __name__)
 
 
+def _connect_token(auth):
+    """从连接参数中取出JWT"""
+    if isinstance(auth, dict) and auth.get('token'):
+        return auth['token']
+    if request.args.get('token'):
+        return request.args['token']
+    header = request.headers.get('Authorization', '')
+    return header.replace('Bearer ', '') or None
+
+
+def _authorized_group(data):
+    """
+    检查当前连接的用户是否可以访问事件中的小组
+
+    Returns:
+        小组ID；无权限时发送错误事件并返回None
+    """
+    group_id = data.get('group_id') if isinstance(data, dict) else None
+    user_id = session.get('user_id')
+    if not group_id or not user_id or not membership_cache.is_member(user_id, group_id):
+        emit('error', {'error': '无权访问该小组', 'group_id': group_id})
+        return None
+    return int(group_id)
+
+
+def _message_id(value):
+    """解析客户端传来的消息ID（字符串形式的雪花ID），无效时返回None"""
+    try:
+        return int(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
 def register_socketio_events(socketio):
     """
     注册SocketIO事件
-    
+
     Args:
         socketio: SocketIO实例
     """
-    
+
     @socketio.on('connect')
-    def handle_connect():
-        """客户端连接"""
-        print('Client connected')
-        emit('connected', {'msg': 'Connected to server'})
-    
+    def handle_connect(auth=None):
+        """客户端连接，验证登录状态并绑定用户"""
+        token = _connect_token(auth)
+        payload = verify_token(token) if token else None
+        user = db.session.get(User, payload['user_id']) if payload else None
+        if not user:
+            raise ConnectionRefusedError('未授权，请先登录')
+
+        session['user_id'] = user.id
+        session['user'] = user.to_dict()
+        # 每个用户一个房间，用于按用户推送和移出小组时找到其所有连接
+        join_room(f'user_{user.id}')
+        emit('connected', {'msg': 'Connected to server', 'user_id': user.id})
+
     @socketio.on('disconnect')
     def handle_disconnect():
         """客户端断开"""
         print('Client disconnected')
-    
+
     @socketio.on('join_group')
     def handle_join_group(data):
-        """加入小组聊天室"""
-        group_id = data.get('group_id')
+        """
+        加入小组聊天室，并发送消息历史
+
+        请求数据:
+            {"group_id": 小组ID, "last_seen_id": 客户端已有的最后一条消息ID（字符串，重连时传入，可选）}
+
+        返回事件message_history:
+            首次加入: 最新一页
+            重连: 只包含缺少的消息（resync为true，客户端按ID去重合并）；
+                  缺少的消息过多时发送最新一页，gap为true表示与客户端已有的消息之间有缺口，可用load_history补齐
+        """
+        group_id = _authorized_group(data)
         if group_id:
             join_room(f'group_{group_id}')
             emit('joined_group', {'group_id': group_id})
-            
-            # 发送最近的消息历史（可选）
+
             try:
-                recent_messages = Message.query.filter_by(
-                    group_id=group_id
-                ).order_by(Message.created_at.desc()).limit(50).all()
-                
-                messages = [msg.to_dict() for msg in recent_messages[::-1]]  # 反转顺序
-                emit('message_history', {'messages': messages})
+                last_seen_id = _message_id(data.get('last_seen_id'))
+                history = chat_history.load_since(group_id, last_seen_id) if last_seen_id else None
+                if history is None:
+                    history = chat_history.load_page(group_id)
+                    history['gap'] = bool(last_seen_id)
+                emit('message_history', history)
             except Exception as e:
+                db.session.rollback()
                 print(f'Error loading message history: {e}')
-    
+
+    @socketio.on('load_history')
+    def handle_load_history(data):
+        """
+        向前翻页读取消息历史
+
+        请求数据:
+            {"group_id": 小组ID, "before": 上一页的next_cursor, "limit": 每页条数（可选）}
+
+        返回事件message_history:
+            {"group_id", "messages", "senders", "next_cursor"}
+        """
+        group_id = _authorized_group(data)
+        if not group_id:
+            return
+
+        try:
+            emit('message_history', chat_history.load_page(group_id, data.get('before'), data.get('limit')))
+        except ValueError:
+            emit('error', {'error': '无效的分页游标'})
+        except Exception as e:
+            db.session.rollback()
+            print(f'Error loading message history: {e}')
+            emit('error', {'error': '加载消息历史失败'})
+
     @socketio.on('leave_group')
     def handle_leave_group(data):
         """离开小组聊天室"""
@@ -54,32 +137,36 @@ def register_socketio_events(socketio):
         if group_id:
             leave_room(f'group_{group_id}')
             emit('left_group', {'group_id': group_id})
-    
+
     @socketio.on('send_message')
     def handle_send_message(data):
-        """发送消息"""
-        group_id = data.get('group_id')
-        content = data.get('content')
-        sender_id = data.get('sender_id')
+        """
+        发送消息
+
+        发送者为连接绑定的用户（忽略客户端传来的sender_id）。
+        消息分配ID后立即广播，由后台线程批量写入数据库；
+        返回值作为客户端的确认回调，CHAT_ACK_MODE为durable时在写入数据库后才返回
+        """
+        group_id = _authorized_group(data)
+        content = data.get('content') if group_id else None
         message_type = data.get('message_type', 'text')
-        
-        if group_id and content and sender_id:
+
+        if group_id and content:
             try:
-                # 保存消息到数据库
-                message = Message(
-                    group_id=group_id,
-                    sender_id=sender_id,
-                    content=content,
-                    message_type=message_type
-                )
-                db.session.add(message)
-                db.session.commit()
-                
+                row = chat_writer.submit(group_id, session['user_id'], content, message_type)
+
                 # 广播消息给房间内所有用户
-                emit('new_message', message.to_dict(), room=f'group_{group_id}')
-                
+                payload = chat_writer.to_payload(row)
+                payload['sender'] = session.get('user')
+                emit('new_message', payload, room=f'group_{group_id}')
+
+                chat_writer.wait_persisted(row['id'])
+                return {'id': payload['id'], 'created_at': payload['created_at']}
+
+            except ChatWriteError as e:
+                emit('error', {'error': str(e), 'message_id': str(row['id'])})
+                return {'error': str(e), 'id': str(row['id'])}
             except Exception as e:
-                print(f'Error saving message: {e}')
+                print(f'Error sending message: {e}')
                 db.session.rollback()
                 emit('error', {'error': '发送消息失败'})
-
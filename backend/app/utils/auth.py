@@ -82,3 +82,28 @@ def login_required(f):
     
     return decorated_function
 
+
+def admin_required(f):
+    """
+    管理员验证装饰器，需要用户邮箱在ADMIN_EMAILS配置中
+    
+    使用示例:
+        @bp.route('/stats')
+        @admin_required
+        def stats():
+            ...
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        user = get_current_user()
+        if not user:
+            return jsonify({'error': '未授权，请先登录'}), 401
+        
+        if user.email not in current_app.config.get('ADMIN_EMAILS', []):
+            return jsonify({'error': '需要管理员权限'}), 403
+        
+        request.current_user = user
+        request.current_user_id = user.id
+        return f(*args, **kwargs)
+    
+    return decorated_function
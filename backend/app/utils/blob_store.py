@@ -0,0 +1,198 @@
+"""
+内容寻址的文件存储
+上传内容边写临时文件边计算哈希，按哈希分目录保存一份，重复上传只增加引用计数；
+引用计数降为0的内容块由后台清理任务（utils/file_gc）删除
+"""
+import glob
+import os
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+from app.models import db
+from app.models.blob import Blob
+from app.models.file_tombstone import FileTombstone
+from app.utils.file_hash import save_stream_with_hash, hash_file
+
+
+def blob_root():
+    """内容块存储根目录"""
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], 'blobs')
+
+
+def blob_path(content_hash):
+    """
+    内容块的存储路径，按哈希前4位分两级目录，避免单目录文件过多
+
+    Args:
+        content_hash: 内容SHA-256
+
+    Returns:
+        文件路径
+    """
+    return os.path.join(blob_root(), content_hash[:2], content_hash[2:4], content_hash)
+
+
+def store_stream(stream, on_chunk=None):
+    """
+    保存上传流，内容已存在时只增加引用计数
+
+    临时文件与内容块位于同一文件系统，确认哈希后原子重命名到最终位置。
+    调用方负责提交数据库事务
+
+    Args:
+        stream: 可读的二进制流
+        on_chunk: 每读到一个数据块时调用（可选）
+
+    Returns:
+        Blob对象
+    """
+    return store_staged(*stage_stream(stream, on_chunk))
+
+
+def stage_stream(stream, on_chunk=None):
+    """
+    把上传流写入存储的临时目录并计算哈希，暂不纳入存储
+
+    调用方根据内容决定调用store_staged纳入存储，或自行删除临时文件
+
+    Returns:
+        tuple: (临时文件路径, 哈希值, 文件大小)
+    """
+    return save_stream_with_hash(stream, temp_dir=temp_dir(), on_chunk=on_chunk)
+
+
+def store_staged(temp_path, content_hash, size):
+    """
+    把stage_stream写好的临时文件纳入存储（文件会被移动）。
+    调用方负责提交数据库事务
+
+    Returns:
+        Blob对象
+    """
+    return _adopt_temp_file(temp_path, content_hash, size)
+
+
+def store_file(temp_path, on_chunk=None):
+    """
+    把已写好的临时文件纳入存储（文件会被移动），按块读取计算哈希，不会整体载入内存
+
+    临时文件应位于blob_root()/tmp下，保证与内容块在同一文件系统。
+    调用方负责提交数据库事务
+
+    Args:
+        temp_path: 临时文件路径
+        on_chunk: 计算哈希时每读到一个数据块时调用（可选）
+
+    Returns:
+        Blob对象
+    """
+    content_hash, size = hash_file(temp_path, on_chunk=on_chunk)
+    return _adopt_temp_file(temp_path, content_hash, size)
+
+
+def temp_dir():
+    """临时文件目录（与内容块位于同一文件系统，便于原子重命名）"""
+    path = os.path.join(blob_root(), 'tmp')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _adopt_temp_file(temp_path, content_hash, size):
+    """
+    把已计算哈希的临时文件纳入存储并增加引用计数
+
+    先增加引用计数再检查物理文件：清理任务删除内容块时持有同一记录的写锁，
+    引用计数增加成功后文件不会再被删除；若文件已被删除则用本次上传的内容补回
+    """
+    final_path = blob_path(content_hash)
+    try:
+        blob = acquire(content_hash, size)
+        _clear_tombstones(content_hash)
+        if os.path.exists(final_path):
+            # 相同内容已存储，丢弃本次写入的临时文件
+            os.remove(temp_path)
+        else:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(temp_path, final_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return blob
+
+
+def _clear_tombstones(content_hash):
+    """
+    撤销对账任务为该内容块（及其预览图）排队的删除
+
+    对账时没有记录的内容块文件会被当作孤立文件排队删除，相同内容在删除前重新上传时复用了该文件，
+    必须在同一事务中撤销；待删除记录中的路径已规范化，按规范化路径比较
+    """
+    prefix = os.path.realpath(blob_path(content_hash))
+    tombstones = FileTombstone.query.filter(FileTombstone.path.like(f'%{content_hash}%')).all()
+    for tombstone in tombstones:
+        if os.path.realpath(tombstone.path).startswith(prefix):
+            db.session.delete(tombstone)
+
+
+def acquire(content_hash, size=0):
+    """
+    增加内容块的引用计数，不存在时创建记录
+
+    Args:
+        content_hash: 内容SHA-256
+        size: 文件大小（创建记录时使用）
+
+    Returns:
+        Blob对象
+    """
+    if not _increment(db.session, content_hash, 1):
+        try:
+            with db.session.begin_nested():
+                db.session.add(Blob(hash=content_hash, size=size, ref_count=1))
+        except IntegrityError:
+            # 并发上传相同内容，记录已由另一请求创建
+            _increment(db.session, content_hash, 1)
+
+    return db.session.get(Blob, content_hash, populate_existing=True)
+
+
+def release(content_hash, connection=None):
+    """
+    减少内容块的引用计数，降为0时记录released_at，由清理任务在宽限期后删除
+
+    可以在mapper事件中调用（传入connection），此时不能使用db.session
+
+    Args:
+        content_hash: 内容SHA-256
+        connection: 数据库连接（可选，默认使用db.session）
+    """
+    executor = connection if connection is not None else db.session
+    _increment(executor, content_hash, -1)
+    executor.execute(
+        update(Blob.__table__)
+        .where(Blob.__table__.c.hash == content_hash, Blob.__table__.c.ref_count <= 0)
+        .values(released_at=datetime.utcnow())
+    )
+
+
+def remove_blob_files(content_hash):
+    """删除内容块的物理文件及其派生文件（如预览图）"""
+    path = blob_path(content_hash)
+    for derived_path in glob.glob(glob.escape(path) + '.*'):
+        os.remove(derived_path)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _increment(executor, content_hash, delta):
+    """原子地调整引用计数，返回是否找到记录；重新被引用时清除released_at"""
+    table = Blob.__table__
+    values = {'ref_count': table.c.ref_count + delta}
+    if delta > 0:
+        values['released_at'] = None
+    result = executor.execute(update(table).where(table.c.hash == content_hash).values(**values))
+    return result.rowcount > 0
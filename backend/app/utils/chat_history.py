@@ -0,0 +1,144 @@
+"""
+小组聊天历史分页
+按(created_at, id)键集分页从新到旧读取，每页只走一次复合索引范围扫描，翻页深度不影响耗时；
+发送者每页批量查询一次，以精简字典随页面返回，不在每条消息中重复完整的用户信息；
+最新一页合并后台写入缓冲中尚未保存的消息；
+重连时按客户端最后收到的消息ID只补发缺少的消息
+"""
+from datetime import datetime
+from typing import Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import tuple_
+
+from app.models import db
+from app.models.message import Message
+from app.models.user import User
+from app.utils import chat_writer
+
+# 重连补发时last_seen_id之前额外补发的消息条数上限
+RESYNC_OVERLAP_ROWS = 20
+
+
+def encode_cursor(message: Message) -> str:
+    """把一页中最早的消息编码为翻页游标"""
+    return f'{message.created_at.isoformat()}_{message.id}'
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    解析翻页游标
+
+    Raises:
+        ValueError: 游标格式不正确
+    """
+    created_at, _, message_id = cursor.rpartition('_')
+    return datetime.fromisoformat(created_at), int(message_id)
+
+
+def load_senders(sender_ids) -> dict:
+    """
+    批量查询发送者的精简信息
+
+    Returns:
+        dict: {用户ID: {"id", "username", "avatar_url"}}
+    """
+    if not sender_ids:
+        return {}
+    rows = db.session.query(User.id, User.username, User.avatar_url).filter(User.id.in_(set(sender_ids))).all()
+    return {row.id: {'id': row.id, 'username': row.username, 'avatar_url': row.avatar_url} for row in rows}
+
+
+def load_page(group_id: int, before: Optional[str] = None, limit: Optional[int] = None) -> dict:
+    """
+    读取一页历史消息
+
+    Args:
+        group_id: 小组ID
+        before: 翻页游标（上一页返回的next_cursor，为空时读取最新一页）
+        limit: 每页条数（默认CHAT_HISTORY_PAGE_SIZE，不超过CHAT_HISTORY_MAX_PAGE_SIZE）
+
+    Returns:
+        dict: {"group_id", "messages": 按时间正序的消息, "senders": {用户ID: 发送者信息},
+               "next_cursor": 更早一页的游标（没有更早的消息时为None）}
+
+    Raises:
+        ValueError: 游标格式不正确
+    """
+    config = current_app.config
+    limit = min(max(int(limit or config['CHAT_HISTORY_PAGE_SIZE']), 1), config['CHAT_HISTORY_MAX_PAGE_SIZE'])
+
+    # 最新一页包含尚未写入数据库的消息（都比数据库中的新），须在查询数据库之前读取
+    pending = [] if before else chat_writer.pending_messages(group_id)
+
+    query = Message.query.filter(Message.group_id == group_id)
+    if before:
+        created_at, message_id = decode_cursor(before)
+        # 行值比较可直接使用(group_id, created_at, id)复合索引定位
+        query = query.filter(tuple_(Message.created_at, Message.id) < tuple_(created_at, message_id))
+
+    # 多取一条判断是否还有更早的消息
+    stored = query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit + 1).all()
+    stored_ids = {m.id for m in stored}
+    rows = [Message(**row) for row in reversed(pending) if row['id'] not in stored_ids] + stored
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    senders = load_senders({m.sender_id for m in rows})
+    return {
+        'group_id': group_id,
+        'messages': [m.to_dict(include_sender=False) for m in reversed(rows)],
+        # JSON对象的键为字符串
+        'senders': {str(user_id): sender for user_id, sender in senders.items()},
+        'next_cursor': encode_cursor(rows[-1]) if has_more else None,
+    }
+
+
+def load_since(group_id: int, last_seen_id: int) -> Optional[dict]:
+    """
+    读取客户端重连时缺少的消息（ID大于last_seen_id），沿(group_id, id)索引范围扫描
+
+    消息由各进程在内存中分配ID后延迟写入，经消息队列转发的广播也有延迟，其他进程稍早分配的消息
+    可能在客户端看到的最后一条之后才送达或写入，因此另外补发last_seen_id之前CHAT_RESYNC_OVERLAP秒内
+    最近的至多RESYNC_OVERLAP_ROWS条消息，客户端按ID去重
+
+    Args:
+        group_id: 小组ID
+        last_seen_id: 客户端已有的最后一条消息ID
+
+    Returns:
+        dict: {"group_id", "messages": 按ID正序的消息, "senders", "next_cursor": None, "resync": True}；
+              缺少的消息超过CHAT_RESYNC_MAX条时返回None，由调用方改为发送最新一页并标记中间有缺口
+    """
+    config = current_app.config
+    cap = config['CHAT_RESYNC_MAX']
+    since_id = last_seen_id - chat_writer.id_span(config['CHAT_RESYNC_OVERLAP'])
+
+    # 尚未写入的消息须在查询数据库之前读取
+    pending = {row['id']: row for row in chat_writer.pending_messages(group_id) if row['id'] > since_id}
+
+    # 多取一条判断缺少的消息是否超过上限
+    missing = Message.query.filter(
+        Message.group_id == group_id,
+        Message.id > last_seen_id
+    ).order_by(Message.id).limit(cap + 1).all()
+    overlap = Message.query.filter(
+        Message.group_id == group_id,
+        Message.id > since_id,
+        Message.id <= last_seen_id
+    ).order_by(Message.id.desc()).limit(RESYNC_OVERLAP_ROWS).all()
+
+    stored_ids = {m.id for m in missing} | {m.id for m in overlap}
+    unsaved = [Message(**row) for message_id, row in pending.items() if message_id not in stored_ids]
+    if len(missing) + sum(1 for m in unsaved if m.id > last_seen_id) > cap:
+        return None
+    rows = sorted(overlap + missing + unsaved, key=lambda m: m.id)
+
+    senders = load_senders({m.sender_id for m in rows})
+    return {
+        'group_id': group_id,
+        'messages': [m.to_dict(include_sender=False) for m in rows],
+        'senders': {str(user_id): sender for user_id, sender in senders.items()},
+        'next_cursor': None,
+        'resync': True,
+    }
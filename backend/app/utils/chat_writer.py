@@ -0,0 +1,341 @@
+"""
+小组聊天消息的后台批量写入
+消息在进程内分配ID和时间后立即广播，由后台线程按条数或时间阈值成批写入数据库，
+一批只提交一次事务（SQLite上一次fsync），写入顺序与分配ID的顺序一致；进程退出时写完缓冲中的消息。
+
+消息ID为雪花ID：毫秒时间戳(41位) | 工作进程号(10位) | 毫秒内序号(12位)，
+同一进程内严格递增，且与created_at的先后一致，历史分页按(created_at, id)排序不受影响。
+多进程部署（配置了SOCKETIO_MESSAGE_QUEUE）时必须为每个进程配置不同的CHAT_WORKER_ID，未配置时启动失败。
+ID超过JavaScript的安全整数范围，发给客户端时一律序列化为字符串
+
+CHAT_ACK_MODE配置:
+    'buffered': 消息进入写入缓冲即确认，延迟最低，进程崩溃时可能丢失最近CHAT_FLUSH_INTERVAL内的消息
+    'durable': 消息所在的批次提交后才确认
+
+消息在写入前已经广播，数据库暂时不可用时批次留在写入线程中一直重试，直到进程退出
+"""
+import atexit
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from app.models import db
+from app.models.message import Message
+
+# 雪花ID的起始时间（2024-01-01 UTC，毫秒）
+EPOCH_MS = 1704067200000
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+# 进程退出时数据库仍不可用，最多再重试的次数
+WRITE_RETRIES = 5
+# 重试间隔上限（秒）
+MAX_RETRY_DELAY = 5
+
+_id_lock = threading.Lock()
+_last_ms = 0
+_sequence = 0
+
+_cond = threading.Condition()
+_buffer = deque()  # 等待写入的消息
+_writing = []  # 正在写入的批次
+_waiters = {}  # 消息ID -> 等待写入结果的事件（durable模式）
+_results = {}  # 消息ID -> 是否写入成功（durable模式，等待方取走后删除）
+_thread = None
+_stopping = False
+_atexit_registered = False
+
+
+class ChatWriteError(Exception):
+    """消息未能在超时前写入数据库"""
+
+    status_code = 503
+
+
+def init_app(app):
+    """
+    检查工作进程号配置，注册进程退出时写完缓冲中的消息
+
+    Args:
+        app: Flask应用实例
+
+    Raises:
+        ValueError: 多进程部署时没有配置CHAT_WORKER_ID，或工作进程号超出范围
+    """
+    global _atexit_registered
+    worker_id = app.config.get('CHAT_WORKER_ID')
+    if worker_id is None:
+        if app.config.get('SOCKETIO_MESSAGE_QUEUE'):
+            # 各进程的工作进程号相同会分配出重复的消息ID，重复的消息写入时被丢弃
+            raise ValueError('配置了SOCKETIO_MESSAGE_QUEUE时必须为每个进程配置不同的CHAT_WORKER_ID')
+    elif not 0 <= int(worker_id) < (1 << WORKER_BITS):
+        raise ValueError(f'CHAT_WORKER_ID必须在0-{(1 << WORKER_BITS) - 1}之间')
+    if not _atexit_registered:
+        atexit.register(shutdown)
+        _atexit_registered = True
+
+
+def _worker_id():
+    """当前进程的工作进程号（单进程部署未配置时为0）"""
+    worker_id = current_app.config.get('CHAT_WORKER_ID')
+    return int(worker_id) if worker_id is not None else 0
+
+
+def next_id():
+    """
+    分配消息ID
+
+    同一毫秒内序号用完或系统时钟回拨时，沿用上一次的时间继续递增，保证ID严格递增
+
+    Returns:
+        tuple: (消息ID, 毫秒时间戳)
+    """
+    global _last_ms, _sequence
+    worker_id = _worker_id()
+    with _id_lock:
+        now = int(time.time() * 1000)
+        if now <= _last_ms:
+            if _sequence < MAX_SEQUENCE:
+                _sequence += 1
+            else:
+                _sequence = 0
+                _last_ms += 1
+            now = _last_ms
+        else:
+            _sequence = 0
+            _last_ms = now
+        message_id = ((now - EPOCH_MS) << (WORKER_BITS + SEQUENCE_BITS)) | (worker_id << SEQUENCE_BITS) | _sequence
+    return message_id, now
+
+
+def id_span(seconds) -> int:
+    """时间跨度对应的消息ID差值（ID的高位为毫秒时间戳）"""
+    return int(seconds * 1000) << (WORKER_BITS + SEQUENCE_BITS)
+
+
+def submit(group_id, sender_id, content, message_type='text'):
+    """
+    接收一条消息：分配ID和时间后放入写入缓冲
+
+    Returns:
+        dict: 消息的字段（与Message.to_dict(include_sender=False)格式相同，created_at为datetime）
+    """
+    message_id, timestamp_ms = next_id()
+    row = {
+        'id': message_id,
+        'group_id': group_id,
+        'sender_id': sender_id,
+        'content': content,
+        'message_type': message_type or 'text',
+        'created_at': datetime(1970, 1, 1) + timedelta(milliseconds=timestamp_ms),
+    }
+    durable = current_app.config['CHAT_ACK_MODE'] == 'durable'
+    with _cond:
+        if durable:
+            _waiters[message_id] = threading.Event()
+        _buffer.append(row)
+        _ensure_thread(current_app._get_current_object())
+        _cond.notify_all()
+    return row
+
+
+def to_payload(row) -> dict:
+    """消息字段转换为与Message.to_dict(include_sender=False)相同的格式（ID为字符串）"""
+    return dict(row, id=str(row['id']), created_at=row['created_at'].isoformat())
+
+
+def wait_persisted(message_id, timeout=None):
+    """
+    等待消息写入数据库（仅对durable模式下提交的消息有效）
+
+    在eventlet等协程模式下以让出的方式等待，不阻塞其他连接
+
+    Raises:
+        ChatWriteError: 超时或写入失败
+    """
+    with _cond:
+        event = _waiters.get(message_id)
+    if event is None:
+        return
+
+    timeout = timeout if timeout is not None else current_app.config['CHAT_ACK_TIMEOUT']
+    if not _wait_event(event, timeout):
+        with _cond:
+            _waiters.pop(message_id, None)
+            _results.pop(message_id, None)
+        raise ChatWriteError('消息保存超时')
+
+    with _cond:
+        _waiters.pop(message_id, None)
+        ok = _results.pop(message_id, False)
+    if not ok:
+        raise ChatWriteError('消息保存失败')
+
+
+def _wait_event(event, timeout):
+    """
+    等待写入线程设置的事件
+
+    eventlet模式下未协程化threading时，写入线程是系统线程，直接等待会阻塞整个事件循环，
+    改为在eventlet的系统线程池中等待，当前协程让出；其他情况下threading.Event.wait本身即可让出
+
+    Returns:
+        bool: 事件是否在超时前被设置
+    """
+    from app import socketio
+
+    if socketio.async_mode == 'eventlet':
+        import eventlet.patcher
+        if not eventlet.patcher.is_monkey_patched('thread'):
+            from eventlet import tpool
+            return tpool.execute(event.wait, timeout)
+    return event.wait(timeout)
+
+
+def pending_messages(group_id):
+    """
+    尚未写入数据库的消息（按ID顺序），读取最新历史时与数据库结果合并，保证刚发送的消息可见
+
+    需在查询数据库之前调用：之后才提交的消息会出现在数据库结果中，由调用方按ID去重
+    """
+    with _cond:
+        return [row for row in list(_writing) + list(_buffer) if row['group_id'] == group_id]
+
+
+def flush(timeout=10):
+    """
+    等待缓冲中的消息全部写入
+
+    Returns:
+        bool: 是否在超时前写完
+    """
+    deadline = time.monotonic() + timeout
+    with _cond:
+        while _buffer or _writing:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            _cond.notify_all()
+            _cond.wait(remaining)
+    return True
+
+
+def shutdown(timeout=10):
+    """停止后台线程，停止前写完缓冲中的消息"""
+    global _thread, _stopping
+    with _cond:
+        thread = _thread
+        _stopping = True
+        _cond.notify_all()
+    if thread is not None:
+        thread.join(timeout)
+    with _cond:
+        _thread = None
+        _stopping = False
+
+
+def _ensure_thread(app):
+    """启动后台写入线程（需持有_cond），线程在该应用上下文中写入"""
+    global _thread
+    if _thread is None or not _thread.is_alive():
+        _thread = threading.Thread(target=_run, args=(app,), name='chat-writer', daemon=True)
+        _thread.start()
+
+
+def _run(app):
+    """后台线程：攒够CHAT_WRITE_BATCH_SIZE条或等待CHAT_FLUSH_INTERVAL秒后写入一批"""
+    global _writing
+    batch_size = app.config['CHAT_WRITE_BATCH_SIZE']
+    interval = app.config['CHAT_FLUSH_INTERVAL']
+
+    while True:
+        with _cond:
+            while not _buffer and not _stopping:
+                _cond.wait()
+            if not _buffer:
+                return
+
+            deadline = time.monotonic() + interval
+            while len(_buffer) < batch_size and not _stopping:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                _cond.wait(remaining)
+
+            _writing = [_buffer.popleft() for _ in range(min(batch_size, len(_buffer)))]
+            batch = _writing
+
+        with app.app_context():
+            try:
+                written = _write_batch(batch)
+            finally:
+                db.session.remove()
+
+        with _cond:
+            for row in batch:
+                event = _waiters.get(row['id'])
+                if event is not None:
+                    _results[row['id']] = row['id'] in written
+                    event.set()
+            _writing = []
+            _cond.notify_all()
+
+
+def _execute(rows):
+    """
+    在一个事务中写入消息，数据库不可用等错误时按指数退避一直重试，直到进程退出时再重试WRITE_RETRIES次
+
+    Raises:
+        IntegrityError: 数据错误（如小组已删除），重试无效
+    """
+    attempt = 0
+    retries_after_stop = 0
+    while True:
+        try:
+            db.session.execute(insert(Message), rows)
+            db.session.commit()
+            return
+        except IntegrityError:
+            db.session.rollback()
+            raise
+        except Exception as e:
+            db.session.rollback()
+            attempt += 1
+            if _stopping:
+                retries_after_stop += 1
+                if retries_after_stop > WRITE_RETRIES:
+                    raise
+            current_app.logger.error(f'保存聊天消息失败（第{attempt}次），稍后重试: {str(e)}')
+            time.sleep(min(2 ** attempt * 0.1, MAX_RETRY_DELAY))
+
+
+def _write_batch(batch):
+    """
+    在一个事务中写入一批消息；数据错误（如小组已删除）时逐条写入，只丢弃本身无法写入的消息
+
+    Returns:
+        set: 成功写入的消息ID
+    """
+    try:
+        _execute(batch)
+        return {row['id'] for row in batch}
+    except IntegrityError:
+        pass
+    except Exception as e:
+        current_app.logger.error(f'进程退出时数据库仍不可用，{len(batch)}条聊天消息未能保存: {str(e)}')
+        return set()
+
+    written = set()
+    for row in batch:
+        try:
+            _execute([row])
+            written.add(row['id'])
+        except Exception as e:
+            current_app.logger.error(f'聊天消息{row["id"]}无法保存，已丢弃: {str(e)}')
+    return written
@@ -0,0 +1,235 @@
+"""
+分片上传工具
+客户端先创建上传会话，再按序号上传分片（可重试、可并行），服务器校验分片后写入预分配文件的对应偏移，
+全部到齐后整体纳入内容块存储，整个过程不会把文件载入内存
+"""
+import hashlib
+import math
+import os
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from app.models import db
+from app.models.upload_session import UploadSession, UploadChunk
+from app.utils import blob_store
+from app.utils.file_hash import CHUNK_SIZE
+from app.utils.scheduler import periodic
+
+
+class UploadError(Exception):
+    """分片上传请求无效"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def session_temp_path(session_id):
+    """会话对应的预分配临时文件路径"""
+    return os.path.join(blob_store.temp_dir(), f'upload_{session_id}')
+
+
+def create_session(user_id, target_type, target_id, filename, file_size, chunk_size=None):
+    """
+    创建上传会话，并按文件总大小预分配临时文件
+
+    Args:
+        user_id: 上传用户ID
+        target_type: 上传目标类型（assignment或project）
+        target_id: 作业ID或项目ID
+        filename: 原始文件名
+        file_size: 文件总大小（字节）
+        chunk_size: 分片大小（可选，默认UPLOAD_CHUNK_SIZE）
+
+    Returns:
+        UploadSession对象
+    """
+    max_file_size = current_app.config['UPLOAD_MAX_FILE_SIZE']
+    if not isinstance(file_size, int) or file_size <= 0:
+        raise UploadError('file_size必须是正整数')
+    if file_size > max_file_size:
+        raise UploadError(f'文件过大，最大允许{max_file_size}字节', 413)
+
+    # 单个分片请求不能超过MAX_CONTENT_LENGTH
+    max_chunk_size = current_app.config['MAX_CONTENT_LENGTH']
+    chunk_size = chunk_size or current_app.config['UPLOAD_CHUNK_SIZE']
+    if not isinstance(chunk_size, int) or chunk_size <= 0 or chunk_size > max_chunk_size:
+        raise UploadError(f'chunk_size必须在1到{max_chunk_size}之间')
+
+    upload = UploadSession(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        target_type=target_type,
+        target_id=target_id,
+        filename=filename,
+        file_size=file_size,
+        chunk_size=chunk_size,
+        chunk_count=math.ceil(file_size / chunk_size)
+    )
+
+    with open(session_temp_path(upload.id), 'wb') as f:
+        f.truncate(file_size)
+
+    db.session.add(upload)
+    db.session.commit()
+    return upload
+
+
+def expected_chunk_size(upload, index):
+    """分片的应有大小（最后一片为剩余字节数）"""
+    if index == upload.chunk_count - 1:
+        return upload.file_size - upload.chunk_size * index
+    return upload.chunk_size
+
+
+def write_chunk(upload, index, stream, checksum):
+    """
+    接收分片：先写入单独的临时文件并校验大小和SHA-256，通过后再复制到预分配文件的对应偏移
+
+    校验失败的重传不会覆盖已确认分片的数据；同一分片重复上传会覆盖原数据，
+    不同分片写入互不重叠的区域，可以并行
+
+    Args:
+        upload: UploadSession对象
+        index: 分片序号（从0开始）
+        stream: 请求体流
+        checksum: 客户端计算的分片SHA-256
+
+    Returns:
+        UploadChunk对象
+    """
+    if upload.status != 'uploading':
+        raise UploadError('上传会话已提交', 409)
+    if index < 0 or index >= upload.chunk_count:
+        raise UploadError(f'分片序号超出范围（0-{upload.chunk_count - 1}）')
+    if not checksum:
+        raise UploadError('缺少分片校验值（X-Chunk-Checksum）')
+
+    expected = expected_chunk_size(upload, index)
+    # 文件名以会话的临时文件名开头，对账时归属于该会话
+    part_path = f'{session_temp_path(upload.id)}.{index}.{uuid.uuid4().hex}.part'
+    try:
+        hasher = hashlib.sha256()
+        size = 0
+        with open(part_path, 'wb') as part:
+            while size <= expected:
+                data = stream.read(min(CHUNK_SIZE, expected + 1 - size))
+                if not data:
+                    break
+                if size + len(data) > expected:
+                    raise UploadError(f'分片大小错误，应为{expected}字节')
+                part.write(data)
+                hasher.update(data)
+                size += len(data)
+
+        if size != expected:
+            raise UploadError(f'分片大小错误，应为{expected}字节')
+        if hasher.hexdigest() != checksum.lower():
+            raise UploadError('分片校验失败，请重新上传该分片')
+
+        with open(part_path, 'rb') as part, open(session_temp_path(upload.id), 'r+b') as f:
+            f.seek(index * upload.chunk_size)
+            while True:
+                data = part.read(CHUNK_SIZE)
+                if not data:
+                    break
+                f.write(data)
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+    chunk = UploadChunk.query.filter_by(session_id=upload.id, index=index).first()
+    if chunk:
+        chunk.size = size
+        chunk.checksum = checksum.lower()
+    else:
+        chunk = UploadChunk(session_id=upload.id, index=index, size=size, checksum=checksum.lower())
+        try:
+            with db.session.begin_nested():
+                db.session.add(chunk)
+        except IntegrityError:
+            # 同一分片的并发重传已记录
+            chunk = UploadChunk.query.filter_by(session_id=upload.id, index=index).first()
+
+    upload.updated_at = datetime.utcnow()
+    db.session.commit()
+    return chunk
+
+
+def received_chunks(upload):
+    """已接收的分片序号列表"""
+    rows = db.session.query(UploadChunk.index).filter_by(session_id=upload.id).order_by(UploadChunk.index).all()
+    return [row[0] for row in rows]
+
+
+def finalize(upload, on_chunk=None):
+    """
+    检查分片是否齐全，把临时文件纳入内容块存储并删除会话
+
+    调用方负责创建文件记录并提交数据库事务；提交前出错时应调用db.session.rollback()
+
+    Args:
+        upload: UploadSession对象
+        on_chunk: 计算哈希时每读到一个数据块时调用（可选，如TextSniffer.feed）
+
+    Returns:
+        Blob对象
+    """
+    received = received_chunks(upload)
+    if len(received) != upload.chunk_count:
+        missing = sorted(set(range(upload.chunk_count)) - set(received))
+        raise UploadError(f'还有{len(missing)}个分片未上传: {missing[:20]}', 409)
+
+    # 标记为提交中，防止重复提交同一会话
+    claimed = UploadSession.query.filter_by(id=upload.id, status='uploading').update(
+        {UploadSession.status: 'committing'},
+        synchronize_session=False
+    )
+    db.session.commit()
+    if not claimed:
+        raise UploadError('上传会话正在提交', 409)
+
+    try:
+        blob = blob_store.store_file(session_temp_path(upload.id), on_chunk=on_chunk)
+    except Exception:
+        db.session.rollback()
+        UploadSession.query.filter_by(id=upload.id).update(
+            {UploadSession.status: 'uploading'},
+            synchronize_session=False
+        )
+        db.session.commit()
+        raise
+
+    db.session.delete(upload)
+    return blob
+
+
+def discard(upload):
+    """
+    放弃上传会话，删除临时文件和分片记录
+
+    Args:
+        upload: UploadSession对象
+    """
+    path = session_temp_path(upload.id)
+    if os.path.exists(path):
+        os.remove(path)
+    db.session.delete(upload)
+    db.session.commit()
+
+
+@periodic('UPLOAD_SESSION_CLEANUP_INTERVAL', 600)
+def cleanup_expired_sessions():
+    """
+    清理超过UPLOAD_SESSION_TTL未活动的上传会话
+
+    Returns:
+        清理的会话数
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['UPLOAD_SESSION_TTL'])
+    expired = UploadSession.query.filter(UploadSession.updated_at < cutoff).limit(100).all()
+    for upload in expired:
+        discard(upload)
+    return len(expired)
@@ -0,0 +1,228 @@
+"""
+内容缓存工具
+按内容哈希缓存提取文本和AI分析结果，重复上传同一文件时跳过解析和大模型调用；
+提取文本的键包含提取器版本和字符上限，升级提取器或调整上限后旧结果不再命中
+"""
+import json
+from datetime import datetime
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from app.models import db
+from app.models.content_cache import ExtractedText, AnalysisResult
+from app.utils.extractors import EXTRACTOR_VERSION, default_max_chars, extract_text
+
+# 每轮淘汰时最多查询的候选条目数
+EVICT_BATCH_SIZE = 100
+
+
+def get_extracted_text(content_hash, max_chars):
+    """
+    查询文件内容哈希在当前提取器版本和字符上限下的提取文本，命中时更新命中次数和最近使用时间
+
+    Args:
+        content_hash: 原始文件内容的SHA-256
+        max_chars: 提取字符上限（0表示不限）
+
+    Returns:
+        tuple: (文本, 是否被截断)；未命中时返回None
+    """
+    entry = ExtractedText.query.filter_by(
+        content_hash=content_hash,
+        extractor_version=EXTRACTOR_VERSION,
+        max_chars=max_chars or 0
+    ).first()
+    if not entry:
+        return None
+
+    entry.hit_count = (entry.hit_count or 0) + 1
+    entry.last_used_at = datetime.utcnow()
+    db.session.commit()
+    return entry.text, entry.truncated
+
+
+def put_extracted_text(content_hash, max_chars, text, truncated):
+    """
+    缓存提取文本
+
+    Args:
+        content_hash: 原始文件内容的SHA-256
+        max_chars: 提取时的字符上限（0表示不限）
+        text: 提取出的文本
+        truncated: 是否因达到字符上限被截断
+    """
+    entry = ExtractedText(
+        content_hash=content_hash,
+        extractor_version=EXTRACTOR_VERSION,
+        max_chars=max_chars or 0,
+        truncated=bool(truncated),
+        text=text,
+        size_bytes=len(text.encode('utf-8'))
+    )
+    _insert_and_evict(entry)
+
+
+def extract_cached(path, filename, content_hash=None):
+    """
+    通过提取器注册表提取文件文本，按内容哈希缓存
+
+    Args:
+        path: 文件路径
+        filename: 原始文件名
+        content_hash: 文件内容哈希（为空时不使用缓存）
+
+    Returns:
+        tuple: (文本, 是否被截断, 是否命中缓存)
+
+    Raises:
+        ExtractionError: 格式不支持或解析失败
+    """
+    max_chars = default_max_chars()
+    if content_hash:
+        cached = get_extracted_text(content_hash, max_chars)
+        if cached is not None:
+            return cached[0], cached[1], True
+
+    text, truncated = extract_text(path, filename, max_chars=max_chars)
+    if content_hash:
+        put_extracted_text(content_hash, max_chars, text, truncated)
+    return text, truncated, False
+
+
+def get_analysis(text_hash, file_type, prompt_version, model):
+    """
+    查询文本哈希对应的AI分析结果
+
+    Args:
+        text_hash: 文本内容的SHA-256
+        file_type: 文件类型
+        prompt_version: 提示词版本
+        model: 提供商和模型标识（llm_providers.current_model_id）
+
+    Returns:
+        分析结果字典或None
+    """
+    entry = AnalysisResult.query.filter_by(
+        text_hash=text_hash,
+        file_type=file_type,
+        prompt_version=prompt_version,
+        model=model
+    ).first()
+    if not entry:
+        return None
+
+    entry.hit_count = (entry.hit_count or 0) + 1
+    entry.last_used_at = datetime.utcnow()
+    db.session.commit()
+    return json.loads(entry.result)
+
+
+def put_analysis(text_hash, file_type, prompt_version, model, result):
+    """
+    缓存AI分析结果（只应缓存成功的结果）
+
+    Args:
+        text_hash: 文本内容的SHA-256
+        file_type: 文件类型
+        prompt_version: 提示词版本
+        model: 提供商和模型标识
+        result: 分析结果字典
+    """
+    payload = json.dumps(result, ensure_ascii=False)
+    entry = AnalysisResult(
+        text_hash=text_hash,
+        file_type=file_type,
+        prompt_version=prompt_version,
+        model=model,
+        result=payload,
+        size_bytes=len(payload.encode('utf-8'))
+    )
+    _insert_and_evict(entry)
+
+
+def _insert_and_evict(entry):
+    """写入缓存条目，并发写入同一键时忽略冲突，然后按容量淘汰"""
+    try:
+        db.session.add(entry)
+        db.session.commit()
+    except IntegrityError:
+        # 另一个请求已写入相同内容
+        db.session.rollback()
+        return
+
+    evict_if_needed()
+
+
+def get_total_bytes():
+    """获取缓存当前占用的总字节数"""
+    text_bytes = db.session.query(db.func.coalesce(db.func.sum(ExtractedText.size_bytes), 0)).scalar()
+    analysis_bytes = db.session.query(db.func.coalesce(db.func.sum(AnalysisResult.size_bytes), 0)).scalar()
+    return int(text_bytes) + int(analysis_bytes)
+
+
+def evict_if_needed():
+    """
+    缓存超过CONTENT_CACHE_MAX_BYTES时，按最近使用时间淘汰最旧的条目
+
+    Returns:
+        淘汰的条目数
+    """
+    max_bytes = current_app.config.get('CONTENT_CACHE_MAX_BYTES')
+    if not max_bytes:
+        return 0
+
+    total = get_total_bytes()
+    evicted = 0
+    while total > max_bytes:
+        # 两张表各取最旧的一批，合并后按最近使用时间淘汰
+        candidates = (
+            ExtractedText.query.order_by(ExtractedText.last_used_at.asc()).limit(EVICT_BATCH_SIZE).all() +
+            AnalysisResult.query.order_by(AnalysisResult.last_used_at.asc()).limit(EVICT_BATCH_SIZE).all()
+        )
+        if not candidates:
+            break
+        candidates.sort(key=lambda e: e.last_used_at or datetime.min)
+
+        for entry in candidates:
+            if total <= max_bytes:
+                break
+            total -= entry.size_bytes or 0
+            db.session.delete(entry)
+            evicted += 1
+        db.session.commit()
+
+    return evicted
+
+
+def get_stats():
+    """
+    获取缓存统计信息
+
+    去重率 = 命中次数 / 总请求次数，其中总请求次数 = 条目数（首次请求）+ 命中次数
+
+    Returns:
+        统计信息字典
+    """
+    def table_stats(model):
+        entries, size, hits = db.session.query(
+            db.func.count(model.id),
+            db.func.coalesce(db.func.sum(model.size_bytes), 0),
+            db.func.coalesce(db.func.sum(model.hit_count), 0)
+        ).one()
+        requests = int(entries) + int(hits)
+        return {
+            'entries': int(entries),
+            'bytes': int(size),
+            'hits': int(hits),
+            'requests': requests,
+            'dedupe_ratio': round(int(hits) / requests, 4) if requests else 0.0,
+        }
+
+    text_stats = table_stats(ExtractedText)
+    analysis_stats = table_stats(AnalysisResult)
+    return {
+        'max_bytes': current_app.config.get('CONTENT_CACHE_MAX_BYTES'),
+        'total_bytes': text_stats['bytes'] + analysis_stats['bytes'],
+        'extracted_text': text_stats,
+        'analysis': analysis_stats,
+    }
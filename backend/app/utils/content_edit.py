@@ -0,0 +1,184 @@
+"""
+在线编辑的乐观并发控制
+项目文件和写作项目的内容带有版本号，ETag为"v<版本号>"。客户端通过If-Match提交基于的版本：
+版本一致时直接保存；已被他人修改时以该版本为共同基础三方合并，修改区域不重叠则自动合并，
+重叠时返回冲突。每个版本的内容以增量链保存在版本对象存储中，只保留最近CONTENT_REVISION_KEEP个版本，
+裁剪掉的版本内容不再被引用后由vcs.collect_unreachable回收
+"""
+import re
+from typing import Optional
+
+from flask import current_app
+from sqlalchemy import delete, event
+from sqlalchemy.exc import IntegrityError
+
+from app.models import db
+from app.models.content_revision import ContentRevision
+from app.models.project import ProjectFile
+from app.models.writing_space import WritingItem
+from app.utils.vcs import objects
+from app.utils.vcs.merge import MergeConflict, merge3
+
+# 支持乐观并发控制的模型
+TARGET_MODELS = {
+    'project_file': ProjectFile,
+    'writing_item': WritingItem,
+}
+
+# 并发保存时重新合并的次数上限
+MAX_ATTEMPTS = 3
+
+_ETAG_PATTERN = re.compile(r'^v(\d+)$')
+
+
+class EditConflict(Exception):
+    """内容修改与他人的修改冲突"""
+
+    status_code = 409
+
+    def __init__(self, message, current_version, conflicts=None):
+        super().__init__(message)
+        self.current_version = current_version
+        self.conflicts = conflicts or []
+
+
+def etag(version) -> str:
+    """版本号对应的ETag（不含引号）"""
+    return f'v{version or 1}'
+
+
+def parse_if_match(request) -> Optional[int]:
+    """
+    从If-Match请求头解析客户端基于的版本号
+
+    Returns:
+        版本号；没有If-Match或为*时返回None（不做并发检查）
+
+    Raises:
+        ValueError: If-Match不是本接口返回的ETag
+    """
+    if not request.if_match or request.if_match.star_tag:
+        return None
+    for tag in request.if_match.as_set():
+        match = _ETAG_PATTERN.match(tag)
+        if match:
+            return int(match.group(1))
+    raise ValueError('If-Match无效')
+
+
+def _revision_hash(target_type, target_id, version) -> Optional[str]:
+    """查询某个版本的内容哈希"""
+    return db.session.query(ContentRevision.content_hash).filter_by(
+        target_type=target_type, target_id=target_id, version=version
+    ).scalar()
+
+
+def _record_revision(target_type, target_id, version, content, author_id, base_hash=None) -> str:
+    """记录版本内容（相对于上一版本保存增量）"""
+    content_hash = objects.store_text(content, base_hash=base_hash)
+    db.session.add(ContentRevision(
+        target_type=target_type,
+        target_id=target_id,
+        version=version,
+        content_hash=content_hash,
+        author_id=author_id
+    ))
+    return content_hash
+
+
+def apply_content_edit(target, target_type, content, base_version, author_id) -> dict:
+    """
+    保存内容修改，必要时与他人的修改三方合并
+
+    以条件更新（版本号未变才加1）占用新版本，期间有其他保存时重新读取并合并。
+    调用方负责提交数据库事务；content以外的字段（如file_size）由调用方根据target.content更新
+
+    Args:
+        target: ProjectFile或WritingItem对象
+        target_type: TARGET_MODELS中的键
+        content: 客户端提交的内容
+        base_version: 客户端基于的版本号（None表示不做并发检查，直接覆盖）
+        author_id: 修改者ID
+
+    Returns:
+        dict: {"version": 新版本号, "merged": 是否进行了自动合并}
+
+    Raises:
+        EditConflict: 修改区域重叠，或基础版本已不可用
+    """
+    model = TARGET_MODELS[target_type]
+    max_edits = current_app.config['VCS_DIFF_MAX_EDITS']
+
+    for _ in range(MAX_ATTEMPTS):
+        current_version = target.version or 1
+        current = target.content or ''
+        new_content = content
+        merged = False
+
+        if base_version is not None and base_version != current_version:
+            base_hash = _revision_hash(target_type, target.id, base_version) if base_version < current_version else None
+            if base_hash is None:
+                raise EditConflict('内容已被修改，且无法获取所基于的版本，请刷新后重试', current_version)
+            try:
+                new_content = merge3(objects.load_text(base_hash), current, content, max_edits)
+            except MergeConflict as e:
+                raise EditConflict('与他人的修改冲突，请合并后重试', current_version, e.conflicts)
+            merged = True
+
+        # 首次编辑时补记当前版本，作为之后合并的基础（并发补记同一版本时忽略）
+        current_hash = _revision_hash(target_type, target.id, current_version)
+        if current_hash is None:
+            try:
+                with db.session.begin_nested():
+                    current_hash = _record_revision(target_type, target.id, current_version, current, None)
+            except IntegrityError:
+                current_hash = _revision_hash(target_type, target.id, current_version)
+
+        claimed = model.query.filter(
+            model.id == target.id,
+            model.version == current_version
+        ).update({model.version: current_version + 1}, synchronize_session=False)
+        if claimed:
+            break
+        # 其他请求已保存新版本，重新读取后再合并
+        db.session.refresh(target)
+    else:
+        raise EditConflict('内容正在被频繁修改，请稍后重试', target.version)
+
+    new_version = current_version + 1
+    target.version = new_version
+    target.content = new_content
+    _record_revision(target_type, target.id, new_version, new_content, author_id, base_hash=current_hash)
+
+    keep = current_app.config['CONTENT_REVISION_KEEP']
+    ContentRevision.query.filter(
+        ContentRevision.target_type == target_type,
+        ContentRevision.target_id == target.id,
+        ContentRevision.version <= new_version - keep
+    ).delete(synchronize_session=False)
+
+    return {'version': new_version, 'merged': merged}
+
+
+def bump_version(target):
+    """
+    内容被编辑以外的方式整体替换时（如恢复为某个提交）使版本号加1，
+    持有旧ETag的客户端之后的保存会与新内容合并而不是直接覆盖
+
+    文本内容应使用apply_content_edit(base_version=None)以记录修订，作为之后合并的基础
+    """
+    target.version = (target.version or 1) + 1
+
+
+def _on_target_deleted(mapper, connection, target):
+    """对象删除后（包括级联删除）在同一事务中删除其修订记录，避免ID被复用时误作合并基础"""
+    target_type = next(key for key, model in TARGET_MODELS.items() if isinstance(target, model))
+    table = ContentRevision.__table__
+    connection.execute(delete(table).where(table.c.target_type == target_type, table.c.target_id == target.id))
+
+
+def register_events():
+    """注册对象删除事件（在create_app中调用）"""
+    for model in TARGET_MODELS.values():
+        if not event.contains(model, 'after_delete', _on_target_deleted):
+            event.listen(model, 'after_delete', _on_target_deleted)
@@ -0,0 +1,22 @@
+"""
+文本提取器模块
+按扩展名和文件头嗅探的MIME类型选择提取器，支持按页/幻灯片/工作表并行提取
+"""
+from .base import TextExtractor, ExtractionError, ExtractorUnavailableError, UnsupportedFormatError
+from .registry import (
+    EXTRACTOR_VERSION, ExtractorRegistry, registry, sniff_mime, iter_text, extract_text, default_max_chars,
+)
+
+__all__ = [
+    'TextExtractor',
+    'ExtractionError',
+    'ExtractorUnavailableError',
+    'UnsupportedFormatError',
+    'EXTRACTOR_VERSION',
+    'ExtractorRegistry',
+    'registry',
+    'sniff_mime',
+    'iter_text',
+    'extract_text',
+    'default_max_chars',
+]
@@ -0,0 +1,219 @@
+"""
+文本提取器基类
+定义统一的接口规范，文档按页/幻灯片/工作表拆分为独立单元，便于并行提取
+"""
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import wait
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional, Tuple
+
+
+class ExtractionError(Exception):
+    """文本提取失败"""
+    pass
+
+
+class ExtractorUnavailableError(ExtractionError):
+    """提取器依赖的第三方库未安装"""
+    pass
+
+
+class UnsupportedFormatError(ExtractionError):
+    """没有可处理该文件格式的提取器"""
+    pass
+
+
+class _DocumentPool:
+    """
+    文档句柄池：并行提取时每个单元从池中借出一个句柄，用完归还
+
+    第三方解析库的文档对象通常不是线程安全的，同一时刻一个句柄只由一个线程使用；
+    每个句柄都是整份文档的一个副本，数量不超过max_docs，内存不随线程数增长。
+    句柄只在一次提取调用内有效，调用结束后统一关闭
+    """
+
+    def __init__(self, opener: Callable[[str], Any], path: str, max_docs: int = 1):
+        self._opener = opener
+        self._path = path
+        self._max_docs = max(1, max_docs)
+        self._docs = []
+        self._idle = []
+        self._opening = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def borrow(self):
+        with self._cond:
+            while not self._idle and len(self._docs) + self._opening >= self._max_docs:
+                self._cond.wait()
+            doc = self._idle.pop() if self._idle else None
+            if doc is None:
+                self._opening += 1
+
+        if doc is None:
+            # 在锁外打开，解析期间其他线程仍可借还已有的句柄
+            try:
+                doc = self._opener(self._path)
+            finally:
+                with self._cond:
+                    self._opening -= 1
+                    if doc is not None:
+                        self._docs.append(doc)
+                    self._cond.notify()
+
+        try:
+            yield doc
+        finally:
+            with self._cond:
+                self._idle.append(doc)
+                self._cond.notify()
+
+    def close(self, closer: Callable[[Any], None]):
+        with self._cond:
+            docs, self._docs, self._idle = self._docs, [], []
+        for doc in docs:
+            closer(doc)
+
+
+class TextExtractor(ABC):
+    """
+    文本提取器抽象基类
+
+    子类声明可处理的扩展名和MIME类型，并实现打开文档、统计单元数和提取单个单元三个方法
+    """
+
+    # 提取器名称
+    name: str = ''
+    # 可处理的文件扩展名（小写，不含点）
+    extensions: Tuple[str, ...] = ()
+    # 可处理的MIME类型（由文件头嗅探得到）
+    mime_types: Tuple[str, ...] = ()
+    # 拼接各单元文本时使用的分隔符
+    separator: str = '\n\n'
+    # 文档在open时已完整解析、提取单元只读取时为True：只打开一份，由各线程共用
+    shared_document: bool = False
+
+    @abstractmethod
+    def open(self, path: str) -> Any:
+        """
+        打开文档
+
+        Args:
+            path: 文件路径
+
+        Returns:
+            文档对象（由子类自行定义）
+        """
+        pass
+
+    @abstractmethod
+    def unit_count(self, doc: Any) -> int:
+        """
+        统计文档的单元数（页、幻灯片或工作表）
+
+        Args:
+            doc: open返回的文档对象
+
+        Returns:
+            int: 单元数
+        """
+        pass
+
+    @abstractmethod
+    def extract_unit(self, doc: Any, index: int) -> str:
+        """
+        提取单个单元的文本
+
+        Args:
+            doc: open返回的文档对象（shared_document为False时由当前单元独占）
+            index: 单元序号（从0开始）
+
+        Returns:
+            str: 单元文本
+        """
+        pass
+
+    def close(self, doc: Any):
+        """
+        关闭文档，释放文件句柄（默认无需处理）
+
+        Args:
+            doc: open返回的文档对象
+        """
+        pass
+
+    def iter_text(self, path: str, executor=None, window: int = 4, max_docs: Optional[int] = None) -> Iterator[str]:
+        """
+        按单元顺序逐个产出文本
+
+        有线程池时以滑动窗口提交单元并行提取，结果仍按原顺序产出；
+        调用方停止迭代（如达到字符上限）时，尚未开始的单元会被取消。
+        shared_document为False时每个并行单元需要一份文档副本，副本数不超过max_docs，
+        只允许一份时串行提取
+
+        Args:
+            path: 文件路径
+            executor: 线程池（可选，为None时串行提取）
+            window: 同时在途的最大单元数
+            max_docs: 同时打开的文档副本数上限（可选，默认等于window）
+
+        Yields:
+            str: 每个单元的文本
+        """
+        if self.shared_document:
+            max_docs = 1
+        else:
+            max_docs = max(1, min(window, max_docs or window))
+            window = max_docs
+        pool = _DocumentPool(self.open, path, max_docs)
+        pending = deque()
+        try:
+            with pool.borrow() as doc:
+                total = self.unit_count(doc)
+                if executor is None or total <= 1 or window <= 1:
+                    for index in range(total):
+                        yield self.extract_unit(doc, index)
+                    return
+
+            if self.shared_document:
+                def run(index):
+                    return self.extract_unit(doc, index)
+            else:
+                def run(index):
+                    with pool.borrow() as unit_doc:
+                        return self.extract_unit(unit_doc, index)
+
+            next_index = 0
+            while next_index < total or pending:
+                while next_index < total and len(pending) < window:
+                    pending.append(executor.submit(run, next_index))
+                    next_index += 1
+                yield pending.popleft().result()
+        finally:
+            # 取消未开始的单元，等待正在执行的单元结束后再关闭文档
+            for future in pending:
+                future.cancel()
+            wait(pending)
+            pool.close(self.close)
+
+    @staticmethod
+    def require(module_name: str, package_name: Optional[str] = None) -> Any:
+        """
+        导入可选依赖，未安装时抛出ExtractorUnavailableError
+
+        Args:
+            module_name: 模块名
+            package_name: pip包名（可选，默认与模块名相同）
+
+        Returns:
+            导入的模块
+        """
+        import importlib
+        try:
+            return importlib.import_module(module_name)
+        except ImportError:
+            raise ExtractorUnavailableError(
+                f'解析该文件需要安装{package_name or module_name}库。请运行: pip install {package_name or module_name}'
+            )
@@ -0,0 +1,24 @@
+"""
+PDF文档提取器
+"""
+from typing import Any
+
+from .base import TextExtractor
+
+
+class PdfExtractor(TextExtractor):
+    """PDF文档提取器（依赖pypdf），按页并行提取"""
+
+    name = 'pdf'
+    extensions = ('pdf',)
+    mime_types = ('application/pdf',)
+
+    def open(self, path: str) -> Any:
+        pypdf = self.require('pypdf')
+        return pypdf.PdfReader(path)
+
+    def unit_count(self, doc: Any) -> int:
+        return len(doc.pages)
+
+    def extract_unit(self, doc: Any, index: int) -> str:
+        return doc.pages[index].extract_text() or ''
@@ -0,0 +1,42 @@
+"""
+纯文本提取器
+"""
+import codecs
+from typing import Any, Iterator
+
+from .base import TextExtractor
+
+# 每次读取的字节数
+READ_SIZE = 64 * 1024
+
+
+class PlainTextExtractor(TextExtractor):
+    """纯文本提取器，按块流式解码，不把整个文件读入内存"""
+
+    name = 'plain'
+    extensions = ('txt', 'md', 'csv', 'json', 'xml', 'html', 'htm', 'py', 'js', 'ts', 'java', 'c', 'cpp', 'h')
+    mime_types = ('text/plain',)
+    separator = ''
+
+    def open(self, path: str) -> Any:
+        return path
+
+    def unit_count(self, doc: Any) -> int:
+        return 1
+
+    def extract_unit(self, doc: Any, index: int) -> str:
+        return ''.join(self.iter_text(doc))
+
+    def iter_text(self, path: str, executor=None, window: int = 4) -> Iterator[str]:
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(READ_SIZE)
+                if not chunk:
+                    break
+                text = decoder.decode(chunk)
+                if text:
+                    yield text
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield tail
@@ -0,0 +1,33 @@
+"""
+PowerPoint演示文稿提取器
+"""
+from typing import Any
+
+from .base import TextExtractor
+
+
+class PresentationExtractor(TextExtractor):
+    """PowerPoint演示文稿提取器（依赖python-pptx），按幻灯片并行提取"""
+
+    name = 'presentation'
+    extensions = ('pptx',)
+    mime_types = ('application/vnd.openxmlformats-officedocument.presentationml.presentation',)
+    # python-pptx打开时已解析全部幻灯片，提取只读取形状文本，各线程共用同一份
+    shared_document = True
+
+    def open(self, path: str) -> Any:
+        pptx = self.require('pptx', 'python-pptx')
+        return list(pptx.Presentation(path).slides)
+
+    def unit_count(self, doc: Any) -> int:
+        return len(doc)
+
+    def extract_unit(self, doc: Any, index: int) -> str:
+        lines = []
+        for shape in doc[index].shapes:
+            if shape.has_text_frame:
+                lines.append(shape.text_frame.text)
+            elif getattr(shape, 'has_table', False) and shape.has_table:
+                for row in shape.table.rows:
+                    lines.append('\t'.join(cell.text for cell in row.cells))
+        return '\n'.join(line for line in lines if line)
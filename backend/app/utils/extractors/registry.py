@@ -0,0 +1,223 @@
+"""
+文本提取器注册表
+根据文件头嗅探的MIME类型和扩展名选择提取器，并提供带字符上限的流式提取
+"""
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, Optional, Tuple, Type
+
+from flask import current_app
+
+from .base import TextExtractor, UnsupportedFormatError
+from .word import WordExtractor
+from .pdf import PdfExtractor
+from .presentation import PresentationExtractor
+from .spreadsheet import SpreadsheetExtractor
+from .plain import PlainTextExtractor
+
+# 提取器版本：修改提取器或注册表的输出后递增，使按内容哈希缓存的旧提取结果失效
+EXTRACTOR_VERSION = '1'
+
+# 嗅探时读取的文件头字节数
+SNIFF_SIZE = 8 * 1024
+
+# OOXML压缩包内的目录前缀与MIME类型对应关系
+OOXML_PREFIXES = {
+    'word/': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'ppt/': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+    'xl/': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+class ExtractorRegistry:
+    """提取器注册表，按扩展名和MIME类型索引"""
+
+    def __init__(self):
+        self._by_extension: Dict[str, TextExtractor] = {}
+        self._by_mime: Dict[str, TextExtractor] = {}
+
+    def register(self, extractor_class: Type[TextExtractor]) -> Type[TextExtractor]:
+        """
+        注册提取器（可作为类装饰器使用）
+
+        Args:
+            extractor_class: TextExtractor子类
+
+        Returns:
+            原提取器类
+        """
+        extractor = extractor_class()
+        for ext in extractor.extensions:
+            self._by_extension[ext.lower()] = extractor
+        for mime in extractor.mime_types:
+            self._by_mime[mime] = extractor
+        return extractor_class
+
+    def get(self, path: str, filename: Optional[str] = None) -> TextExtractor:
+        """
+        为文件选择提取器
+
+        文件头嗅探结果优先于扩展名：改了扩展名的PDF仍按PDF解析，
+        能识别出二进制格式但没有对应提取器时直接拒绝，避免把二进制当文本读出乱码
+
+        Args:
+            path: 文件路径
+            filename: 原始文件名（可选，用于取扩展名）
+
+        Returns:
+            TextExtractor: 提取器实例
+        """
+        mime = sniff_mime(path)
+        if mime in self._by_mime:
+            return self._by_mime[mime]
+
+        if mime == 'application/octet-stream':
+            name = filename or path
+            ext = name.rsplit('.', 1)[1].lower() if '.' in name else ''
+            if ext in self._by_extension:
+                return self._by_extension[ext]
+        raise UnsupportedFormatError(f'不支持提取该格式的文本: {mime}')
+
+
+def sniff_mime(path: str) -> str:
+    """
+    根据文件头判断MIME类型
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        str: MIME类型，无法识别的二进制文件返回application/octet-stream
+    """
+    with open(path, 'rb') as f:
+        head = f.read(SNIFF_SIZE)
+
+    if head.startswith(b'%PDF-'):
+        return 'application/pdf'
+    if head.startswith(b'PK\x03\x04'):
+        try:
+            with zipfile.ZipFile(path) as zf:
+                for name in zf.namelist():
+                    for prefix, mime in OOXML_PREFIXES.items():
+                        if name.startswith(prefix):
+                            return mime
+        except zipfile.BadZipFile:
+            pass
+        return 'application/zip'
+    if head.startswith(b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'):
+        # 旧版Office（doc/xls/ppt）复合文档格式
+        return 'application/x-ole-storage'
+    if head.startswith((b'\x89PNG', b'\xff\xd8\xff', b'GIF8', b'BM', b'RIFF')):
+        return 'image/*'
+    if not head or _looks_like_text(head):
+        return 'text/plain'
+    return 'application/octet-stream'
+
+
+def _looks_like_text(head: bytes) -> bool:
+    """不含NUL字节且能按UTF-8解码（允许末尾截断的多字节字符）即视为文本"""
+    if b'\x00' in head:
+        return False
+    try:
+        head.decode('utf-8')
+        return True
+    except UnicodeDecodeError as e:
+        return e.start >= len(head) - 3
+
+
+registry = ExtractorRegistry()
+for _extractor_class in (WordExtractor, PdfExtractor, PresentationExtractor, SpreadsheetExtractor, PlainTextExtractor):
+    registry.register(_extractor_class)
+
+_executor = None
+_workers = 4
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """获取提取用的线程池（进程内共享，按EXTRACT_WORKERS配置大小）"""
+    global _executor, _workers
+    if _executor is None:
+        try:
+            _workers = current_app.config.get('EXTRACT_WORKERS', 4)
+        except RuntimeError:
+            pass
+        _executor = ThreadPoolExecutor(max_workers=_workers, thread_name_prefix='extract')
+    return _executor
+
+
+def max_documents(path: str) -> int:
+    """
+    并行提取时允许同时打开的文档副本数
+
+    每份副本都会把整个文件解析进内存，副本总大小按EXTRACT_PARALLEL_MAX_BYTES限制，
+    大文件只打开一份并串行提取
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        int: 副本数上限（至少为1）
+    """
+    try:
+        budget = current_app.config.get('EXTRACT_PARALLEL_MAX_BYTES', 64 * 1024 * 1024)
+    except RuntimeError:
+        budget = 64 * 1024 * 1024
+    return max(1, budget // max(os.path.getsize(path), 1))
+
+
+def iter_text(path: str, filename: Optional[str] = None) -> Iterator[str]:
+    """
+    流式提取文件文本，按页/幻灯片/工作表顺序产出
+
+    Args:
+        path: 文件路径
+        filename: 原始文件名（可选）
+
+    Yields:
+        str: 文本片段
+    """
+    extractor = registry.get(path, filename)
+    executor = get_executor()
+    yield from extractor.iter_text(path, executor=executor, window=_workers, max_docs=max_documents(path))
+
+
+def default_max_chars() -> int:
+    """配置的提取字符上限（EXTRACT_MAX_CHARS，0表示不限）"""
+    try:
+        return current_app.config.get('EXTRACT_MAX_CHARS') or 0
+    except RuntimeError:
+        return 0
+
+
+def extract_text(path: str, filename: Optional[str] = None, max_chars: Optional[int] = None) -> Tuple[str, bool]:
+    """
+    提取文件文本，达到字符上限后立即停止，剩余页面不再解析
+
+    Args:
+        path: 文件路径
+        filename: 原始文件名（可选）
+        max_chars: 字符上限（可选，默认读取EXTRACT_MAX_CHARS配置，为0或None时不限制）
+
+    Returns:
+        tuple: (文本, 是否被截断)
+    """
+    if max_chars is None:
+        max_chars = default_max_chars()
+
+    extractor = registry.get(path, filename)
+    separator = extractor.separator
+    parts = []
+    length = 0
+    chunks = extractor.iter_text(path, executor=get_executor(), window=_workers, max_docs=max_documents(path))
+    try:
+        for chunk in chunks:
+            if max_chars and length + len(chunk) > max_chars:
+                parts.append(chunk[:max(max_chars - length, 0)])
+                return separator.join(parts), True
+            parts.append(chunk)
+            length += len(chunk) + len(separator)
+    finally:
+        chunks.close()
+
+    return separator.join(parts), False
@@ -0,0 +1,34 @@
+"""
+Excel表格提取器
+"""
+from typing import Any
+
+from .base import TextExtractor
+
+
+class SpreadsheetExtractor(TextExtractor):
+    """Excel表格提取器（依赖openpyxl），按工作表并行提取"""
+
+    name = 'spreadsheet'
+    extensions = ('xlsx',)
+    mime_types = ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',)
+
+    def open(self, path: str) -> Any:
+        openpyxl = self.require('openpyxl')
+        # 只读模式按行流式读取，不会把整个工作簿载入内存
+        return openpyxl.load_workbook(path, read_only=True, data_only=True)
+
+    def close(self, doc: Any):
+        doc.close()
+
+    def unit_count(self, doc: Any) -> int:
+        return len(doc.sheetnames)
+
+    def extract_unit(self, doc: Any, index: int) -> str:
+        sheet = doc[doc.sheetnames[index]]
+        lines = [f'[{sheet.title}]']
+        for row in sheet.iter_rows(values_only=True):
+            values = ['' if value is None else str(value) for value in row]
+            if any(values):
+                lines.append('\t'.join(values).rstrip())
+        return '\n'.join(lines)
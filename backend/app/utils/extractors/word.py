@@ -0,0 +1,29 @@
+"""
+Word文档提取器
+"""
+from typing import Any
+
+from .base import TextExtractor
+
+
+class WordExtractor(TextExtractor):
+    """Word文档提取器（依赖python-docx）"""
+
+    name = 'word'
+    extensions = ('docx',)
+    mime_types = ('application/vnd.openxmlformats-officedocument.wordprocessingml.document',)
+
+    def open(self, path: str) -> Any:
+        docx = self.require('docx', 'python-docx')
+        return docx.Document(path)
+
+    def unit_count(self, doc: Any) -> int:
+        # Word文档没有稳定的分页信息，整篇作为一个单元
+        return 1
+
+    def extract_unit(self, doc: Any, index: int) -> str:
+        lines = [para.text for para in doc.paragraphs]
+        for table in doc.tables:
+            for row in table.rows:
+                lines.append('\t'.join(cell.text for cell in row.cells))
+        return '\n'.join(lines)
@@ -0,0 +1,345 @@
+"""
+物理文件回收和孤立文件对账
+文件记录删除（包括级联删除）时不在请求中删除磁盘文件，而是在同一事务中写入待删除记录或减少内容块引用计数，
+由后台任务分批删除；定期对账任务比对UPLOAD_FOLDER与数据库，报告或清理孤立文件，并限制扫描速度
+"""
+import os
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import event, insert
+
+from app.models import db
+from app.models.assignment_file import AssignmentFile
+from app.models.blob import Blob
+from app.models.file import File
+from app.models.file_tombstone import FileTombstone
+from app.models.project import ProjectFile
+from app.models.upload_session import UploadSession
+from app.utils import blob_store
+from app.utils.scheduler import periodic
+
+# 引用物理文件的模型
+FILE_MODELS = (AssignmentFile, File, ProjectFile)
+
+# 对账报告中最多列出的孤立文件数
+MAX_REPORTED_ORPHANS = 1000
+
+# 最近一次对账报告（进程内）
+_last_report = None
+_reconcile_lock = threading.Lock()
+
+
+def register_events():
+    """为引用物理文件的模型注册删除事件（在create_app中调用）"""
+    for model in FILE_MODELS:
+        if not event.contains(model, 'after_delete', _on_file_row_deleted):
+            event.listen(model, 'after_delete', _on_file_row_deleted)
+
+
+def _on_file_row_deleted(mapper, connection, target):
+    """
+    文件记录删除后（包括级联删除）回收物理文件，与删除操作在同一事务中
+
+    内容块只减少引用计数；旧文件写入待删除记录
+    """
+    if target.blob_hash:
+        blob_store.release(target.blob_hash, connection=connection)
+    elif target.file_path:
+        now = datetime.utcnow()
+        connection.execute(insert(FileTombstone.__table__).values(
+            path=target.file_path,
+            reason='deleted',
+            attempts=0,
+            created_at=now,
+            next_attempt_at=now
+        ))
+
+
+def _normalize(path):
+    """
+    规范化文件路径后再比较
+
+    旧记录保存的是未规范化的路径（如默认UPLOAD_FOLDER下的“.../app/../uploads/...”），
+    与遍历目录得到的路径字面上不同，必须两边都规范化
+    """
+    return os.path.realpath(path)
+
+
+def _legacy_paths(name=None):
+    """
+    旧文件记录（没有内容块哈希）引用的规范化路径集合
+
+    Args:
+        name: 只加载文件名为name的记录（为空时加载全部）
+    """
+    paths = set()
+    for model in FILE_MODELS:
+        query = db.session.query(model.file_path).filter(model.blob_hash.is_(None), model.file_path.isnot(None))
+        if name:
+            query = query.filter(model.file_path.like(f'%{name}'))
+        paths.update(_normalize(row[0]) for row in query.all())
+    return paths
+
+
+def _blob_hash(path):
+    """内容块目录下的文件（内容块及其派生的预览图）对应的内容哈希，其他文件返回None"""
+    blob_dir = _normalize(blob_store.blob_root())
+    normalized = _normalize(path)
+    if os.path.commonpath([blob_dir, normalized]) != blob_dir:
+        return None
+    if os.path.dirname(normalized) == os.path.join(blob_dir, 'tmp'):
+        return None
+    return os.path.basename(normalized).split('.', 1)[0]
+
+
+def is_referenced(path):
+    """
+    文件路径是否仍被引用
+
+    内容块按哈希查询内容块记录：记录存在时（包括引用计数为0、等待回收的）由引用计数管理，
+    不能按孤立文件删除；旧文件按规范化路径匹配文件记录
+    """
+    name = os.path.basename(path)
+    if not name:
+        return False
+    content_hash = _blob_hash(path)
+    if content_hash is not None:
+        return db.session.query(Blob.hash).filter(Blob.hash == content_hash).first() is not None
+    return _normalize(path) in _legacy_paths(name)
+
+
+@periodic('FILE_GC_INTERVAL', 60)
+def sweep_deleted_files():
+    """
+    分批删除待删除文件和已无引用的内容块
+
+    Returns:
+        dict: {"files": 删除的文件数, "blobs": 删除的内容块数, "failed": 失败数}
+    """
+    config = current_app.config
+    batch_size = config['FILE_GC_BATCH_SIZE']
+    now = datetime.utcnow()
+    result = {'files': 0, 'blobs': 0, 'failed': 0}
+
+    tombstones = FileTombstone.query.filter(
+        FileTombstone.next_attempt_at <= now
+    ).order_by(FileTombstone.id).limit(batch_size).all()
+
+    for tombstone in tombstones:
+        # 对账发现的孤立文件在排队期间可能被重新引用
+        if tombstone.reason == 'orphan' and is_referenced(tombstone.path):
+            db.session.delete(tombstone)
+            continue
+        try:
+            if os.path.exists(tombstone.path):
+                os.remove(tombstone.path)
+            db.session.delete(tombstone)
+            result['files'] += 1
+        except OSError as e:
+            # 指数退避重试，最长间隔1小时
+            tombstone.attempts += 1
+            tombstone.last_error = str(e)[:500]
+            tombstone.next_attempt_at = now + timedelta(seconds=min(2 ** tombstone.attempts * 30, 3600))
+            result['failed'] += 1
+    db.session.commit()
+
+    cutoff = now - timedelta(seconds=config['FILE_GC_GRACE_PERIOD'])
+    released = db.session.query(Blob.hash).filter(
+        Blob.ref_count <= 0,
+        Blob.released_at < cutoff
+    ).limit(batch_size).all()
+
+    for (content_hash,) in released:
+        # 条件删除持有记录的写锁，期间并发上传的acquire会等待，删除后会重新创建记录并补回文件
+        deleted = Blob.query.filter(
+            Blob.hash == content_hash,
+            Blob.ref_count <= 0
+        ).delete(synchronize_session=False)
+        if not deleted:
+            db.session.rollback()
+            continue
+        try:
+            blob_store.remove_blob_files(content_hash)
+            db.session.commit()
+            result['blobs'] += 1
+        except OSError as e:
+            db.session.rollback()
+            current_app.logger.error(f'删除内容块失败: {content_hash}, 错误: {str(e)}')
+            result['failed'] += 1
+
+    return result
+
+
+def _temp_session_id(name):
+    """临时文件名中的上传会话ID"""
+    return name[len('upload_'):].split('.', 1)[0]
+
+
+def _classify_batch(paths, upload_root, legacy_paths=None):
+    """
+    判断一批文件是否为孤立文件
+
+    Args:
+        paths: 文件路径列表
+        upload_root: UPLOAD_FOLDER绝对路径
+        legacy_paths: 旧文件记录引用的规范化路径集合（为空时查询数据库）
+
+    Returns:
+        list: 孤立文件的(路径, 类型)列表
+    """
+    blob_dir = os.path.join(upload_root, 'blobs')
+    temp_dir = os.path.join(blob_dir, 'tmp')
+
+    blob_files, temp_files, other_files = {}, {}, []
+    for path in paths:
+        directory, name = os.path.split(path)
+        if directory == temp_dir:
+            temp_files[path] = name
+        elif os.path.commonpath([blob_dir, path]) == blob_dir:
+            # 内容块文件名为哈希，派生文件为“哈希.规格.webp”
+            blob_files[path] = name.split('.', 1)[0]
+        else:
+            other_files.append(path)
+
+    orphans = []
+
+    if blob_files:
+        known = {
+            row[0] for row in
+            db.session.query(Blob.hash).filter(Blob.hash.in_(set(blob_files.values()))).all()
+        }
+        orphans.extend((path, 'blob') for path, content_hash in blob_files.items() if content_hash not in known)
+
+    if temp_files:
+        # 会话的预分配文件为upload_<会话ID>，正在校验的分片为upload_<会话ID>.<序号>.<随机串>.part
+        session_ids = {_temp_session_id(name) for name in temp_files.values() if name.startswith('upload_')}
+        active = {
+            row[0] for row in
+            db.session.query(UploadSession.id).filter(UploadSession.id.in_(session_ids)).all()
+        } if session_ids else set()
+        orphans.extend(
+            (path, 'temp') for path, name in temp_files.items()
+            if not (name.startswith('upload_') and _temp_session_id(name) in active)
+        )
+
+    if other_files:
+        # 旧文件按规范化后的路径匹配，记录中的路径可能是相对路径或包含“..”
+        if legacy_paths is None:
+            legacy_paths = _legacy_paths()
+        orphans.extend((path, 'file') for path in other_files if _normalize(path) not in legacy_paths)
+
+    return orphans
+
+
+def _iter_upload_files(upload_root):
+    """遍历上传目录下的所有文件（提交打包缓存由其自身的定时任务清理，不计入）"""
+    for directory, subdirs, filenames in os.walk(upload_root):
+        if directory == upload_root and 'archives' in subdirs:
+            subdirs.remove('archives')
+        for filename in filenames:
+            yield os.path.join(directory, filename)
+
+
+def reconcile_upload_folder(clean=False):
+    """
+    比对UPLOAD_FOLDER与数据库，找出没有任何记录引用的孤立文件
+
+    按FILE_RECONCILE_BATCH_SIZE分批查询数据库，每批之后按FILE_RECONCILE_RATE（文件/秒）暂停，
+    避免长时间占用磁盘和数据库；修改时间在宽限期内的文件（可能正在上传）不计入
+
+    Args:
+        clean: 是否清理孤立文件（写入待删除记录，由清理任务删除）
+
+    Returns:
+        dict: 对账报告
+    """
+    from app import socketio
+
+    global _last_report
+    if not _reconcile_lock.acquire(blocking=False):
+        return {'error': '对账任务正在运行'}
+
+    try:
+        config = current_app.config
+        upload_root = os.path.abspath(config['UPLOAD_FOLDER'])
+        batch_size = config['FILE_RECONCILE_BATCH_SIZE']
+        rate = config['FILE_RECONCILE_RATE']
+        min_mtime = datetime.utcnow().timestamp() - config['FILE_GC_GRACE_PERIOD']
+
+        report = {
+            'started_at': datetime.utcnow().isoformat(),
+            'finished_at': None,
+            'clean': clean,
+            'scanned': 0,
+            'orphan_count': 0,
+            'orphan_bytes': 0,
+            'orphans': [],
+            'queued_for_removal': 0
+        }
+
+        # 旧文件记录引用的路径只加载一次，各批次在内存中比较
+        legacy_paths = _legacy_paths()
+
+        def process(batch):
+            for path, kind in _classify_batch(batch, upload_root, legacy_paths):
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    continue
+                report['orphan_count'] += 1
+                report['orphan_bytes'] += size
+                if len(report['orphans']) < MAX_REPORTED_ORPHANS:
+                    report['orphans'].append({'path': path, 'kind': kind, 'size': size})
+                if clean and not FileTombstone.query.filter_by(path=path).first():
+                    db.session.add(FileTombstone(path=path, reason='orphan'))
+                    report['queued_for_removal'] += 1
+            db.session.commit()
+            # 限速：每批处理完后让出时间给请求
+            socketio.sleep(len(batch) / rate if rate else 0)
+
+        batch = []
+        for path in _iter_upload_files(upload_root):
+            try:
+                if os.path.getmtime(path) > min_mtime:
+                    continue
+            except OSError:
+                continue
+            report['scanned'] += 1
+            batch.append(path)
+            if len(batch) >= batch_size:
+                process(batch)
+                batch = []
+        if batch:
+            process(batch)
+
+        report['finished_at'] = datetime.utcnow().isoformat()
+        _last_report = report
+        return report
+    finally:
+        _reconcile_lock.release()
+
+
+@periodic('FILE_RECONCILE_INTERVAL', 24 * 3600)
+def scheduled_reconcile():
+    """定期对账，FILE_RECONCILE_CLEAN为True时自动清理孤立文件"""
+    return reconcile_upload_folder(clean=current_app.config.get('FILE_RECONCILE_CLEAN', False))
+
+
+def get_status():
+    """
+    获取文件回收状态
+
+    Returns:
+        dict: 待删除文件数、删除失败的文件、待回收内容块数和最近一次对账报告
+    """
+    failed = FileTombstone.query.filter(FileTombstone.attempts > 0).order_by(
+        FileTombstone.attempts.desc()
+    ).limit(50).all()
+    return {
+        'pending_files': FileTombstone.query.count(),
+        'failed_files': [tombstone.to_dict() for tombstone in failed],
+        'released_blobs': Blob.query.filter(Blob.ref_count <= 0).count(),
+        'reconciling': _reconcile_lock.locked(),
+        'last_report': _last_report
+    }
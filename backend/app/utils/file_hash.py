@@ -0,0 +1,149 @@
+"""
+文件哈希工具函数
+在把上传内容写入临时文件的同时计算SHA-256，避免二次读取；
+需要判断是否为文本时，由TextSniffer在同一次读取中检查每个数据块
+"""
+import codecs
+import hashlib
+import os
+import tempfile
+
+# 每次从上传流读取的块大小
+CHUNK_SIZE = 64 * 1024
+
+
+def hash_bytes(data) -> str:
+    """
+    计算字节串或字符串的SHA-256
+
+    Args:
+        data: bytes或str（str按UTF-8编码）
+
+    Returns:
+        十六进制哈希字符串
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+def save_stream_with_hash(stream, temp_dir=None, suffix='', on_chunk=None):
+    """
+    把流写入临时文件，同时计算SHA-256和大小
+
+    Args:
+        stream: 可读的二进制流（如FileStorage.stream）
+        temp_dir: 临时文件所在目录（可选，默认系统临时目录）
+        suffix: 临时文件后缀（可选，保留扩展名便于后续解析）
+        on_chunk: 每读到一个数据块时调用（可选，如TextSniffer.feed）
+
+    Returns:
+        tuple: (临时文件路径, 哈希值, 文件大小)
+    """
+    if temp_dir:
+        os.makedirs(temp_dir, exist_ok=True)
+
+    fd, temp_path = tempfile.mkstemp(dir=temp_dir, suffix=suffix)
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+                if on_chunk:
+                    on_chunk(chunk)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return temp_path, hasher.hexdigest(), size
+
+
+def hash_file(path, on_chunk=None):
+    """
+    按块读取文件计算SHA-256，不会把整个文件载入内存
+
+    Args:
+        path: 文件路径
+        on_chunk: 每读到一个数据块时调用（可选）
+
+    Returns:
+        tuple: (哈希值, 文件大小)
+    """
+    hasher = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            hasher.update(chunk)
+            size += len(chunk)
+            if on_chunk:
+                on_chunk(chunk)
+    return hasher.hexdigest(), size
+
+
+class TextSniffer:
+    """
+    逐块判断内容是否为UTF-8文本，并保留不超过max_bytes的解码文本
+
+    包含NUL字节或不是合法UTF-8的内容视为二进制；超过max_bytes后不再保留文本，
+    内存占用与文件大小无关
+
+    用法:
+        sniffer = TextSniffer(max_bytes)
+        save_stream_with_hash(stream, on_chunk=sniffer.feed)
+        text = sniffer.finish()  # 不超过max_bytes的文本，否则为None
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.is_text = True
+        self.size = 0
+        self._decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        self._parts = []
+
+    def feed(self, chunk):
+        """检查一个数据块"""
+        if not self.is_text:
+            return
+        self.size += len(chunk)
+        try:
+            if b'\x00' in chunk:
+                raise UnicodeDecodeError('utf-8', chunk, 0, 1, 'NUL byte')
+            text = self._decoder.decode(chunk)
+        except UnicodeDecodeError:
+            self.is_text = False
+            self._parts = None
+            return
+        if self._parts is not None:
+            if self.size > self.max_bytes:
+                self._parts = None
+            else:
+                self._parts.append(text)
+
+    def finish(self):
+        """
+        结束检查
+
+        Returns:
+            解码后的文本（是文本且不超过max_bytes时），否则为None
+        """
+        if self.is_text:
+            try:
+                tail = self._decoder.decode(b'', final=True)
+            except UnicodeDecodeError:
+                self.is_text = False
+                self._parts = None
+                return None
+            if self._parts is not None:
+                self._parts.append(tail)
+                return ''.join(self._parts)
+        return None
@@ -0,0 +1,123 @@
+"""
+文件下载响应工具
+支持Range断点续传、基于内容哈希的强ETag和条件请求（304），
+并可把文件传输交给前端代理（X-Sendfile / X-Accel-Redirect），Flask只负责鉴权
+"""
+import os
+import unicodedata
+from urllib.parse import quote
+from flask import current_app, request
+from werkzeug.utils import send_file
+
+# 交给代理传输时不由Flask处理的请求头，Range请求由代理自行处理
+_PROXY_HANDLED_HEADERS = ('HTTP_RANGE', 'HTTP_IF_RANGE')
+
+
+def send_stored_file(path, download_name, etag=None, mimetype=None, as_attachment=True, max_age=None, environ=None):
+    """
+    发送服务器上存储的文件
+
+    SENDFILE_MODE配置:
+        None: 由Flask直接传输，支持Range和条件请求
+        'x-sendfile': 返回X-Sendfile头，由Apache/lighttpd传输
+        'x-accel': 返回X-Accel-Redirect头，由Nginx传输，路径为
+                   X_ACCEL_REDIRECT_PREFIX + 文件相对UPLOAD_FOLDER的路径，Nginx需配置对应的internal location：
+                       location /protected-uploads/ {
+                           internal;
+                           alias /path/to/backend/uploads/;
+                       }
+
+    Args:
+        path: 文件路径
+        download_name: 下载文件名
+        etag: ETag值（可选，传入内容哈希作为强ETag；为None时按修改时间和大小生成）
+        mimetype: MIME类型（可选，默认按文件名推断）
+        as_attachment: 是否作为附件下载
+        max_age: 缓存时间（秒，可选；为None时要求客户端每次用ETag重新验证）
+        environ: WSGI环境（可选，默认当前请求）
+
+    Returns:
+        Response对象
+    """
+    environ = environ if environ is not None else request.environ
+    mode = current_app.config.get('SENDFILE_MODE')
+    offload = mode in ('x-sendfile', 'x-accel')
+
+    if offload:
+        environ = {k: v for k, v in environ.items() if k not in _PROXY_HANDLED_HEADERS}
+
+    rv = send_file(
+        os.path.abspath(path),
+        environ,
+        mimetype=mimetype,
+        as_attachment=as_attachment,
+        download_name=download_name,
+        conditional=True,
+        etag=etag if etag else True,
+        max_age=max_age,
+        use_x_sendfile=offload,
+        response_class=current_app.response_class,
+    )
+
+    # 下载需要登录或签名链接，不允许共享缓存保存
+    rv.cache_control.public = False
+    rv.cache_control.private = True
+
+    if mode == 'x-accel' and 'X-Sendfile' in rv.headers:
+        rv.headers['X-Accel-Redirect'] = _accel_path(rv.headers.pop('X-Sendfile'))
+
+    return rv
+
+
+def _accel_path(path):
+    """把文件绝对路径转换为Nginx内部location路径"""
+    upload_folder = os.path.abspath(current_app.config['UPLOAD_FOLDER'])
+    relative = os.path.relpath(path, upload_folder).replace(os.sep, '/')
+    prefix = current_app.config.get('X_ACCEL_REDIRECT_PREFIX', '/protected-uploads/')
+    return prefix.rstrip('/') + '/' + relative
+
+
+def content_disposition(filename, as_attachment=True):
+    """
+    生成Content-Disposition头，非ASCII文件名使用RFC 5987编码（filename*）
+
+    Args:
+        filename: 文件名
+        as_attachment: 是否作为附件下载
+
+    Returns:
+        头部值字符串
+    """
+    disposition = 'attachment' if as_attachment else 'inline'
+    try:
+        filename.encode('ascii')
+        return f'{disposition}; filename="{filename}"'
+    except UnicodeEncodeError:
+        fallback = unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode('ascii')
+        return f"{disposition}; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+def stream_response(chunks, download_name, mimetype, etag=None):
+    """
+    返回流式下载响应（长度未知，不支持Range）
+
+    Args:
+        chunks: 数据块迭代器
+        download_name: 下载文件名
+        mimetype: MIME类型
+        etag: 强ETag（可选，内容由该值唯一确定时传入，客户端可用If-None-Match重新验证）
+
+    Returns:
+        Response对象
+    """
+    rv = current_app.response_class(chunks, mimetype=mimetype, direct_passthrough=True)
+    rv.headers['Content-Disposition'] = content_disposition(download_name)
+    # 让Nginx边收边发，不缓冲整个响应
+    rv.headers['X-Accel-Buffering'] = 'no'
+    if etag:
+        rv.set_etag(etag)
+        rv.cache_control.private = True
+        rv.cache_control.no_cache = True
+    else:
+        rv.cache_control.no_store = True
+    return rv
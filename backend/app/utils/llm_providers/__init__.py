@@ -3,6 +3,6 @@ LLM提供商抽象层
 支持多种大模型API的统一接口
 """
 from .base import LLMProvider
-from .factory import LLMFactory, get_llm_provider
+from .factory import LLMFactory, get_llm_provider, current_model_id
 
-__all__ = ['LLMProvider', 'LLMFactory', 'get_llm_provider']
+__all__ = ['LLMProvider', 'LLMFactory', 'get_llm_provider', 'current_model_id']
@@ -96,3 +96,18 @@ def get_llm_provider(provider_type: Optional[str] = None, config: Optional[Dict[
         LLMProvider: 提供商实例
     """
     return LLMFactory.create_provider(provider_type, config)
+
+
+def current_model_id() -> str:
+    """
+    当前配置的提供商和模型标识，如"openai:gpt-4"，用于区分不同模型生成的缓存结果
+
+    Returns:
+        str: "提供商:模型"
+    """
+    try:
+        provider_type = current_app.config.get('LLM_PROVIDER', 'xunfei').lower()
+    except RuntimeError:
+        provider_type = 'xunfei'
+    config = LLMFactory._get_config_from_app(provider_type)
+    return f"{provider_type}:{config.get('model') or config.get('domain') or ''}"
@@ -0,0 +1,143 @@
+"""
+小组成员关系缓存
+Socket.IO事件的权限检查在进程内存中完成：每个用户所在的小组集合首次使用时查询一次，
+group_members变更的事务提交后使本进程的缓存失效；移出小组时经消息队列通知所有工作进程，
+各进程使该用户的缓存失效，并把其在本进程中的连接移出聊天室，不再收到小组广播。
+
+缓存中没有某个小组时会重新查询一次（可能刚在其他进程中加入），因此新加入的成员立即可用；
+MEMBERSHIP_CACHE_TTL只用于兜底（如直接修改数据库、控制消息丢失）
+"""
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.models import db
+from app.models.group import GroupMember
+from app.utils.socket_queue import control_handler, publish_control
+
+# 事务中变更过成员关系的(用户ID, 小组ID, 是否移出)，保存在session.info中
+_SESSION_KEY = 'membership_changes'
+
+_lock = threading.Lock()
+_groups = {}  # 用户ID -> (过期时间, 小组ID集合)
+
+
+def group_ids(user_id) -> frozenset:
+    """
+    用户所在的小组ID集合（缓存未命中或过期时查询一次）
+
+    Args:
+        user_id: 用户ID
+
+    Returns:
+        小组ID集合
+    """
+    now = time.monotonic()
+    with _lock:
+        cached = _groups.get(user_id)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    ids = frozenset(
+        row[0] for row in db.session.query(GroupMember.group_id).filter_by(user_id=user_id).all()
+    )
+    with _lock:
+        _groups[user_id] = (now + current_app.config['MEMBERSHIP_CACHE_TTL'], ids)
+    return ids
+
+
+def is_member(user_id, group_id) -> bool:
+    """
+    用户是否是小组成员
+
+    缓存命中时只做一次集合查找；缓存中没有该小组时重新查询一次
+    """
+    try:
+        group_id = int(group_id)
+    except (TypeError, ValueError):
+        return False
+    if group_id in group_ids(user_id):
+        return True
+    invalidate(user_id)
+    return group_id in group_ids(user_id)
+
+
+def invalidate(user_id=None):
+    """使用户（为None时所有用户）的缓存失效"""
+    with _lock:
+        if user_id is None:
+            _groups.clear()
+        else:
+            _groups.pop(user_id, None)
+
+
+def register_events():
+    """注册成员关系变更事件（在create_app中调用）"""
+    listeners = (
+        (GroupMember, 'after_insert', _on_member_saved),
+        (GroupMember, 'after_update', _on_member_saved),
+        (GroupMember, 'after_delete', _on_member_deleted),
+        (Session, 'after_commit', _on_commit),
+        (Session, 'after_rollback', _on_rollback),
+    )
+    for target, name, listener in listeners:
+        if not event.contains(target, name, listener):
+            event.listen(target, name, listener)
+
+
+def _record_change(target, removed):
+    """在所属session中记录成员关系变更，提交后处理"""
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_SESSION_KEY, set()).add((target.user_id, target.group_id, removed))
+
+
+def _on_member_saved(mapper, connection, target):
+    """成员加入或角色变更"""
+    _record_change(target, False)
+
+
+def _on_member_deleted(mapper, connection, target):
+    """成员移出（包括删除小组时的级联删除）"""
+    _record_change(target, True)
+
+
+def _on_commit(session):
+    """事务提交后使相关用户的缓存失效，被移出的用户离开聊天室"""
+    changes = session.info.pop(_SESSION_KEY, None)
+    if not changes:
+        return
+    for user_id, group_id, removed in changes:
+        invalidate(user_id)
+        if removed:
+            _publish_eviction(user_id, group_id)
+
+
+def _on_rollback(session):
+    """事务回滚时丢弃记录的变更"""
+    session.info.pop(_SESSION_KEY, None)
+
+
+def _publish_eviction(user_id, group_id):
+    """通知所有工作进程把被移出小组的用户的连接移出聊天室"""
+    from app import socketio
+
+    server = getattr(socketio, 'server', None)
+    if server is None:
+        return
+    try:
+        publish_control(server, 'membership_evict', {'user_id': user_id, 'group_id': group_id})
+    except Exception as e:
+        current_app.logger.error(f'移出聊天室失败: 用户{user_id}, 小组{group_id}, 错误: {str(e)}')
+
+
+@control_handler('membership_evict')
+def _evict(server, payload):
+    """在本进程中使用户的缓存失效，并把其所有连接移出小组聊天室（连接在认证时加入了user_<ID>房间）"""
+    user_id = payload['user_id']
+    invalidate(user_id)
+    for sid, _ in list(server.manager.get_participants('/', f'user_{user_id}')):
+        server.leave_room(sid, f'group_{payload["group_id"]}', namespace='/')
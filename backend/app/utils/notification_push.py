@@ -0,0 +1,182 @@
+"""
+消息提醒实时推送
+提醒增删和已读状态变化时通过mapper事件在同一事务中增量更新用户的未读计数，
+事务提交后把新提醒和最新未读数推送到用户的Socket.IO房间（user_<用户ID>，连接认证时加入），
+经消息队列转发到所有工作进程；GET /api/dashboard/notifications只用于页面首次加载。
+定期任务从提醒表重新统计并修正计数偏差
+
+推送事件:
+    notification: {"notification": 提醒, "unread_count": 未读数}（新提醒）
+    notification_count: {"unread_count": 未读数}（已读或删除导致未读数变化）
+"""
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import event, func, inspect, insert, select, update
+from sqlalchemy.orm import Session, object_session
+
+from app.models import db
+from app.models.notification import Notification, NotificationCounter
+from app.utils.scheduler import periodic
+
+# 事务中新增的提醒和变化后的未读数，保存在session.info中
+_SESSION_KEY = 'notification_push'
+
+
+def _count_unread(connection, user_id):
+    """从提醒表统计未读数（计数记录不存在时使用）"""
+    table = Notification.__table__
+    return connection.execute(
+        select(func.count()).select_from(table).where(table.c.user_id == user_id, table.c.is_read.is_(False))
+    ).scalar()
+
+
+def _add_unread(connection, user_id, delta):
+    """
+    在当前事务中原子地调整未读计数
+
+    计数记录不存在时（如升级前已有的提醒）从提醒表统计一次，事件在flush之后触发，统计结果已包含本次变化
+
+    Returns:
+        调整后的未读数
+    """
+    table = NotificationCounter.__table__
+    now = datetime.utcnow()
+    # 不小于0（SQLite的多参数max即为greatest）
+    clamp = func.max if connection.dialect.name == 'sqlite' else func.greatest
+    result = connection.execute(
+        update(table).where(table.c.user_id == user_id).values(
+            unread_count=clamp(table.c.unread_count + delta, 0),
+            updated_at=now
+        )
+    )
+    if not result.rowcount:
+        unread_count = _count_unread(connection, user_id)
+        connection.execute(insert(table).values(user_id=user_id, unread_count=unread_count, updated_at=now))
+        return unread_count
+    return connection.execute(select(table.c.unread_count).where(table.c.user_id == user_id)).scalar()
+
+
+def _pending(target):
+    """所属session中待推送的内容: {用户ID: {"notifications": [...], "unread_count": 未读数}}"""
+    session = object_session(target)
+    if session is None:
+        return None
+    return session.info.setdefault(_SESSION_KEY, {})
+
+
+def _record(target, unread_count, notification=None):
+    """记录待推送的未读数（和新提醒），事务提交后推送"""
+    pending = _pending(target)
+    if pending is None:
+        return
+    entry = pending.setdefault(target.user_id, {'notifications': [], 'unread_count': unread_count})
+    entry['unread_count'] = unread_count
+    if notification is not None:
+        entry['notifications'].append(notification)
+
+
+def _on_inserted(mapper, connection, target):
+    """新增提醒时增加未读数，并记录提醒内容（提交后不能再加载属性，在此处序列化）"""
+    delta = 0 if target.is_read else 1
+    _record(target, _add_unread(connection, target.user_id, delta), target.to_dict())
+
+
+def _on_updated(mapper, connection, target):
+    """已读状态变化时调整未读数"""
+    history = inspect(target).attrs.is_read.history
+    if not history.has_changes():
+        return
+    was_read = bool(history.deleted[0]) if history.deleted else False
+    if was_read == bool(target.is_read):
+        return
+    _record(target, _add_unread(connection, target.user_id, 1 if was_read else -1))
+
+
+def _on_deleted(mapper, connection, target):
+    """删除未读提醒时减少未读数"""
+    if not target.is_read:
+        _record(target, _add_unread(connection, target.user_id, -1))
+
+
+def _on_commit(session):
+    """事务提交后推送新提醒和未读数"""
+    pending = session.info.pop(_SESSION_KEY, None)
+    if not pending:
+        return
+
+    from app import socketio
+
+    for user_id, entry in pending.items():
+        room = f'user_{user_id}'
+        try:
+            if entry['notifications']:
+                for notification in entry['notifications']:
+                    socketio.emit('notification', {
+                        'notification': notification,
+                        'unread_count': entry['unread_count'],
+                    }, to=room)
+            else:
+                socketio.emit('notification_count', {'unread_count': entry['unread_count']}, to=room)
+        except Exception as e:
+            current_app.logger.error(f'推送消息提醒失败: 用户{user_id}, 错误: {str(e)}')
+
+
+def _on_rollback(session):
+    """事务回滚时丢弃待推送的内容"""
+    session.info.pop(_SESSION_KEY, None)
+
+
+def register_events():
+    """注册提醒计数和推送事件（在create_app中调用）"""
+    listeners = (
+        (Notification, 'after_insert', _on_inserted),
+        (Notification, 'after_update', _on_updated),
+        (Notification, 'after_delete', _on_deleted),
+        (Session, 'after_commit', _on_commit),
+        (Session, 'after_rollback', _on_rollback),
+    )
+    for target, name, listener in listeners:
+        if not event.contains(target, name, listener):
+            event.listen(target, name, listener)
+
+
+def get_unread_count(user_id) -> int:
+    """用户的未读提醒数（读取计数；还没有计数记录时从提醒表统计）"""
+    unread_count = db.session.query(NotificationCounter.unread_count).filter_by(user_id=user_id).scalar()
+    if unread_count is None:
+        unread_count = _count_unread(db.session.connection(), user_id)
+    return unread_count
+
+
+@periodic('NOTIFICATION_COUNT_RECOMPUTE_INTERVAL', 6 * 3600)
+def recompute_unread_counts():
+    """
+    从提醒表重新统计未读数并修正计数偏差（如批量更新绕过了mapper事件）
+
+    Returns:
+        修正的计数条数
+    """
+    totals = dict(
+        db.session.query(Notification.user_id, func.count(Notification.id))
+        .filter(Notification.is_read.is_(False))
+        .group_by(Notification.user_id)
+        .all()
+    )
+    corrected = 0
+
+    for counter in NotificationCounter.query.all():
+        unread_count = totals.pop(counter.user_id, 0)
+        if counter.unread_count != unread_count:
+            current_app.logger.warning(
+                f'未读提醒计数偏差已修正: 用户{counter.user_id} {counter.unread_count}->{unread_count}'
+            )
+            counter.unread_count = unread_count
+            corrected += 1
+
+    for user_id, unread_count in totals.items():
+        db.session.add(NotificationCounter(user_id=user_id, unread_count=unread_count))
+        corrected += 1
+
+    db.session.commit()
+    return corrected
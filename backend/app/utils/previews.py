@@ -0,0 +1,168 @@
+"""
+图片缩略图和网页预览图
+图片上传提交后由后台线程池生成固定尺寸的缩略图和重新压缩的WebP预览图，与原文件存放在同一目录，
+按内容哈希命名，相同图片只生成一次；上传请求本身不做任何图片处理
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+
+from app.models import db
+from app.models.assignment_file import AssignmentFile
+from app.utils import blob_store
+from app.utils.scheduler import periodic
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow未安装时不生成预览图
+    Image = None
+
+# 可以生成预览图的图片类型（SVG等矢量图直接使用原文件）
+RASTER_TYPES = {'image/png', 'image/jpeg', 'image/gif', 'image/bmp', 'image/webp'}
+
+_executor = None
+_executor_lock = threading.Lock()
+# 正在生成的内容哈希，避免同一图片重复排队
+_in_flight = set()
+
+
+def get_executor():
+    """获取预览图生成线程池（进程内共享，按PREVIEW_WORKERS配置大小）"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = current_app.config.get('PREVIEW_WORKERS', 2)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='preview')
+    return _executor
+
+
+def variant_names():
+    """预览图规格名称列表，如['thumb_128', 'thumb_256', 'preview']"""
+    sizes = current_app.config['PREVIEW_THUMBNAIL_SIZES']
+    return [f'thumb_{size}' for size in sizes] + ['preview']
+
+
+def variant_path(content_hash, variant):
+    """预览图路径，与原文件同目录"""
+    return f'{blob_store.blob_path(content_hash)}.{variant}.webp'
+
+
+def is_supported(file_type, content_hash):
+    """是否可以为该文件生成预览图"""
+    return Image is not None and bool(content_hash) and file_type in RASTER_TYPES
+
+
+def initial_status(file_type, content_hash):
+    """
+    新文件记录的预览图状态
+
+    Returns:
+        不支持时返回None；相同图片已生成过时返回'ready'；否则返回'pending'
+    """
+    if not is_supported(file_type, content_hash):
+        return None
+    if all(os.path.exists(variant_path(content_hash, v)) for v in variant_names()):
+        return 'ready'
+    return 'pending'
+
+
+def schedule(files):
+    """
+    把待生成预览图的文件提交到线程池，需在文件记录提交数据库之后调用
+
+    Args:
+        files: AssignmentFile对象列表
+    """
+    app = current_app._get_current_object()
+    for assignment_file in files:
+        content_hash = assignment_file.blob_hash
+        if assignment_file.preview_status != 'pending' or content_hash in _in_flight:
+            continue
+        _in_flight.add(content_hash)
+        get_executor().submit(_run_job, app, content_hash)
+
+
+def _run_job(app, content_hash):
+    """线程池任务：生成预览图并更新所有引用该图片的文件记录"""
+    with app.app_context():
+        try:
+            try:
+                generate(content_hash)
+                status = 'ready'
+            except Exception as e:
+                current_app.logger.error(f'生成预览图失败: {content_hash}, 错误: {str(e)}')
+                status = 'failed'
+
+            AssignmentFile.query.filter_by(blob_hash=content_hash, preview_status='pending').update(
+                {AssignmentFile.preview_status: status},
+                synchronize_session=False
+            )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f'更新预览图状态失败: {content_hash}, 错误: {str(e)}')
+        finally:
+            db.session.remove()
+            _in_flight.discard(content_hash)
+
+
+def generate(content_hash):
+    """
+    生成所有规格的预览图
+
+    先生成最大的预览图，缩略图从预览图继续缩小，原图只解码一次。
+    先写临时文件再原子重命名，读取方不会看到写了一半的文件
+
+    Args:
+        content_hash: 图片内容哈希
+    """
+    config = current_app.config
+    max_size = config['PREVIEW_MAX_SIZE']
+
+    with Image.open(blob_store.blob_path(content_hash)) as source:
+        # JPEG可以在解码时直接缩小，大图的解码开销显著减少
+        source.draft('RGB', (max_size, max_size))
+        image = ImageOps.exif_transpose(source)
+        image = image.convert('RGBA' if _has_alpha(image) else 'RGB')
+
+    image.thumbnail((max_size, max_size), Image.LANCZOS)
+    _save_webp(image, variant_path(content_hash, 'preview'), config['PREVIEW_QUALITY'])
+
+    for size in sorted(config['PREVIEW_THUMBNAIL_SIZES'], reverse=True):
+        image.thumbnail((size, size), Image.LANCZOS)
+        _save_webp(image, variant_path(content_hash, f'thumb_{size}'), config['PREVIEW_QUALITY'])
+
+
+def _has_alpha(image):
+    """图片是否带透明通道"""
+    return image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def _save_webp(image, path, quality):
+    """保存为WebP"""
+    temp_path = f'{path}.tmp{threading.get_ident()}'
+    try:
+        image.save(temp_path, 'WEBP', quality=quality, method=4)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+@periodic('PREVIEW_RETRY_INTERVAL', 300)
+def requeue_pending_previews():
+    """
+    重新提交长时间未完成的预览图任务（如进程重启时丢失的任务）
+
+    Returns:
+        重新提交的文件数
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=60)
+    pending = AssignmentFile.query.filter(
+        AssignmentFile.preview_status == 'pending',
+        AssignmentFile.created_at < cutoff
+    ).limit(100).all()
+    schedule(pending)
+    return len(pending)
@@ -0,0 +1,59 @@
+"""
+后台定时任务
+在SocketIO的后台任务中按固定间隔运行维护任务（清理过期上传会话等）
+"""
+from flask import current_app
+
+# 已注册的定时任务：(任务函数, 间隔配置项, 默认间隔秒数)
+_jobs = []
+
+
+def periodic(interval_config_key, default_interval):
+    """
+    注册定时任务的装饰器，任务在应用上下文中运行
+
+    使用示例:
+        @periodic('UPLOAD_SESSION_CLEANUP_INTERVAL', 600)
+        def cleanup_expired_sessions():
+            ...
+
+    Args:
+        interval_config_key: 运行间隔的配置项名称（配置为0时不运行）
+        default_interval: 默认运行间隔（秒）
+    """
+    def decorator(func):
+        _jobs.append((func, interval_config_key, default_interval))
+        return func
+    return decorator
+
+
+def start_scheduler(app):
+    """
+    启动所有已注册的定时任务
+
+    Args:
+        app: Flask应用实例
+    """
+    from app import socketio
+
+    for func, interval_config_key, default_interval in _jobs:
+        interval = app.config.get(interval_config_key, default_interval)
+        if interval:
+            socketio.start_background_task(_run_forever, app, func, interval)
+
+
+def _run_forever(app, func, interval):
+    """按间隔循环运行任务，单次失败不影响后续运行"""
+    from app import socketio
+    from app.models import db
+
+    while True:
+        socketio.sleep(interval)
+        with app.app_context():
+            try:
+                func()
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f'定时任务{func.__name__}运行失败: {str(e)}')
+            finally:
+                db.session.remove()
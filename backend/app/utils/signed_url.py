@@ -0,0 +1,146 @@
+"""
+签名下载链接
+登录用户批量获取短期有效的签名链接，之后的文件请求只校验HMAC签名和过期时间，
+由WSGI中间件直接发送文件，不经过JWT鉴权、不查询数据库
+"""
+import hashlib
+import hmac
+import os
+import re
+import time
+from urllib.parse import urlencode, parse_qs
+from werkzeug.wrappers import Response
+
+from app.utils.file_response import send_stored_file
+
+_HASH_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+_VARIANT_PATTERN = re.compile(r'^[a-z0-9_]+$')
+
+
+def _signature(secret, content_hash, expires, name, as_attachment, variant=None):
+    """计算签名，文件名、下载方式和预览图规格都纳入签名，防止被篡改"""
+    message = f'{content_hash}\n{expires}\n{int(bool(as_attachment))}\n{name}'
+    if variant:
+        message += f'\n{variant}'
+    return hmac.new(secret.encode('utf-8'), message.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def make_signed_path(config, content_hash, name, as_attachment=False, ttl=None, now=None, variant=None):
+    """
+    生成签名下载路径
+
+    Args:
+        config: 应用配置
+        content_hash: 文件内容哈希（blob_hash）
+        name: 下载文件名
+        as_attachment: 是否作为附件下载（否则浏览器内联显示，用于图片等）
+        ttl: 有效期（秒，可选，默认SIGNED_URL_TTL）
+        now: 当前时间戳（可选）
+        variant: 预览图规格（可选，如thumb_128；指定时链接指向该内容的WebP预览图）
+
+    Returns:
+        tuple: (签名路径, 过期时间戳)
+    """
+    expires = int(now if now is not None else time.time()) + (ttl or config['SIGNED_URL_TTL'])
+    query = {
+        'exp': expires,
+        'name': name,
+        'sig': _signature(config['SIGNED_URL_SECRET'], content_hash, expires, name, as_attachment, variant)
+    }
+    if as_attachment:
+        query['dl'] = 1
+    if variant:
+        query['variant'] = variant
+    return f"{config['SIGNED_URL_PREFIX'].rstrip('/')}/{content_hash}?{urlencode(query)}", expires
+
+
+def verify_signed_request(config, content_hash, args, now=None):
+    """
+    校验签名请求
+
+    Args:
+        config: 应用配置
+        content_hash: 路径中的文件内容哈希
+        args: 查询参数字典（值为单个字符串）
+        now: 当前时间戳（可选）
+
+    Returns:
+        tuple: (错误信息, 状态码)，校验通过时返回(None, 200)
+    """
+    if not _HASH_PATTERN.match(content_hash):
+        return '链接无效', 404
+
+    try:
+        expires = int(args.get('exp', ''))
+    except ValueError:
+        return '链接无效', 403
+
+    name = args.get('name', '')
+    as_attachment = args.get('dl') == '1'
+    variant = args.get('variant')
+    if variant is not None and not _VARIANT_PATTERN.match(variant):
+        return '链接无效', 404
+    expected = _signature(config['SIGNED_URL_SECRET'], content_hash, expires, name, as_attachment, variant)
+    if not hmac.compare_digest(expected, args.get('sig', '')):
+        return '链接签名无效', 403
+    if expires < (now if now is not None else time.time()):
+        return '链接已过期', 403
+    return None, 200
+
+
+class SignedFileMiddleware:
+    """
+    签名链接文件服务中间件
+
+    匹配SIGNED_URL_PREFIX的请求在进入Flask路由之前处理，只做签名校验和发送文件，
+    其余请求交给原WSGI应用。使用示例:
+        app.wsgi_app = SignedFileMiddleware(app.wsgi_app, app)
+    """
+
+    def __init__(self, wsgi_app, app):
+        self.wsgi_app = wsgi_app
+        self.app = app
+        self.prefix = app.config['SIGNED_URL_PREFIX'].rstrip('/') + '/'
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if not path.startswith(self.prefix):
+            return self.wsgi_app(environ, start_response)
+        return self.serve(environ, path[len(self.prefix):])(environ, start_response)
+
+    def serve(self, environ, content_hash):
+        """校验签名并返回文件响应"""
+        if environ.get('REQUEST_METHOD') not in ('GET', 'HEAD'):
+            return Response('不支持的请求方法', status=405)
+
+        args = {k: v[0] for k, v in parse_qs(environ.get('QUERY_STRING', '')).items()}
+        now = time.time()
+        error, status_code = verify_signed_request(self.app.config, content_hash, args, now=now)
+        if error:
+            return Response(error, status=status_code)
+
+        # 路径只由哈希（和预览图规格）决定，与blob_store.blob_path、previews.variant_path一致
+        path = os.path.join(
+            self.app.config['UPLOAD_FOLDER'], 'blobs', content_hash[:2], content_hash[2:4], content_hash
+        )
+        variant = args.get('variant')
+        if variant:
+            path = f'{path}.{variant}.webp'
+        if not os.path.isfile(path):
+            return Response('文件不存在', status=404)
+
+        # 只推入应用上下文以读取配置，不创建请求上下文、不访问数据库
+        with self.app.app_context():
+            rv = send_stored_file(
+                path,
+                download_name=args.get('name') or content_hash,
+                etag=f'{content_hash}-{variant}' if variant else content_hash,
+                mimetype='image/webp' if variant else None,
+                as_attachment=args.get('dl') == '1',
+                max_age=max(int(args['exp']) - int(now), 0),
+                environ=environ
+            )
+        # 内联显示的文件与应用同源，禁止其中的脚本运行（如SVG）
+        rv.headers['X-Content-Type-Options'] = 'nosniff'
+        rv.headers['Content-Security-Policy'] = "default-src 'none'; img-src 'self'; style-src 'unsafe-inline'; sandbox"
+        return rv
@@ -0,0 +1,158 @@
+"""
+Socket.IO多进程消息队列
+多个工作进程共用一个发布/订阅后端，向房间广播的事件经由队列转发到所有进程，
+连接在任意进程上的客户端都能收到。
+
+SOCKETIO_MESSAGE_QUEUE配置:
+    为空: 单进程，不使用消息队列
+    'redis://host:6379/0': Redis（生产环境，需安装redis）
+    'sqlite:////path/to/queue.db': 本地SQLite文件（开发和测试用，同一台机器上的多个进程共享）
+    其他Flask-SocketIO支持的地址（kafka://、zmq+tcp://、amqp://等）按Flask-SocketIO相同的规则选择客户端管理器
+
+服务端之间的控制消息（如把被移出小组的用户的连接移出聊天室）借用队列的emit通道广播，
+每个进程的客户端管理器拦截后调用control_handler注册的处理函数，不发送给客户端
+"""
+import json
+import sqlite3
+import time
+
+import socketio
+
+SQLITE_PREFIX = 'sqlite:///'
+
+# 控制消息的事件名
+CONTROL_EVENT = '__server_control__'
+
+_control_handlers = {}
+
+
+def control_handler(name):
+    """注册控制消息处理函数，参数为(Socket.IO服务端, 消息内容)，每个进程各调用一次"""
+    def decorator(func):
+        _control_handlers[name] = func
+        return func
+    return decorator
+
+
+def publish_control(server, name, payload):
+    """
+    向所有工作进程（包括本进程）发送控制消息，未配置消息队列时只在本进程中处理
+
+    Args:
+        server: Socket.IO服务端（socketio.server）
+        name: 控制消息名称（control_handler注册的名称）
+        payload: 消息内容（可JSON序列化）
+    """
+    if isinstance(server.manager, ControlMessageMixin):
+        server.manager.emit(CONTROL_EVENT, {'name': name, 'payload': payload}, namespace='/')
+    else:
+        _control_handlers[name](server, payload)
+
+
+class ControlMessageMixin:
+    """为发布/订阅客户端管理器增加控制消息处理：拦截CONTROL_EVENT，交给注册的处理函数"""
+
+    def _handle_emit(self, message):
+        if message.get('event') != CONTROL_EVENT:
+            return super()._handle_emit(message)
+        data = message['data']
+        data = data[0] if isinstance(data, list) else data
+        handler = _control_handlers.get(data.get('name'))
+        if handler is not None:
+            handler(self.server, data.get('payload'))
+
+
+class SQLiteManager(ControlMessageMixin, socketio.PubSubManager):
+    """
+    以SQLite表为发布/订阅通道的客户端管理器
+
+    发布时追加一行，各进程的监听任务按自增ID轮询新行；超过retention秒的消息由发布方清理
+    """
+    name = 'sqlite'
+
+    def __init__(self, url, channel='flask-socketio', write_only=False, logger=None,
+                 poll_interval=0.05, retention=60):
+        self.path = url[len(SQLITE_PREFIX):]
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._last_cleanup = 0
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+
+        conn = self._connect()
+        try:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS socketio_queue ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT NOT NULL, '
+                'payload TEXT NOT NULL, created_at REAL NOT NULL)'
+            )
+        finally:
+            conn.close()
+
+    def _connect(self):
+        """每次操作使用独立连接（发布可能来自任意线程）"""
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def _publish(self, data):
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                'INSERT INTO socketio_queue (channel, payload, created_at) VALUES (?, ?, ?)',
+                (self.channel, json.dumps(data), now)
+            )
+            if now - self._last_cleanup > self.retention:
+                self._last_cleanup = now
+                conn.execute('DELETE FROM socketio_queue WHERE created_at < ?', (now - self.retention,))
+        finally:
+            conn.close()
+
+    def _listen(self):
+        conn = self._connect()
+        try:
+            # 只接收启动之后发布的消息
+            last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM socketio_queue').fetchone()[0]
+            while True:
+                rows = conn.execute(
+                    'SELECT id, payload FROM socketio_queue WHERE channel = ? AND id > ? ORDER BY id',
+                    (self.channel, last_id)
+                ).fetchall()
+                for row_id, payload in rows:
+                    last_id = row_id
+                    yield json.loads(payload)
+                self.server.sleep(self.poll_interval)
+        finally:
+            conn.close()
+
+
+def socketio_options(config) -> dict:
+    """
+    按配置生成SocketIO.init_app的消息队列参数
+
+    Args:
+        config: 应用配置
+
+    Returns:
+        dict: 传给init_app的关键字参数（未配置消息队列时为空）
+    """
+    url = config.get('SOCKETIO_MESSAGE_QUEUE')
+    if not url:
+        return {}
+    channel = config.get('SOCKETIO_CHANNEL', 'flask-socketio')
+    if url.startswith(SQLITE_PREFIX):
+        return {'client_manager': SQLiteManager(url, channel=channel)}
+    return {'client_manager': _queue_manager_class(url)(url, channel=channel)}
+
+
+def _queue_manager_class(url):
+    """按Flask-SocketIO相同的规则根据地址选择客户端管理器，并加入控制消息处理"""
+    if url.startswith(('redis://', 'rediss://')):
+        base = socketio.RedisManager
+    elif url.startswith('kafka://'):
+        base = socketio.KafkaManager
+    elif url.startswith('zmq'):
+        base = socketio.ZmqManager
+    else:
+        base = socketio.KombuManager
+    return type(base.__name__, (ControlMessageMixin, base), {})
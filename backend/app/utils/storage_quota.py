@@ -0,0 +1,255 @@
+"""
+存储配额
+文件记录增删改时通过mapper事件在同一事务中增量更新用户和小组的用量计数，
+上传前按计数检查配额，定期任务从文件表重新汇总修正计数偏差
+
+用量归属:
+    AssignmentFile: 上传用户
+    File: 所属小组和上传用户
+    ProjectFile: 项目所属小组和创建用户
+"""
+from collections import defaultdict
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import event, func, inspect, insert, select, update
+
+from app.models import db
+from app.models.assignment_file import AssignmentFile
+from app.models.file import File
+from app.models.project import Project, ProjectFile
+from app.models.storage_usage import StorageUsage
+from app.utils.scheduler import periodic
+
+
+class QuotaExceeded(Exception):
+    """上传会超出存储配额"""
+
+    status_code = 413
+
+
+def _owners(connection, target):
+    """
+    文件记录的用量归属
+
+    Returns:
+        list: [(owner_type, owner_id), ...]
+    """
+    if isinstance(target, AssignmentFile):
+        return [('user', target.user_id)]
+    if isinstance(target, File):
+        return [('group', target.group_id), ('user', target.uploader_id)]
+    if isinstance(target, ProjectFile):
+        # 在flush过程中不能访问关联关系，直接通过连接查询小组
+        group_id = connection.execute(
+            select(Project.__table__.c.group_id).where(Project.__table__.c.id == target.project_id)
+        ).scalar()
+        owners = [('user', target.creator_id)]
+        if group_id is not None:
+            owners.append(('group', group_id))
+        return owners
+    return []
+
+
+def _add_usage(connection, owner_type, owner_id, delta_bytes, delta_files):
+    """在当前事务中原子地调整用量计数，记录不存在时创建"""
+    if owner_id is None or (not delta_bytes and not delta_files):
+        return
+
+    table = StorageUsage.__table__
+    now = datetime.utcnow()
+    values = {
+        'owner_type': owner_type,
+        'owner_id': owner_id,
+        'bytes_used': delta_bytes,
+        'file_count': delta_files,
+        'updated_at': now
+    }
+    increments = {
+        'bytes_used': table.c.bytes_used + delta_bytes,
+        'file_count': table.c.file_count + delta_files,
+        'updated_at': now
+    }
+
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        connection.execute(
+            dialect_insert(table).values(**values).on_conflict_do_update(
+                index_elements=['owner_type', 'owner_id'],
+                set_=increments
+            )
+        )
+        return
+
+    result = connection.execute(
+        update(table).where(table.c.owner_type == owner_type, table.c.owner_id == owner_id).values(**increments)
+    )
+    if not result.rowcount:
+        connection.execute(insert(table).values(**values))
+
+
+def _on_file_inserted(mapper, connection, target):
+    """新增文件记录时增加用量"""
+    for owner_type, owner_id in _owners(connection, target):
+        _add_usage(connection, owner_type, owner_id, target.file_size or 0, 1)
+
+
+def _on_file_deleted(mapper, connection, target):
+    """删除文件记录时（包括级联删除）减少用量"""
+    for owner_type, owner_id in _owners(connection, target):
+        _add_usage(connection, owner_type, owner_id, -(target.file_size or 0), -1)
+
+
+def _on_file_updated(mapper, connection, target):
+    """文件内容修改导致大小变化时调整用量（如在线编辑项目文件）"""
+    history = inspect(target).attrs.file_size.history
+    if not history.has_changes():
+        return
+    old_size = history.deleted[0] if history.deleted else 0
+    delta = (target.file_size or 0) - (old_size or 0)
+    for owner_type, owner_id in _owners(connection, target):
+        _add_usage(connection, owner_type, owner_id, delta, 0)
+
+
+def register_events():
+    """为文件模型注册用量计数事件（在create_app中调用）"""
+    for model in (AssignmentFile, File, ProjectFile):
+        for name, listener in (
+            ('after_insert', _on_file_inserted),
+            ('after_delete', _on_file_deleted),
+            ('after_update', _on_file_updated),
+        ):
+            if not event.contains(model, name, listener):
+                event.listen(model, name, listener)
+
+
+def get_usage(owner_type, owner_id):
+    """
+    获取用量和配额
+
+    Args:
+        owner_type: user或group
+        owner_id: 用户ID或小组ID
+
+    Returns:
+        dict: {"bytes_used": 已用字节数, "file_count": 文件数, "quota_bytes": 配额（None表示不限）}
+    """
+    usage = StorageUsage.query.filter_by(owner_type=owner_type, owner_id=owner_id).first()
+    return {
+        'owner_type': owner_type,
+        'owner_id': owner_id,
+        'bytes_used': usage.bytes_used if usage else 0,
+        'file_count': usage.file_count if usage else 0,
+        'quota_bytes': get_quota(owner_type)
+    }
+
+
+def get_quota(owner_type):
+    """配额字节数，0或未配置表示不限"""
+    key = 'STORAGE_QUOTA_USER_BYTES' if owner_type == 'user' else 'STORAGE_QUOTA_GROUP_BYTES'
+    return current_app.config.get(key) or None
+
+
+def check_quota(incoming_bytes, user_id=None, group_id=None):
+    """
+    上传前检查配额，在写入任何数据之前调用
+
+    检查与写入之间没有加锁，并发上传可能略微超出配额，定期汇总会如实反映实际用量
+
+    Args:
+        incoming_bytes: 即将写入的字节数（可以是请求体大小等上限估计）
+        user_id: 用户ID（可选）
+        group_id: 小组ID（可选）
+
+    Raises:
+        QuotaExceeded: 超出配额
+    """
+    for owner_type, owner_id, label in (('user', user_id, '个人'), ('group', group_id, '小组')):
+        if owner_id is None:
+            continue
+        quota = get_quota(owner_type)
+        if not quota:
+            continue
+        used = db.session.query(StorageUsage.bytes_used).filter_by(
+            owner_type=owner_type, owner_id=owner_id
+        ).scalar() or 0
+        if used + (incoming_bytes or 0) > quota:
+            raise QuotaExceeded(
+                f'{label}存储空间不足：已用{_format_size(used)}，配额{_format_size(quota)}'
+            )
+
+
+def _format_size(size):
+    """格式化字节数"""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f'{size:.1f}{unit}' if unit != 'B' else f'{size}B'
+        size /= 1024
+
+
+def compute_usage():
+    """
+    从文件表汇总实际用量
+
+    Returns:
+        dict: {(owner_type, owner_id): [字节数, 文件数]}
+    """
+    totals = defaultdict(lambda: [0, 0])
+
+    def add(owner_type, rows):
+        for owner_id, size, count in rows:
+            if owner_id is None:
+                continue
+            totals[(owner_type, owner_id)][0] += int(size or 0)
+            totals[(owner_type, owner_id)][1] += count
+
+    def aggregate(owner_column, model, *joins):
+        query = db.session.query(owner_column, func.sum(model.file_size), func.count(model.id))
+        for join in joins:
+            query = query.join(*join)
+        return query.group_by(owner_column).all()
+
+    add('user', aggregate(AssignmentFile.user_id, AssignmentFile))
+    add('user', aggregate(File.uploader_id, File))
+    add('user', aggregate(ProjectFile.creator_id, ProjectFile))
+    add('group', aggregate(File.group_id, File))
+    add('group', aggregate(Project.group_id, ProjectFile, (Project, ProjectFile.project_id == Project.id)))
+    return totals
+
+
+@periodic('STORAGE_USAGE_RECOMPUTE_INTERVAL', 6 * 3600)
+def recompute_usage():
+    """
+    重新汇总所有用量并修正计数偏差
+
+    Returns:
+        修正的计数条数
+    """
+    totals = compute_usage()
+    corrected = 0
+
+    for usage in StorageUsage.query.all():
+        bytes_used, file_count = totals.pop((usage.owner_type, usage.owner_id), (0, 0))
+        if usage.bytes_used != bytes_used or usage.file_count != file_count:
+            current_app.logger.warning(
+                f'存储用量偏差已修正: {usage.owner_type}:{usage.owner_id} '
+                f'{usage.bytes_used}->{bytes_used}字节, {usage.file_count}->{file_count}个文件'
+            )
+            usage.bytes_used = bytes_used
+            usage.file_count = file_count
+            corrected += 1
+
+    for (owner_type, owner_id), (bytes_used, file_count) in totals.items():
+        db.session.add(StorageUsage(
+            owner_type=owner_type,
+            owner_id=owner_id,
+            bytes_used=bytes_used,
+            file_count=file_count
+        ))
+        corrected += 1
+
+    db.session.commit()
+    return corrected
@@ -0,0 +1,42 @@
+"""
+项目版本管理模块
+文件内容、目录树和提交都以SHA-256寻址：未变化的文件在各提交间共用存储，
+提交哈希覆盖父提交和目录树，检出任意提交只需读取其目录树；
+文本文件的历史版本以有界长度的增量链保存，提交时在服务器端计算行级差异并增量更新逐行来源
+"""
+from .objects import (
+    ObjectNotFound, store_text, store_stored_file, load_bytes, load_text,
+    write_tree, read_tree, commit_hash, storage_stats, collect_unreachable,
+)
+from .diff import unified_diff, diff_entries
+from .blame import annotate
+from .repository import (
+    VersionControlError, NothingToCommit, CommitConflict, CommitNotFound,
+    snapshot_project, diff_trees, get_commit, list_commits, create_commit, restore,
+)
+
+__all__ = [
+    'ObjectNotFound',
+    'store_text',
+    'store_stored_file',
+    'load_bytes',
+    'load_text',
+    'write_tree',
+    'read_tree',
+    'commit_hash',
+    'storage_stats',
+    'collect_unreachable',
+    'unified_diff',
+    'diff_entries',
+    'annotate',
+    'VersionControlError',
+    'NothingToCommit',
+    'CommitConflict',
+    'CommitNotFound',
+    'snapshot_project',
+    'diff_trees',
+    'get_commit',
+    'list_commits',
+    'create_commit',
+    'restore',
+]
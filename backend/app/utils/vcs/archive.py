@@ -0,0 +1,191 @@
+"""
+提交快照打包
+把某个提交的目录树打包为tar.gz：逐个条目写入tar头和内容，边生成边压缩发送，内存占用与项目大小无关。
+同一提交的打包结果逐字节相同（条目顺序、时间和gzip头都固定），以提交哈希作为强ETag，
+首次下载时同时写入磁盘缓存，之后的下载直接发送缓存文件（支持Range和条件请求）
+"""
+import calendar
+import os
+import tarfile
+import threading
+import time
+import zlib
+from datetime import datetime
+
+from flask import current_app
+
+from app.utils import blob_store
+from app.utils.file_hash import CHUNK_SIZE
+from app.utils.scheduler import periodic
+from app.utils.vcs import objects
+
+ARCHIVE_SUFFIX = '.tar.gz'
+
+# tar结尾的两个空块
+_END_OF_ARCHIVE = tarfile.NUL * (tarfile.BLOCKSIZE * 2)
+
+
+def archive_etag(commit_hash: str) -> str:
+    """打包结果的强ETag"""
+    return f'{commit_hash}-tgz'
+
+
+def cache_root() -> str:
+    """打包缓存目录（位于UPLOAD_FOLDER下，以便交给前端代理传输）"""
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], 'archives')
+
+
+def cache_path(commit_hash: str) -> str:
+    """提交对应的缓存文件路径"""
+    return os.path.join(cache_root(), commit_hash + ARCHIVE_SUFFIX)
+
+
+def cached_archive(commit_hash: str):
+    """
+    查找已缓存的打包文件，命中时更新修改时间（缓存按修改时间淘汰）
+
+    Returns:
+        文件路径或None
+    """
+    path = cache_path(commit_hash)
+    try:
+        os.utime(path)
+    except OSError:
+        return None
+    return path
+
+
+def _tar_header(path: str, size: int, mtime: int) -> bytes:
+    """生成条目的tar头（PAX格式，支持长路径和非ASCII文件名）"""
+    info = tarfile.TarInfo(path)
+    info.size = size
+    info.mtime = mtime
+    info.mode = 0o644
+    return info.tobuf(tarfile.PAX_FORMAT, 'utf-8', 'surrogateescape')
+
+
+def _padding(size: int) -> bytes:
+    """补齐到tar块大小"""
+    remainder = size % tarfile.BLOCKSIZE
+    return tarfile.NUL * (tarfile.BLOCKSIZE - remainder) if remainder else b''
+
+
+def _iter_tar(entries, mtime: int):
+    """按目录树条目生成未压缩的tar数据块"""
+    for entry in sorted(entries, key=lambda e: e['path']):
+        if entry['kind'] == 'binary':
+            yield _tar_header(entry['path'], entry['size'], mtime)
+            written = 0
+            with open(blob_store.blob_path(entry['hash']), 'rb') as source:
+                while True:
+                    chunk = source.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    written += len(chunk)
+                    yield chunk
+            if written != entry['size']:
+                raise objects.ObjectNotFound(f'内容块大小不一致: {entry["hash"]}')
+            yield _padding(written)
+        else:
+            data = objects.load_text(entry['hash']).encode('utf-8')
+            yield _tar_header(entry['path'], len(data), mtime)
+            for start in range(0, len(data), CHUNK_SIZE):
+                yield data[start:start + CHUNK_SIZE]
+            yield _padding(len(data))
+            del data
+
+    yield _END_OF_ARCHIVE
+
+
+def stream_tar_gz(entries, modified: datetime = None, level: int = 6):
+    """
+    生成tar.gz数据
+
+    Args:
+        entries: 目录树条目列表
+        modified: 所有条目的修改时间（UTC，使用提交时间，保证同一提交的结果相同）
+        level: gzip压缩级别
+
+    Returns:
+        压缩数据块的迭代器
+    """
+    mtime = calendar.timegm(modified.utctimetuple()) if modified else 0
+    # wbits=31输出gzip格式，头中的时间为0，结果可重现
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in _iter_tar(entries, mtime):
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_and_cache(commit_hash: str, chunks):
+    """
+    发送数据块的同时写入缓存临时文件，完整发送后原子替换为缓存文件；
+    客户端中途断开或打包失败时删除临时文件
+
+    Args:
+        commit_hash: 提交哈希
+        chunks: 压缩数据块迭代器
+
+    Returns:
+        数据块迭代器
+    """
+    os.makedirs(cache_root(), exist_ok=True)
+    path = cache_path(commit_hash)
+    temp_path = f'{path}.tmp{os.getpid()}_{threading.get_ident()}'
+
+    def generate():
+        try:
+            with open(temp_path, 'wb') as cache_file:
+                for chunk in chunks:
+                    cache_file.write(chunk)
+                    yield chunk
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    return generate()
+
+
+@periodic('ARCHIVE_CACHE_CLEAN_INTERVAL', 3600)
+def prune_archive_cache():
+    """
+    按最近使用时间淘汰打包缓存，使总大小不超过ARCHIVE_CACHE_MAX_BYTES
+
+    Returns:
+        删除的文件数
+    """
+    root = cache_root()
+    if not os.path.isdir(root):
+        return 0
+
+    files = []
+    stale_before = time.time() - current_app.config['ARCHIVE_CACHE_CLEAN_INTERVAL']
+    for entry in os.scandir(root):
+        if not entry.is_file():
+            continue
+        stat = entry.stat()
+        if entry.name.endswith(ARCHIVE_SUFFIX):
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+        elif stat.st_mtime < stale_before:
+            # 进程中断时遗留的临时文件
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    total = sum(size for _, size, _ in files)
+    limit = current_app.config['ARCHIVE_CACHE_MAX_BYTES']
+    removed = 0
+    for _, size, path in sorted(files):
+        if total <= limit:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
@@ -0,0 +1,153 @@
+"""
+逐行来源（blame）
+每次提交时以父版本的来源表为基础，按差异更新修改过的文本文件：未变化的行保留原来源，
+新增或修改的行记为本次提交。查询时只需读取一条记录，耗时与历史长度无关
+"""
+from typing import List, Optional
+
+from flask import current_app
+
+from app.models import db
+from app.models.commit import Commit, FileBlame
+from app.models.user import User
+from app.utils.vcs import objects
+from app.utils.vcs.diff import get_opcodes
+
+
+def _expand(ranges) -> List[int]:
+    """游程编码展开为逐行的提交ID"""
+    origins = []
+    for count, commit_id in ranges:
+        origins.extend([commit_id] * count)
+    return origins
+
+
+def _compress(origins: List[int]) -> list:
+    """逐行的提交ID压缩为游程编码"""
+    ranges = []
+    for commit_id in origins:
+        if ranges and ranges[-1][1] == commit_id:
+            ranges[-1][0] += 1
+        else:
+            ranges.append([1, commit_id])
+    return ranges
+
+
+def latest_blame(project_id: int, path: str, max_commit_id: Optional[int] = None) -> Optional[FileBlame]:
+    """
+    获取文件在某个提交（默认最新）时的来源记录
+
+    项目历史是线性的，ID不超过该提交的最新一条记录就是该提交时的版本，调用方应核对content_hash
+    """
+    query = FileBlame.query.filter_by(project_id=project_id, path=path)
+    if max_commit_id is not None:
+        query = query.filter(FileBlame.commit_id <= max_commit_id)
+    return query.order_by(FileBlame.commit_id.desc()).first()
+
+
+def update_blame(commit: Commit, changes) -> int:
+    """
+    为提交中新增或修改的文本文件生成来源记录（在create_commit中调用）
+
+    超过VCS_DIFF_MAX_BYTES的文件不生成记录
+
+    Args:
+        commit: 刚创建的Commit对象（已flush）
+        changes: diff_trees返回的变更列表
+
+    Returns:
+        生成的记录数
+    """
+    max_bytes = current_app.config['VCS_DIFF_MAX_BYTES']
+    max_edits = current_app.config['VCS_DIFF_MAX_EDITS']
+    created = 0
+
+    for change_type, path, before, after in changes:
+        if after is None or after['kind'] != 'text' or after['size'] > max_bytes:
+            continue
+
+        new_lines = objects.load_text(after['hash']).splitlines(keepends=True)
+        origins = None
+
+        parent = latest_blame(commit.project_id, path) if before and before['kind'] == 'text' else None
+        if parent is not None and parent.content_hash == before['hash']:
+            old_origins = _expand(parent.ranges)
+            old_lines = objects.load_text(before['hash']).splitlines(keepends=True)
+            if len(old_origins) == len(old_lines):
+                origins = []
+                for tag, i1, i2, j1, j2 in get_opcodes(old_lines, new_lines, max_edits):
+                    if tag == 'equal':
+                        origins.extend(old_origins[i1:i2])
+                    else:
+                        origins.extend([commit.id] * (j2 - j1))
+
+        if origins is None:
+            # 新文件，或旧版本没有来源记录（如超过大小上限），所有行都记为本次提交
+            origins = [commit.id] * len(new_lines)
+
+        db.session.add(FileBlame(
+            project_id=commit.project_id,
+            commit_id=commit.id,
+            path=path,
+            content_hash=after['hash'],
+            line_count=len(new_lines),
+            ranges=_compress(origins)
+        ))
+        created += 1
+
+    return created
+
+
+def annotate(commit: Commit, path: str) -> Optional[dict]:
+    """
+    获取文件在某个提交时每一行的来源
+
+    Args:
+        commit: Commit对象
+        path: 文件路径
+
+    Returns:
+        dict: {"path", "content_hash", "line_count", "lines": [行内容],
+               "ranges": [{"start": 起始行（从1开始）, "end": 结束行, "commit_id"}],
+               "commits": {提交ID: 提交摘要}}；文件在该提交中不存在、不是文本或没有来源记录时返回None
+    """
+    entry = next((e for e in objects.read_tree(commit.tree_hash) if e['path'] == path), None)
+    if entry is None or entry['kind'] != 'text':
+        return None
+
+    blame = latest_blame(commit.project_id, path, commit.id)
+    if blame is None or blame.content_hash != entry['hash']:
+        return None
+
+    ranges = []
+    line = 1
+    for count, commit_id in blame.ranges:
+        ranges.append({'start': line, 'end': line + count - 1, 'commit_id': commit_id})
+        line += count
+
+    # 来源提交和提交者各一次批量查询
+    commit_ids = {commit_id for _, commit_id in blame.ranges}
+    origin_commits = Commit.query.filter(Commit.id.in_(commit_ids)).all() if commit_ids else []
+    users = {
+        u.id: u for u in User.query.filter(User.id.in_({c.committer_id for c in origin_commits})).all()
+    } if origin_commits else {}
+
+    return {
+        'path': path,
+        'content_hash': blame.content_hash,
+        'line_count': blame.line_count,
+        'lines': objects.load_text(entry['hash']).splitlines(),
+        'ranges': ranges,
+        'commits': {
+            c.id: {
+                'hash': c.hash,
+                'message': c.message,
+                'created_at': c.created_at.isoformat() if c.created_at else None,
+                'committer': {
+                    'id': c.committer_id,
+                    'username': users[c.committer_id].username if c.committer_id in users else None
+                }
+            }
+            for c in origin_commits
+        }
+    }
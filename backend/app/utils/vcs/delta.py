@@ -0,0 +1,69 @@
+"""
+文本增量编码
+新版本按行与基础版本比较，相同的行记为对基础版本的行区间引用，其余行原样保存
+"""
+import json
+import zlib
+from difflib import SequenceMatcher
+from typing import List, Union
+
+# 增量指令: [起始行, 行数] 表示复制基础版本的行区间，字符串表示插入的内容
+DeltaOp = Union[List[int], str]
+
+
+def compress(data: bytes) -> bytes:
+    """zlib压缩"""
+    return zlib.compress(data, 6)
+
+
+def decompress(data: bytes) -> bytes:
+    """zlib解压"""
+    return zlib.decompress(data)
+
+
+def encode(base: str, target: str) -> bytes:
+    """
+    计算从基础版本得到目标版本的增量
+
+    Args:
+        base: 基础版本文本
+        target: 目标版本文本
+
+    Returns:
+        压缩后的增量数据
+    """
+    base_lines = base.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+
+    ops: List[DeltaOp] = []
+    matcher = SequenceMatcher(None, base_lines, target_lines)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2 - i1])
+        elif j2 > j1:
+            # replace和insert保存目标版本的行，delete不需要指令
+            ops.append(''.join(target_lines[j1:j2]))
+
+    return compress(json.dumps(ops, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def apply(base: str, delta: bytes) -> str:
+    """
+    把增量应用到基础版本
+
+    Args:
+        base: 基础版本文本
+        delta: encode返回的增量数据
+
+    Returns:
+        目标版本文本
+    """
+    base_lines = base.splitlines(keepends=True)
+    parts = []
+    for op in json.loads(decompress(delta)):
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            start, count = op
+            parts.extend(base_lines[start:start + count])
+    return ''.join(parts)
@@ -0,0 +1,291 @@
+"""
+行级差异计算
+使用Myers O(ND)算法比较两个版本的行序列，生成统一差异格式（unified diff）和增删行数；
+内容以哈希寻址，相同版本对的渲染结果缓存在进程内
+"""
+import difflib
+import threading
+from array import array
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from flask import current_app
+
+# 差异操作: (类型equal/delete/insert/replace, 旧起始行, 旧结束行, 新起始行, 新结束行)
+Opcode = Tuple[str, int, int, int, int]
+
+NO_NEWLINE_MARKER = '\\ No newline at end of file\n'
+
+# 渲染结果缓存：(路径, 旧哈希, 新哈希, 上下文行数) -> 差异结果（差异头部包含路径）
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _myers_edits(a: List[int], b: List[int], max_edits: int) -> Optional[List[Tuple[str, int, int]]]:
+    """
+    Myers最短编辑脚本
+
+    每轮只保存本轮写入的对角线（第d轮为-d..d中与d同奇偶的d+1条），回溯第d+1轮时只读取这些值，
+    内存为O(min(D, max_edits)²)个整数
+
+    Args:
+        a: 旧版本的行编号序列
+        b: 新版本的行编号序列
+        max_edits: 编辑距离上限
+
+    Returns:
+        list: [(操作equal/delete/insert, 旧行号, 新行号), ...]；编辑距离超过上限时返回None
+    """
+    n, m = len(a), len(b)
+    v = {1: 0}
+    trace = []
+    for d in range(min(n + m, max_edits) + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[k - 1] < v[k + 1]):
+                x = v[k + 1]
+            else:
+                x = v[k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[k] = x
+            if x >= n and y >= m:
+                return _backtrack(trace, n, m)
+        trace.append(array('l', [v[k] for k in range(-d, d + 1, 2)]))
+    return None
+
+
+def _backtrack(trace, n, m) -> List[Tuple[str, int, int]]:
+    """从终点沿记录的前沿回溯出编辑脚本（trace[d]为第d轮的前沿，对角线k的下标为(k + d) // 2）"""
+    edits = []
+    x, y = n, m
+    for d in range(len(trace), 0, -1):
+        prev = trace[d - 1]
+        k = x - y
+        if k == -d or (k != d and prev[(k - 2 + d) // 2] < prev[(k + d) // 2]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = prev[(prev_k + d - 1) // 2]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            edits.append(('equal', x - 1, y - 1))
+            x -= 1
+            y -= 1
+        if x == prev_x:
+            edits.append(('insert', x, y - 1))
+        else:
+            edits.append(('delete', x - 1, y))
+        x, y = prev_x, prev_y
+    # 第0轮：从起点沿对角线到第一次编辑
+    while x > 0:
+        edits.append(('equal', x - 1, y - 1))
+        x -= 1
+        y -= 1
+    edits.reverse()
+    return edits
+
+
+def get_opcodes(old_lines: List[str], new_lines: List[str], max_edits: int = 1000) -> List[Opcode]:
+    """
+    计算两个行序列的差异
+
+    先去掉相同的开头和结尾，再对中间部分运行Myers算法；编辑距离超过max_edits时
+    中间部分改用difflib.SequenceMatcher比较（不保证最短，但耗时和内存有界）
+
+    Args:
+        old_lines: 旧版本的行（保留换行符）
+        new_lines: 新版本的行（保留换行符）
+        max_edits: 编辑距离上限
+
+    Returns:
+        list: 与difflib.SequenceMatcher.get_opcodes相同格式的操作列表
+    """
+    n, m = len(old_lines), len(new_lines)
+    prefix = 0
+    while prefix < n and prefix < m and old_lines[prefix] == new_lines[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < n - prefix and suffix < m - prefix and old_lines[n - 1 - suffix] == new_lines[m - 1 - suffix]:
+        suffix += 1
+
+    # 行内容映射为整数，比较更快
+    ids = {}
+    a = [ids.setdefault(line, len(ids)) for line in old_lines[prefix:n - suffix]]
+    b = [ids.setdefault(line, len(ids)) for line in new_lines[prefix:m - suffix]]
+
+    opcodes = []
+    if prefix:
+        opcodes.append(('equal', 0, prefix, 0, prefix))
+
+    edits = _myers_edits(a, b, max_edits)
+    if edits is None:
+        opcodes.extend(
+            (tag, prefix + i1, prefix + i2, prefix + j1, prefix + j2)
+            for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b).get_opcodes()
+        )
+        edits = []
+
+    # 把逐行操作合并为区间，相邻的删除和插入合并为替换
+    i, j = prefix, prefix
+    pos = 0
+    while pos < len(edits):
+        op = edits[pos][0]
+        if op == 'equal':
+            start_i, start_j = i, j
+            while pos < len(edits) and edits[pos][0] == 'equal':
+                i += 1
+                j += 1
+                pos += 1
+            opcodes.append(('equal', start_i, i, start_j, j))
+            continue
+        start_i, start_j = i, j
+        while pos < len(edits) and edits[pos][0] != 'equal':
+            if edits[pos][0] == 'delete':
+                i += 1
+            else:
+                j += 1
+            pos += 1
+        tag = 'replace' if i > start_i and j > start_j else ('delete' if i > start_i else 'insert')
+        opcodes.append((tag, start_i, i, start_j, j))
+
+    if suffix:
+        opcodes.append(('equal', n - suffix, n, m - suffix, m))
+    return opcodes
+
+
+def _group_opcodes(opcodes: List[Opcode], context: int) -> List[List[Opcode]]:
+    """按上下文行数把操作分组为差异块（与difflib.SequenceMatcher.get_grouped_opcodes一致）"""
+    if not opcodes:
+        opcodes = [('equal', 0, 1, 0, 1)]
+    opcodes = list(opcodes)
+    if opcodes[0][0] == 'equal':
+        tag, i1, i2, j1, j2 = opcodes[0]
+        opcodes[0] = tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2
+    if opcodes[-1][0] == 'equal':
+        tag, i1, i2, j1, j2 = opcodes[-1]
+        opcodes[-1] = tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)
+
+    groups = []
+    group = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == 'equal' and i2 - i1 > context * 2:
+            group.append((tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)))
+            groups.append(group)
+            group = []
+            i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        groups.append(group)
+    return groups
+
+
+def _format_range(start: int, stop: int) -> str:
+    """统一差异格式的行范围"""
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return f'{beginning}'
+    if not length:
+        beginning -= 1
+    return f'{beginning},{length}'
+
+
+def _line(prefix: str, line: str) -> str:
+    """差异中的一行，最后一行没有换行符时追加标记"""
+    if line.endswith('\n'):
+        return prefix + line
+    return prefix + line + '\n' + NO_NEWLINE_MARKER
+
+
+def unified_diff(old_text: str, new_text: str, from_path: str, to_path: str,
+                 context: int = 3, max_edits: int = 1000) -> dict:
+    """
+    生成统一差异格式
+
+    Args:
+        old_text: 旧版本文本（新增文件为空字符串）
+        new_text: 新版本文本（删除文件为空字符串）
+        from_path: 旧文件路径
+        to_path: 新文件路径
+        context: 上下文行数
+        max_edits: 编辑距离上限
+
+    Returns:
+        dict: {"diff": 差异文本, "additions": 新增行数, "deletions": 删除行数}
+    """
+    old_lines = old_text.splitlines(keepends=True)
+    new_lines = new_text.splitlines(keepends=True)
+    opcodes = get_opcodes(old_lines, new_lines, max_edits)
+
+    additions = sum(j2 - j1 for tag, _, _, j1, j2 in opcodes if tag in ('insert', 'replace'))
+    deletions = sum(i2 - i1 for tag, i1, i2, _, _ in opcodes if tag in ('delete', 'replace'))
+
+    out = []
+    for group in _group_opcodes(opcodes, context):
+        if not out:
+            out.append(f'--- {from_path}\n')
+            out.append(f'+++ {to_path}\n')
+        first, last = group[0], group[-1]
+        out.append(f'@@ -{_format_range(first[1], last[2])} +{_format_range(first[3], last[4])} @@\n')
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                out.extend(_line(' ', line) for line in old_lines[i1:i2])
+                continue
+            if tag in ('replace', 'delete'):
+                out.extend(_line('-', line) for line in old_lines[i1:i2])
+            if tag in ('replace', 'insert'):
+                out.extend(_line('+', line) for line in new_lines[j1:j2])
+
+    return {'diff': ''.join(out), 'additions': additions, 'deletions': deletions}
+
+
+def diff_entries(path: str, before: Optional[dict], after: Optional[dict], context: int = 3) -> dict:
+    """
+    比较目录树中同一路径的两个版本，结果按(路径, 旧哈希, 新哈希, 上下文行数)缓存
+
+    二进制文件和超过VCS_DIFF_MAX_BYTES的文本只记录哈希变化，不计算差异
+
+    Args:
+        path: 文件路径
+        before: 旧版本的目录树条目（新增文件为None）
+        after: 新版本的目录树条目（删除文件为None）
+        context: 上下文行数
+
+    Returns:
+        dict: {"status": "text"/"binary"/"too_large", "diff": 差异文本或None,
+               "additions": 新增行数或None, "deletions": 删除行数或None}
+    """
+    from app.utils.vcs import objects
+
+    entries = [e for e in (before, after) if e]
+    if any(e['kind'] != 'text' for e in entries):
+        return {'status': 'binary', 'diff': None, 'additions': None, 'deletions': None}
+
+    config = current_app.config
+    if any(e['size'] > config['VCS_DIFF_MAX_BYTES'] for e in entries):
+        return {'status': 'too_large', 'diff': None, 'additions': None, 'deletions': None}
+
+    key = (path, before['hash'] if before else None, after['hash'] if after else None, context)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return cached
+
+    result = unified_diff(
+        objects.load_text(before['hash']) if before else '',
+        objects.load_text(after['hash']) if after else '',
+        f'a/{path}' if before else '/dev/null',
+        f'b/{path}' if after else '/dev/null',
+        context=context,
+        max_edits=config['VCS_DIFF_MAX_EDITS']
+    )
+    result['status'] = 'text'
+
+    with _cache_lock:
+        _cache[key] = result
+        while len(_cache) > config['VCS_DIFF_CACHE_SIZE']:
+            _cache.popitem(last=False)
+    return result
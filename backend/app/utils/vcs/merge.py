@@ -0,0 +1,108 @@
+"""
+三方合并
+以共同的基础版本为参照，分别计算双方的修改区域（基础版本中的行区间），
+互不重叠的修改直接合并；重叠的修改若结果相同则保留一份，否则记为冲突
+"""
+from typing import List, Tuple
+
+from app.utils.vcs.diff import get_opcodes
+
+
+class MergeConflict(Exception):
+    """双方修改了同一区域"""
+
+    def __init__(self, conflicts: List[dict]):
+        super().__init__(f'{len(conflicts)}处修改冲突')
+        self.conflicts = conflicts
+
+
+def _hunks(base_lines: List[str], lines: List[str], side: str, max_edits: int) -> List[Tuple[int, int, List[str], str]]:
+    """一方相对于基础版本的修改：[(基础起始行, 基础结束行, 替换后的行, 哪一方), ...]"""
+    return [
+        (i1, i2, lines[j1:j2], side)
+        for tag, i1, i2, j1, j2 in get_opcodes(base_lines, lines, max_edits)
+        if tag != 'equal'
+    ]
+
+
+def _apply(base_lines: List[str], start: int, end: int, hunks) -> List[str]:
+    """把同一方的修改应用到基础版本的[start, end)区间"""
+    out = []
+    pos = start
+    for i1, i2, replacement, _ in hunks:
+        out.extend(base_lines[pos:i1])
+        out.extend(replacement)
+        pos = i2
+    out.extend(base_lines[pos:end])
+    return out
+
+
+def merge3(base: str, ours: str, theirs: str, max_edits: int = 1000) -> str:
+    """
+    三方合并文本
+
+    Args:
+        base: 共同的基础版本
+        ours: 当前保存的版本
+        theirs: 新提交的版本
+        max_edits: 差异计算的编辑距离上限
+
+    Returns:
+        合并后的文本
+
+    Raises:
+        MergeConflict: 双方修改了同一区域且结果不同，conflicts为
+            [{"base_start": 基础版本起始行（从1开始）, "base_end": 结束行, "ours": [...], "theirs": [...]}]，
+            双方都在同一位置插入时base_end = base_start - 1
+    """
+    if ours == theirs or theirs == base:
+        return ours
+    if ours == base:
+        return theirs
+
+    base_lines = base.splitlines(keepends=True)
+    hunks = sorted(
+        _hunks(base_lines, ours.splitlines(keepends=True), 'ours', max_edits) +
+        _hunks(base_lines, theirs.splitlines(keepends=True), 'theirs', max_edits),
+        key=lambda h: (h[0], h[1])
+    )
+
+    # 把重叠的修改分为一组；修改相邻的不同行可以合并，但在同一位置的插入无法确定先后，也分为一组
+    groups = []
+    for hunk in hunks:
+        if groups and (
+            hunk[0] < groups[-1][1] or
+            (hunk[0] == groups[-1][1] and (hunk[0] == hunk[1] or groups[-1][2][-1][0] == groups[-1][2][-1][1]))
+        ):
+            group = groups[-1]
+            group[1] = max(group[1], hunk[1])
+            group[2].append(hunk)
+        else:
+            groups.append([hunk[0], hunk[1], [hunk]])
+
+    merged = []
+    conflicts = []
+    pos = 0
+    for start, end, group in groups:
+        merged.extend(base_lines[pos:start])
+        pos = end
+        ours_hunks = [h for h in group if h[3] == 'ours']
+        theirs_hunks = [h for h in group if h[3] == 'theirs']
+        ours_region = _apply(base_lines, start, end, ours_hunks)
+        theirs_region = _apply(base_lines, start, end, theirs_hunks)
+        if not ours_hunks:
+            merged.extend(theirs_region)
+        elif not theirs_hunks or ours_region == theirs_region:
+            merged.extend(ours_region)
+        else:
+            conflicts.append({
+                'base_start': start + 1,
+                'base_end': end,
+                'ours': [line.rstrip('\r\n') for line in ours_region],
+                'theirs': [line.rstrip('\r\n') for line in theirs_region]
+            })
+    merged.extend(base_lines[pos:])
+
+    if conflicts:
+        raise MergeConflict(conflicts)
+    return ''.join(merged)
@@ -0,0 +1,409 @@
+"""
+版本对象存储
+文件内容、目录树、提交都以内容哈希寻址，对象一旦写入就不再修改
+
+文本内容以增量链保存：修改后的文件相对于上一版本只保存增量，链长达到VCS_MAX_DELTA_CHAIN时
+重新保存完整内容作为关键帧，读取任意版本最多应用VCS_MAX_DELTA_CHAIN个增量；
+最近读取或写入的版本保存在进程内LRU缓存中
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from app.models import db
+from app.models.commit import Commit
+from app.models.content_revision import ContentRevision
+from app.models.project import ProjectFile
+from app.models.snapshot import SnapshotBlob, SnapshotTree
+from app.utils import blob_store
+from app.utils.scheduler import periodic
+from app.utils.vcs import delta
+
+# 进程内重建缓存：内容哈希 -> 文本
+_cache = OrderedDict()
+_cache_bytes = 0
+_cache_hits = 0
+_cache_misses = 0
+_cache_lock = threading.Lock()
+
+
+class ObjectNotFound(Exception):
+    """版本对象不存在"""
+
+
+def hash_content(data: bytes) -> str:
+    """内容哈希（SHA-256）"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _insert_once(obj):
+    """插入不可变对象，已存在（包括并发插入）时忽略"""
+    try:
+        with db.session.begin_nested():
+            db.session.add(obj)
+        return True
+    except IntegrityError:
+        return False
+
+
+def store_text(content: str, base_hash: Optional[str] = None) -> str:
+    """
+    保存文本内容快照，相同内容只保存一次
+
+    指定基础版本时尝试保存为相对于基础版本的增量；基础版本的增量链已达上限、
+    内容太小或增量不比完整内容小时保存完整内容
+
+    Args:
+        content: 文本内容
+        base_hash: 基础版本的内容哈希（通常是上一次提交中同一文件的版本，可选）
+
+    Returns:
+        内容哈希
+    """
+    content = content or ''
+    data = content.encode('utf-8')
+    content_hash = hash_content(data)
+    if db.session.get(SnapshotBlob, content_hash) is not None and _touch(content_hash):
+        return content_hash
+
+    config = current_app.config
+    full = delta.compress(data)
+    blob = SnapshotBlob(hash=content_hash, size=len(data), storage='full', data=full, stored_size=len(full))
+
+    base = db.session.get(SnapshotBlob, base_hash) if base_hash else None
+    if (
+        base is not None
+        and base.storage in ('full', 'delta')
+        and base.chain_depth < config['VCS_MAX_DELTA_CHAIN']
+        and len(data) >= config['VCS_DELTA_MIN_SIZE']
+    ):
+        encoded = delta.encode(load_text(base_hash), content)
+        if len(encoded) < len(full):
+            blob.storage = 'delta'
+            blob.data = encoded
+            blob.stored_size = len(encoded)
+            blob.base_hash = base_hash
+            blob.chain_depth = base.chain_depth + 1
+
+    _insert_once(blob)
+    # 下一次提交通常以这个版本为基础，放入缓存避免重建
+    _cache_put(content_hash, content)
+    return content_hash
+
+
+def _touch(content_hash: str) -> bool:
+    """
+    复用已有的文本快照时刷新其时间，回收任务不会删除宽限期内复用的快照
+
+    Returns:
+        快照是否仍存在（回收任务已删除时返回False，由调用方重新保存）
+    """
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=current_app.config['FILE_GC_GRACE_PERIOD'] / 2)
+    if SnapshotBlob.query.filter(SnapshotBlob.hash == content_hash, SnapshotBlob.created_at >= stale).count():
+        return True
+    touched = SnapshotBlob.query.filter(SnapshotBlob.hash == content_hash).update(
+        {SnapshotBlob.created_at: now}, synchronize_session=False
+    )
+    return bool(touched)
+
+
+def store_stored_file(content_hash: str, size: int) -> str:
+    """
+    登记内容块存储中的二进制文件，快照持有该内容块的一个引用，保证历史版本不会被回收；
+    不再被任何提交引用后由collect_unreachable释放
+
+    Args:
+        content_hash: 内容块哈希
+        size: 文件大小
+
+    Returns:
+        内容哈希
+    """
+    if db.session.get(SnapshotBlob, content_hash) is None:
+        if _insert_once(SnapshotBlob(hash=content_hash, size=size or 0, storage='blob', stored_size=0)):
+            blob_store.acquire(content_hash, size or 0)
+    return content_hash
+
+
+def load_bytes(content_hash: str) -> bytes:
+    """
+    读取内容快照
+
+    Args:
+        content_hash: 内容哈希
+
+    Returns:
+        文件内容
+
+    Raises:
+        ObjectNotFound: 内容不存在
+    """
+    blob = _get_blob(content_hash)
+    if blob.storage == 'blob':
+        with open(blob_store.blob_path(content_hash), 'rb') as f:
+            return f.read()
+    return load_text(content_hash).encode('utf-8')
+
+
+def load_text(content_hash: str) -> str:
+    """
+    读取文本内容快照
+
+    从目标版本沿增量链向前查找，直到关键帧或缓存中已有的版本，再依次应用增量
+
+    Args:
+        content_hash: 内容哈希
+
+    Returns:
+        文本内容
+
+    Raises:
+        ObjectNotFound: 内容不存在
+    """
+    cached = _cache_get(content_hash)
+    if cached is not None:
+        return cached
+
+    chain = []
+    text = None
+    current = content_hash
+    while True:
+        blob = _get_blob(current)
+        if blob.storage == 'blob':
+            with open(blob_store.blob_path(current), 'rb') as f:
+                return f.read().decode('utf-8', errors='replace')
+        if blob.storage == 'full':
+            text = delta.decompress(blob.data).decode('utf-8')
+            break
+        chain.append(blob)
+        current = blob.base_hash
+        text = _cache_get(current, record=False)
+        if text is not None:
+            break
+
+    for blob in reversed(chain):
+        text = delta.apply(text, blob.data)
+
+    _cache_put(content_hash, text)
+    return text
+
+
+def _get_blob(content_hash: str) -> SnapshotBlob:
+    """按哈希获取内容快照记录"""
+    blob = db.session.get(SnapshotBlob, content_hash)
+    if blob is None:
+        raise ObjectNotFound(f'内容不存在: {content_hash}')
+    return blob
+
+
+def _cache_get(content_hash: str, record: bool = True) -> Optional[str]:
+    """从重建缓存读取，命中时移到最近使用的位置；record为False时不计入命中统计"""
+    global _cache_hits, _cache_misses
+    with _cache_lock:
+        text = _cache.get(content_hash)
+        if text is not None:
+            _cache.move_to_end(content_hash)
+        if record:
+            if text is None:
+                _cache_misses += 1
+            else:
+                _cache_hits += 1
+        return text
+
+
+def _cache_put(content_hash: str, text: str):
+    """写入重建缓存，超过VCS_CACHE_MAX_BYTES时淘汰最久未使用的版本"""
+    global _cache_bytes
+    max_bytes = current_app.config['VCS_CACHE_MAX_BYTES']
+    size = len(text)
+    if size > max_bytes:
+        return
+    with _cache_lock:
+        if content_hash in _cache:
+            _cache.move_to_end(content_hash)
+            return
+        _cache[content_hash] = text
+        _cache_bytes += size
+        while _cache_bytes > max_bytes:
+            _, evicted = _cache.popitem(last=False)
+            _cache_bytes -= len(evicted)
+
+
+def storage_stats() -> dict:
+    """
+    获取版本内容的存储统计
+
+    Returns:
+        dict: 按存储方式统计的版本数、原始大小和实际占用，整体压缩比，最长增量链和缓存命中情况
+    """
+    rows = db.session.query(
+        SnapshotBlob.storage,
+        func.count(SnapshotBlob.hash),
+        func.coalesce(func.sum(SnapshotBlob.size), 0),
+        func.coalesce(func.sum(SnapshotBlob.stored_size), 0),
+        func.coalesce(func.max(SnapshotBlob.chain_depth), 0)
+    ).group_by(SnapshotBlob.storage).all()
+
+    by_storage = {}
+    text_size = text_stored = max_depth = 0
+    for storage, count, size, stored, depth in rows:
+        by_storage[storage] = {'count': count, 'bytes': int(size), 'stored_bytes': int(stored)}
+        if storage != 'blob':
+            text_size += int(size)
+            text_stored += int(stored)
+            max_depth = max(max_depth, depth or 0)
+
+    with _cache_lock:
+        requests = _cache_hits + _cache_misses
+        cache = {
+            'entries': len(_cache),
+            'bytes': _cache_bytes,
+            'max_bytes': current_app.config['VCS_CACHE_MAX_BYTES'],
+            'hits': _cache_hits,
+            'misses': _cache_misses,
+            'hit_ratio': round(_cache_hits / requests, 4) if requests else 0.0
+        }
+
+    return {
+        'by_storage': by_storage,
+        'text_bytes': text_size,
+        'text_stored_bytes': text_stored,
+        'compression_ratio': round(text_stored / text_size, 4) if text_size else 0.0,
+        'max_chain_depth': max_depth,
+        'max_delta_chain': current_app.config['VCS_MAX_DELTA_CHAIN'],
+        'cache': cache
+    }
+
+
+def write_tree(entries: List[dict]) -> str:
+    """
+    保存目录树快照
+
+    条目按路径排序后规范化为JSON计算哈希，文件未变化时得到同一棵树
+
+    Args:
+        entries: [{"path", "hash", "size", "kind", "file_type"}, ...]
+
+    Returns:
+        树哈希
+    """
+    entries = sorted(entries, key=lambda e: (e['path'], e['hash']))
+    canonical = json.dumps(
+        [[e['path'], e['kind'], e['hash']] for e in entries],
+        ensure_ascii=False,
+        separators=(',', ':')
+    ).encode('utf-8')
+    tree_hash = hash_content(canonical)
+    if db.session.get(SnapshotTree, tree_hash) is None:
+        _insert_once(SnapshotTree(hash=tree_hash, entries=entries))
+    return tree_hash
+
+
+def read_tree(tree_hash: Optional[str]) -> List[dict]:
+    """
+    读取目录树快照（一次主键查询）
+
+    Args:
+        tree_hash: 树哈希（为空时返回空树）
+
+    Returns:
+        条目列表
+    """
+    if not tree_hash:
+        return []
+    tree = db.session.get(SnapshotTree, tree_hash)
+    if tree is None:
+        raise ObjectNotFound(f'目录树不存在: {tree_hash}')
+    return list(tree.entries)
+
+
+def commit_hash(tree_hash: str, parent_hash: Optional[str], committer_id: int, timestamp: str, message: str) -> str:
+    """
+    计算提交哈希（覆盖树、父提交、提交者、时间和提交信息）
+
+    Returns:
+        提交哈希
+    """
+    payload = (
+        f'tree {tree_hash}\n'
+        f'parent {parent_hash or ""}\n'
+        f'committer {committer_id} {timestamp}\n'
+        f'\n{message}'
+    ).encode('utf-8')
+    return hash_content(payload)
+
+
+@periodic('VCS_GC_INTERVAL', 24 * 3600)
+def collect_unreachable():
+    """
+    回收不再被引用的目录树和内容快照（如项目删除后、在线编辑的旧修订被裁剪后），并释放二进制快照持有的内容块引用
+
+    从所有提交的目录树标记仍在使用的内容；项目文件当前引用的内容块也视为在用（正在创建的提交
+    会登记这些内容），在线编辑修订记录引用的文本也视为在用。文本快照还要保留增量链上的所有基础版本。
+    创建（或最近被复用）时间在FILE_GC_GRACE_PERIOD内的对象不回收，避免与尚未提交的事务竞争
+
+    Returns:
+        dict: {"trees": 删除的目录树数, "blobs": 释放的二进制快照数, "texts": 删除的文本快照数}
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['FILE_GC_GRACE_PERIOD'])
+
+    live_trees = {row[0] for row in db.session.query(Commit.tree_hash).distinct() if row[0]}
+    live_blobs = {row[0] for row in db.session.query(ProjectFile.blob_hash).distinct() if row[0]}
+    live_texts = {row[0] for row in db.session.query(ContentRevision.content_hash).distinct()}
+    # 用子查询关联提交，不把所有目录树哈希作为绑定参数（超过SQLite的参数个数上限）
+    referenced = SnapshotTree.query.filter(SnapshotTree.hash.in_(db.session.query(Commit.tree_hash)))
+    for tree in referenced.yield_per(100):
+        for entry in tree.entries or []:
+            (live_blobs if entry.get('kind') == 'binary' else live_texts).add(entry['hash'])
+
+    # 增量依赖的基础版本
+    bases = dict(db.session.query(SnapshotBlob.hash, SnapshotBlob.base_hash).filter(SnapshotBlob.base_hash.isnot(None)))
+    pending = list(live_texts)
+    while pending:
+        base_hash = bases.get(pending.pop())
+        if base_hash and base_hash not in live_texts:
+            live_texts.add(base_hash)
+            pending.append(base_hash)
+
+    result = {'trees': 0, 'blobs': 0, 'texts': 0}
+    for (tree_hash,) in db.session.query(SnapshotTree.hash).filter(SnapshotTree.created_at < cutoff).all():
+        if tree_hash not in live_trees:
+            SnapshotTree.query.filter_by(hash=tree_hash).delete(synchronize_session=False)
+            result['trees'] += 1
+
+    unreachable = [
+        row[0] for row in db.session.query(SnapshotBlob.hash).filter(
+            SnapshotBlob.storage == 'blob',
+            SnapshotBlob.created_at < cutoff
+        ).all()
+        if row[0] not in live_blobs
+    ]
+    for content_hash in unreachable:
+        SnapshotBlob.query.filter_by(hash=content_hash).delete(synchronize_session=False)
+        blob_store.release(content_hash)
+        result['blobs'] += 1
+
+    unreachable = [
+        row[0] for row in db.session.query(SnapshotBlob.hash).filter(
+            SnapshotBlob.storage != 'blob',
+            SnapshotBlob.created_at < cutoff
+        ).all()
+        if row[0] not in live_texts
+    ]
+    for content_hash in unreachable:
+        # 条件删除：标记之后被store_text复用（刷新了时间）的快照保留
+        result['texts'] += SnapshotBlob.query.filter(
+            SnapshotBlob.hash == content_hash,
+            SnapshotBlob.created_at < cutoff
+        ).delete(synchronize_session=False)
+
+    db.session.commit()
+    return result
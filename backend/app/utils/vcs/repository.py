@@ -0,0 +1,314 @@
+"""
+项目版本库操作
+提交时为项目的当前文件生成目录树快照，与父提交的树比较得到文件变更；
+检出任意提交只需读取其目录树，恢复时把快照内容写回项目文件
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import defer
+
+from app.models import db
+from app.models.commit import Commit, FileChange
+from app.models.project import Project, ProjectFile
+from app.models.user import User
+from app.utils import blob_store, content_edit
+from app.utils.vcs import blame, diff, objects
+
+
+class VersionControlError(Exception):
+    """版本操作失败"""
+
+    status_code = 400
+
+
+class NothingToCommit(VersionControlError):
+    """与上一次提交相比没有变化"""
+
+
+class CommitConflict(VersionControlError):
+    """提交期间项目已有其他新提交"""
+
+    status_code = 409
+
+
+class CommitNotFound(VersionControlError):
+    """提交不存在"""
+
+    status_code = 404
+
+
+def snapshot_entry(project_file: ProjectFile, base_hash: Optional[str] = None) -> dict:
+    """
+    为项目文件生成目录树条目，内容写入对象存储
+
+    Args:
+        project_file: ProjectFile对象
+        base_hash: 上一次提交中同一文件的文本内容哈希，用作增量的基础版本（可选）
+
+    Returns:
+        dict: {"path", "hash", "size", "kind", "file_type"}
+    """
+    if project_file.is_text:
+        content_hash = objects.store_text(project_file.content or '', base_hash=base_hash)
+        size = len((project_file.content or '').encode('utf-8'))
+        kind = 'text'
+    else:
+        content_hash = objects.store_stored_file(project_file.blob_hash, project_file.file_size)
+        size = project_file.file_size or 0
+        kind = 'binary'
+    return {
+        'path': project_file.filename,
+        'hash': content_hash,
+        'size': size,
+        'kind': kind,
+        'file_type': project_file.file_type
+    }
+
+
+def snapshot_project(project_id: int, base_entries: Optional[List[dict]] = None) -> Tuple[str, List[dict], Dict[str, ProjectFile]]:
+    """
+    为项目当前的所有文件生成目录树快照
+
+    同名文件只保留最新创建的一个；修改过的文本文件以base_entries中同一路径的版本为基础保存增量
+
+    Args:
+        project_id: 项目ID
+        base_entries: 父提交的目录树条目（可选）
+
+    Returns:
+        tuple: (树哈希, 条目列表, 路径到ProjectFile的映射)
+    """
+    files_by_path = {}
+    for project_file in ProjectFile.query.filter_by(project_id=project_id).order_by(ProjectFile.id).all():
+        files_by_path[project_file.filename] = project_file
+
+    bases = {e['path']: e['hash'] for e in (base_entries or []) if e['kind'] == 'text'}
+    entries = [snapshot_entry(f, bases.get(path)) for path, f in files_by_path.items()]
+    return objects.write_tree(entries), entries, files_by_path
+
+
+def diff_trees(old_entries: List[dict], new_entries: List[dict]) -> List[Tuple[str, str, Optional[dict], Optional[dict]]]:
+    """
+    比较两棵目录树
+
+    Returns:
+        list: [(变更类型add/modify/delete, 路径, 旧条目, 新条目), ...]，按路径排序
+    """
+    old = {e['path']: e for e in old_entries}
+    new = {e['path']: e for e in new_entries}
+    changes = []
+    for path in sorted(set(old) | set(new)):
+        before, after = old.get(path), new.get(path)
+        if before is None:
+            changes.append(('add', path, None, after))
+        elif after is None:
+            changes.append(('delete', path, before, None))
+        elif before['hash'] != after['hash']:
+            changes.append(('modify', path, before, after))
+    return changes
+
+
+def get_commit(project_id: int, ref: str) -> Commit:
+    """
+    按哈希（或至少7位的唯一前缀、HEAD）查找提交
+
+    Raises:
+        CommitNotFound: 提交不存在或前缀不唯一
+    """
+    if ref == 'HEAD':
+        ref = db.session.query(Project.head_commit_hash).filter_by(id=project_id).scalar()
+        if not ref:
+            raise CommitNotFound('项目还没有提交')
+
+    if len(ref) == 64:
+        commit = Commit.query.filter_by(project_id=project_id, hash=ref).first()
+    elif len(ref) >= 7:
+        matches = Commit.query.filter(
+            Commit.project_id == project_id,
+            Commit.hash.startswith(ref)
+        ).limit(2).all()
+        commit = matches[0] if len(matches) == 1 else None
+    else:
+        commit = None
+
+    if commit is None:
+        raise CommitNotFound('提交不存在')
+    return commit
+
+
+def list_commits(project_id: int, limit: int, before_id: Optional[int] = None) -> Tuple[List[dict], Optional[int]]:
+    """
+    按时间倒序分页获取提交历史（键集分页）
+
+    固定3次查询：提交、提交者、文件变更摘要（不含差异和文件内容）
+
+    Args:
+        project_id: 项目ID
+        limit: 每页数量
+        before_id: 上一页最后一个提交的ID（可选）
+
+    Returns:
+        tuple: (提交字典列表, 下一页游标，没有更多时为None)
+    """
+    query = Commit.query.filter(Commit.project_id == project_id)
+    if before_id:
+        query = query.filter(Commit.id < before_id)
+    commits = query.order_by(Commit.id.desc()).limit(limit + 1).all()
+
+    has_more = len(commits) > limit
+    commits = commits[:limit]
+    if not commits:
+        return [], None
+
+    # 提交者加载到会话后，committer关系直接从标识映射中取得，不再逐个查询
+    User.query.filter(User.id.in_({c.committer_id for c in commits})).all()
+
+    changes_by_commit = {c.id: [] for c in commits}
+    for change in FileChange.query.options(defer(FileChange.diff_content)).filter(
+        FileChange.commit_id.in_(changes_by_commit)
+    ).order_by(FileChange.filename).all():
+        changes_by_commit[change.commit_id].append(change)
+
+    items = [c.to_dict(file_changes=changes_by_commit[c.id], include_diff=False) for c in commits]
+    return items, commits[-1].id if has_more else None
+
+
+def create_commit(project: Project, committer_id: int, message: str) -> Tuple[Commit, list]:
+    """
+    为项目的当前文件创建提交
+
+    以比较并交换的方式移动项目的HEAD，期间如有其他人提交则抛出CommitConflict。
+    调用方负责提交数据库事务
+
+    Args:
+        project: Project对象
+        committer_id: 提交者ID
+        message: 提交信息
+
+    Returns:
+        tuple: (Commit对象, diff_trees返回的变更列表)
+    """
+    parent_hash = project.head_commit_hash
+    parent = Commit.query.filter_by(project_id=project.id, hash=parent_hash).first() if parent_hash else None
+    old_entries = objects.read_tree(parent.tree_hash) if parent else []
+
+    tree_hash, entries, files_by_path = snapshot_project(project.id, old_entries)
+    if (parent and tree_hash == parent.tree_hash) or (not parent and not entries):
+        raise NothingToCommit('没有需要提交的变更')
+
+    changes = diff_trees(old_entries, entries)
+    created_at = datetime.utcnow()
+    commit = Commit(
+        project_id=project.id,
+        committer_id=committer_id,
+        message=message,
+        hash=objects.commit_hash(tree_hash, parent_hash, committer_id, created_at.isoformat(), message),
+        parent_hash=parent_hash,
+        tree_hash=tree_hash,
+        created_at=created_at
+    )
+    db.session.add(commit)
+    db.session.flush()
+
+    for change_type, path, before, after in changes:
+        project_file = files_by_path.get(path)
+        file_diff = diff.diff_entries(path, before, after)
+        db.session.add(FileChange(
+            commit_id=commit.id,
+            file_id=project_file.id if project_file and after else None,
+            filename=path,
+            change_type=change_type,
+            old_hash=before['hash'] if before else None,
+            new_hash=after['hash'] if after else None,
+            diff_status=file_diff['status'],
+            diff_content=file_diff['diff'],
+            additions=file_diff['additions'],
+            deletions=file_diff['deletions']
+        ))
+
+    blame.update_blame(commit, changes)
+
+    head_filter = Project.head_commit_hash == parent_hash if parent_hash else Project.head_commit_hash.is_(None)
+    moved = Project.query.filter(Project.id == project.id, head_filter).update(
+        {Project.head_commit_hash: commit.hash},
+        synchronize_session=False
+    )
+    if not moved:
+        raise CommitConflict('项目已有新的提交，请刷新后重试')
+    project.head_commit_hash = commit.hash
+
+    return commit, changes
+
+
+def restore(project: Project, commit: Commit, user_id: int, paths: Optional[List[str]] = None) -> dict:
+    """
+    把项目文件恢复为某个提交时的内容
+
+    指定paths时只恢复这些文件；未指定时整体恢复，提交中不存在的文件会被删除。
+    调用方负责提交数据库事务
+
+    Args:
+        project: Project对象
+        commit: Commit对象
+        user_id: 操作用户ID（新建文件的创建者）
+        paths: 要恢复的文件路径列表（可选）
+
+    Returns:
+        dict: {"restored": [路径], "created": [路径], "deleted": [路径]}
+    """
+    entries = objects.read_tree(commit.tree_hash)
+    if paths is not None:
+        wanted = set(paths)
+        missing = wanted - {e['path'] for e in entries}
+        if missing:
+            raise VersionControlError(f'提交中不存在这些文件: {", ".join(sorted(missing))}')
+        entries = [e for e in entries if e['path'] in wanted]
+
+    current = {}
+    for project_file in ProjectFile.query.filter_by(project_id=project.id).order_by(ProjectFile.id).all():
+        current.setdefault(project_file.filename, []).append(project_file)
+
+    result = {'restored': [], 'created': [], 'deleted': []}
+    for entry in entries:
+        existing = current.pop(entry['path'], [])
+        project_file = existing[-1] if existing else None
+        if project_file is None:
+            project_file = ProjectFile(project_id=project.id, filename=entry['path'], creator_id=user_id)
+            db.session.add(project_file)
+            result['created'].append(entry['path'])
+        else:
+            result['restored'].append(entry['path'])
+            # 新版本号使持有恢复前ETag的客户端的保存进入合并，而不是覆盖恢复的内容
+            if entry['kind'] == 'text':
+                content_edit.apply_content_edit(
+                    project_file, 'project_file', objects.load_text(entry['hash']), None, user_id
+                )
+            else:
+                content_edit.bump_version(project_file)
+        _apply_entry(project_file, entry)
+
+    if paths is None:
+        for files in current.values():
+            for project_file in files:
+                db.session.delete(project_file)
+                result['deleted'].append(project_file.filename)
+
+    return result
+
+
+def _apply_entry(project_file: ProjectFile, entry: dict):
+    """把目录树条目的内容写入项目文件，并调整内容块引用"""
+    new_blob = entry['hash'] if entry['kind'] == 'binary' else None
+    if project_file.blob_hash != new_blob:
+        if new_blob:
+            blob_store.acquire(new_blob, entry['size'])
+        if project_file.blob_hash:
+            blob_store.release(project_file.blob_hash)
+
+    project_file.blob_hash = new_blob
+    project_file.file_path = blob_store.blob_path(new_blob) if new_blob else None
+    project_file.content = objects.load_text(entry['hash']) if entry['kind'] == 'text' else None
+    project_file.file_type = entry.get('file_type')
+    project_file.file_size = entry['size']
+    project_file.refresh_content_hash()
@@ -136,6 +136,10 @@ class XunfeiAPI:
             return None
 
 
+# 文件分析提示词版本，修改analyze_file_content的提示词后需递增，使缓存的旧分析结果失效
+ANALYSIS_PROMPT_VERSION = '1'
+
+
 def analyze_file_content(content, file_type='text'):
     """
     分析文件内容并给出任务完成时间估计和着手建议
@@ -1,6 +1,13 @@
 """
 Flask应用启动文件
 """
+import os
+
+if os.getenv('SOCKETIO_MESSAGE_QUEUE'):
+    # 消息队列的监听任务使用阻塞的网络库，需要在导入其他模块之前协程化
+    import eventlet
+    eventlet.monkey_patch()
+
 from app import create_app, socketio
 
 # 创建应用实例
@@ -0,0 +1,50 @@
+"""
+测试公共夹具
+每个测试使用独立的SQLite数据库和上传目录
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from app.config import TestingConfig  # noqa: E402
+from app.models import db, User  # noqa: E402
+from app.routes.auth import generate_token  # noqa: E402
+from app.utils import chat_writer  # noqa: E402
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """按覆盖的配置项创建应用"""
+    def factory(**overrides):
+        attrs = {
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "test.db"}',
+            'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        }
+        attrs.update(overrides)
+        config = type('Config', (TestingConfig,), attrs)
+        return create_app(config)
+    yield factory
+    # 聊天消息的后台写入线程绑定在创建它的应用上，测试之间不能共用
+    chat_writer.shutdown()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def make_user(app):
+    """创建用户，返回(用户ID, 认证请求头)"""
+    def factory(username='alice', email=None):
+        with app.app_context():
+            user = User(username=username, email=email or f'{username}@example.com')
+            user.set_password('secret123')
+            db.session.add(user)
+            db.session.commit()
+            return user.id, {'Authorization': f'Bearer {generate_token(user)}'}
+    return factory
@@ -0,0 +1,27 @@
+"""
+聊天消息ID：雪花ID超过2^53，序列化为字符串后客户端仍能精确去重和补发
+"""
+from app.utils import chat_history, chat_writer
+
+
+def test_message_ids_are_exact_strings_and_resync_round_trips(app, make_user):
+    user_id, headers = make_user()
+    group = app.test_client().post('/api/groups', json={'name': 'g'}, headers=headers).get_json()
+    group_id = (group.get('group') or group)['id']
+
+    with app.app_context():
+        rows = [chat_writer.submit(group_id, user_id, f'm{i}') for i in range(5)]
+        assert chat_writer.flush()
+
+        # 同一毫秒内的相邻ID转为浮点数（JavaScript的number）后无法区分
+        assert rows[0]['id'] > 2 ** 53
+        payload = chat_writer.to_payload(rows[2])
+        assert payload['id'] == str(rows[2]['id'])
+
+        page = chat_history.load_page(group_id)
+        ids = [m['id'] for m in page['messages']]
+        assert ids == [str(row['id']) for row in rows]
+
+        # 客户端原样回传字符串ID，补发结果从下一条开始
+        resync = chat_history.load_since(group_id, int(ids[2]))
+        assert [m['content'] for m in resync['messages'] if int(m['id']) > int(ids[2])] == ['m3', 'm4']
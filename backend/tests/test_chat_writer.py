@@ -0,0 +1,44 @@
+"""
+聊天消息后台写入：多进程部署必须配置工作进程号，数据库暂时不可用时不丢弃已广播的消息
+"""
+import time
+
+import pytest
+from sqlalchemy import text
+
+from app.models import db, Message
+from app.utils import chat_writer
+
+
+def test_message_queue_requires_worker_id(make_app, tmp_path):
+    queue_url = f'sqlite:///{tmp_path}/queue.db'
+    with pytest.raises(ValueError):
+        make_app(SOCKETIO_MESSAGE_QUEUE=queue_url)
+    with pytest.raises(ValueError):
+        make_app(CHAT_WORKER_ID=1024)
+
+    app = make_app(SOCKETIO_MESSAGE_QUEUE=queue_url, CHAT_WORKER_ID=3)
+    with app.app_context():
+        message_id, _ = chat_writer.next_id()
+    assert (message_id >> chat_writer.SEQUENCE_BITS) & ((1 << chat_writer.WORKER_BITS) - 1) == 3
+
+
+def test_batch_survives_database_outage(app, monkeypatch):
+    monkeypatch.setattr(chat_writer, 'MAX_RETRY_DELAY', 0.2, raising=False)
+    app.config['CHAT_ACK_MODE'] = 'durable'
+
+    with app.app_context():
+        db.session.execute(text('ALTER TABLE messages RENAME TO messages_offline'))
+        db.session.commit()
+
+        row = chat_writer.submit(1, 1, 'sent during outage')
+        # 比原来的重试总时长更久
+        time.sleep(3.5)
+        assert chat_writer.pending_messages(1) == [row]
+
+        db.session.execute(text('ALTER TABLE messages_offline RENAME TO messages'))
+        db.session.commit()
+
+        chat_writer.wait_persisted(row['id'], timeout=5)
+        assert db.session.get(Message, row['id']).content == 'sent during outage'
+        assert chat_writer.pending_messages(1) == []
@@ -0,0 +1,55 @@
+"""
+分片上传：校验失败的重传不能破坏已确认的分片
+"""
+import hashlib
+import os
+
+from app.models import db, ProjectFile
+from app.utils import blob_store
+
+
+def _project(client, headers):
+    group = client.post('/api/groups', json={'name': 'g'}, headers=headers).get_json()
+    group_id = (group.get('group') or group)['id']
+    project = client.post(f'/api/projects/groups/{group_id}/projects', json={'name': 'p'}, headers=headers).get_json()
+    return (project.get('project') or project)['id']
+
+
+def _temp_dir(app):
+    with app.app_context():
+        return blob_store.temp_dir()
+
+
+def test_failed_retry_does_not_overwrite_acknowledged_chunk(app, make_user):
+    _, headers = make_user()
+    client = app.test_client()
+    project_id = _project(client, headers)
+
+    data = os.urandom(3000)
+    chunk_size = 1024
+    session = client.post('/api/uploads', json={
+        'target_type': 'project', 'target_id': project_id, 'filename': 'data.bin',
+        'file_size': len(data), 'chunk_size': chunk_size
+    }, headers=headers).get_json()['session']
+
+    chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+    for index, chunk in enumerate(chunks):
+        response = client.put(f'/api/uploads/{session["id"]}/chunks/{index}', data=chunk, headers={
+            **headers, 'X-Chunk-Checksum': hashlib.sha256(chunk).hexdigest()
+        })
+        assert response.status_code == 200
+
+    # 重传已确认的分片0，但数据在传输中损坏
+    response = client.put(f'/api/uploads/{session["id"]}/chunks/0', data=b'\0' * chunk_size, headers={
+        **headers, 'X-Chunk-Checksum': hashlib.sha256(chunks[0]).hexdigest()
+    })
+    assert response.status_code == 400
+
+    response = client.post(f'/api/uploads/{session["id"]}/complete', headers=headers)
+    assert response.status_code == 201
+
+    with app.app_context():
+        record = db.session.get(ProjectFile, response.get_json()['file']['id'])
+        with open(blob_store.blob_path(record.blob_hash), 'rb') as f:
+            assert f.read() == data
+    assert not [name for name in os.listdir(_temp_dir(app)) if name.endswith('.part')]
@@ -0,0 +1,117 @@
+"""
+提取文本缓存：键包含提取器版本和字符上限，项目文件也通过提取器注册表提取；
+分析缓存的键包含模型，上传文件名不影响临时文件路径
+"""
+import io
+
+import docx
+
+from app.models import db, ExtractedText
+from app.routes import ai
+from app.utils import content_cache
+
+
+def _docx_bytes(paragraphs):
+    document = docx.Document()
+    for text in paragraphs:
+        document.add_paragraph(text)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def _project(client, headers):
+    group = client.post('/api/groups', json={'name': 'g'}, headers=headers).get_json()
+    group_id = (group.get('group') or group)['id']
+    project = client.post(f'/api/projects/groups/{group_id}/projects', json={'name': 'p'}, headers=headers).get_json()
+    return (project.get('project') or project)['id']
+
+
+def test_cache_ignores_legacy_rows_and_tracks_budget(app, make_user):
+    _, headers = make_user()
+    client = app.test_client()
+    data = _docx_bytes(['第一段' * 20, '第二段' * 20])
+
+    def extract():
+        return client.post('/api/ai/extract-text', data={'file': (io.BytesIO(data), 'report.docx')},
+                           headers=headers, content_type='multipart/form-data').get_json()
+
+    first = extract()
+    assert first['cached'] is False and first['truncated'] is False
+    with app.app_context():
+        # 注册表之前按UTF-8读出的乱码条目
+        db.session.add(ExtractedText(content_hash=first['content_hash'], extractor_version='0',
+                                     max_chars=0, text='PK\x03\x04garbage', size_bytes=12))
+        db.session.commit()
+
+    second = extract()
+    assert second['cached'] is True
+    assert second['content'] == first['content']
+
+    # 调整字符上限后重新提取，截断标志来自缓存条目而不是按长度猜测
+    app.config['EXTRACT_MAX_CHARS'] = 30
+    limited = extract()
+    assert limited['cached'] is False and limited['truncated'] is True
+    again = extract()
+    assert again['cached'] is True and again['truncated'] is True
+    assert len(again['content']) <= 30
+
+
+def test_project_file_text_uses_extractor_registry(app, make_user):
+    _, headers = make_user()
+    client = app.test_client()
+    project_id = _project(client, headers)
+
+    response = client.post(f'/api/projects/{project_id}/files', data={
+        'filename': 'spec.docx', 'file': (io.BytesIO(_docx_bytes(['需求说明', '验收标准'])), 'spec.docx')
+    }, headers=headers, content_type='multipart/form-data')
+    file_id = response.get_json()['file']['id']
+
+    response = client.get(f'/api/projects/{project_id}/files/{file_id}/text', headers=headers)
+    assert response.status_code == 200
+    assert '需求说明' in response.get_json()['content']
+    with app.app_context():
+        assert content_cache.get_stats()['extracted_text']['entries'] == 1
+
+
+def test_extract_text_temp_suffix_ignores_path_characters(app, make_user, monkeypatch):
+    _, headers = make_user()
+    suffixes = []
+    original = ai.save_stream_with_hash
+
+    def record(stream, **kwargs):
+        suffixes.append(kwargs.get('suffix'))
+        return original(stream, **kwargs)
+
+    monkeypatch.setattr(ai, 'save_stream_with_hash', record)
+    client = app.test_client()
+    for name in ('notes.txt', 'a.b/../../../tmp/pwn', 'x.t\\..\\..\\evil'):
+        client.post('/api/ai/extract-text', data={'file': (io.BytesIO(b'hello'), name)},
+                    headers=headers, content_type='multipart/form-data')
+    assert suffixes[0] == '.txt'
+    assert all(not any(c in suffix for c in '/\\') and '..' not in suffix for suffix in suffixes)
+
+
+def test_analysis_cache_is_keyed_by_model(app, make_user, monkeypatch):
+    _, headers = make_user()
+    calls = []
+
+    def analyze(content, file_type):
+        calls.append(app.config['OPENAI_MODEL'])
+        return {'success': True, 'summary': f'by {app.config["OPENAI_MODEL"]}', 'estimated_hours': 1, 'suggestions': []}
+
+    monkeypatch.setattr(ai, 'analyze_file_content', analyze)
+    app.config.update(LLM_PROVIDER='openai', OPENAI_MODEL='model-a')
+    client = app.test_client()
+
+    def post():
+        return client.post('/api/ai/analyze-file', json={'content': '第一章作业'}, headers=headers).get_json()
+
+    assert post()['cached'] is False
+    assert post()['cached'] is True
+
+    # 切换模型后重新分析，不返回旧模型的结果
+    app.config['OPENAI_MODEL'] = 'model-b'
+    result = post()
+    assert result['cached'] is False and result['summary'] == 'by model-b'
+    assert calls == ['model-a', 'model-b']
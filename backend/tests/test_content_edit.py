@@ -0,0 +1,102 @@
+"""
+在线编辑的版本控制：恢复提交后旧ETag不能覆盖恢复的内容，裁剪的修订内容会被回收
+"""
+from app.models import db, ContentRevision, SnapshotBlob
+from app.utils import vcs
+
+
+def _project(client, headers):
+    group = client.post('/api/groups', json={'name': 'g'}, headers=headers).get_json()
+    group_id = (group.get('group') or group)['id']
+    project = client.post(f'/api/projects/groups/{group_id}/projects', json={'name': 'p'}, headers=headers).get_json()
+    return (project.get('project') or project)['id']
+
+
+def test_restore_bumps_version_and_stale_save_merges(app, make_user):
+    _, headers = make_user()
+    client = app.test_client()
+    project_id = _project(client, headers)
+
+    created = client.post(f'/api/projects/{project_id}/files', json={
+        'filename': 'notes.txt', 'content': 'a\nb\nc\n'
+    }, headers=headers).get_json()['file']
+    file_url = f'/api/projects/{project_id}/files/{created["id"]}'
+    commit = client.post(f'/api/projects/{project_id}/commits', json={'message': 'init'}, headers=headers).get_json()
+
+    response = client.put(file_url, json={'content': 'a\nB\nc\n'}, headers={**headers, 'If-Match': '"v1"'})
+    assert response.status_code == 200
+    assert response.headers['ETag'] == '"v2"'
+
+    response = client.post(f'/api/projects/{project_id}/commits/{commit["commit"]["hash"]}/restore', json={}, headers=headers)
+    assert response.status_code == 200
+    response = client.get(file_url, headers=headers)
+    assert response.headers['ETag'] == '"v3"'
+
+    # 仍持有恢复前ETag的客户端在末尾追加一行：与恢复的内容合并，不丢弃恢复
+    response = client.put(file_url, json={'content': 'a\nB\nc\nd\n'}, headers={**headers, 'If-Match': '"v2"'})
+    assert response.status_code == 200
+    assert response.get_json()['merged'] is True
+    assert response.get_json()['file']['content'] == 'a\nb\nc\nd\n'
+
+
+def test_deleting_project_removes_revisions(app, make_user):
+    _, headers = make_user()
+    client = app.test_client()
+    project_id = _project(client, headers)
+    created = client.post(f'/api/projects/{project_id}/files', json={
+        'filename': 'notes.txt', 'content': 'x\n'
+    }, headers=headers).get_json()['file']
+    client.put(f'/api/projects/{project_id}/files/{created["id"]}', json={'content': 'y\n'}, headers=headers)
+
+    with app.app_context():
+        assert ContentRevision.query.filter_by(target_type='project_file').count() > 0
+    assert client.delete(f'/api/projects/{project_id}', headers=headers).status_code == 200
+    with app.app_context():
+        assert ContentRevision.query.filter_by(target_type='project_file').count() == 0
+
+
+def _writing_item(client, headers, content):
+    return client.post('/api/writing/items', json={'title': 't', 'content': content}, headers=headers).get_json()['item']
+
+
+def test_trimmed_revision_snapshots_are_collected(app, make_user):
+    app.config.update(CONTENT_REVISION_KEEP=2, FILE_GC_GRACE_PERIOD=0)
+    _, headers = make_user()
+    client = app.test_client()
+    item = _writing_item(client, headers, 'draft 0\n')
+
+    for i in range(1, 11):
+        response = client.put(f'/api/writing/items/{item["id"]}', json={'content': f'draft {i}\n'}, headers=headers)
+        assert response.status_code == 200
+
+    with app.app_context():
+        assert SnapshotBlob.query.count() == 11
+        assert vcs.collect_unreachable()['texts'] == 9
+        kept = [row.content_hash for row in ContentRevision.query.order_by(ContentRevision.version)]
+        assert [vcs.load_text(content_hash) for content_hash in kept] == ['draft 9\n', 'draft 10\n']
+        assert SnapshotBlob.query.count() == 2
+
+    # 保存之前被回收的内容时重新保存快照
+    response = client.put(f'/api/writing/items/{item["id"]}', json={'content': 'draft 0\n'},
+                          headers={**headers, 'If-Match': '"v11"'})
+    assert response.status_code == 200
+    with app.app_context():
+        assert vcs.collect_unreachable()['texts'] == 1
+        latest = ContentRevision.query.order_by(ContentRevision.version.desc()).first()
+        assert vcs.load_text(latest.content_hash) == 'draft 0\n'
+
+
+def test_clear_all_sessions_keeps_history_of_surviving_items(app, make_user):
+    _, headers = make_user()
+    client = app.test_client()
+    session = client.post('/api/writing/sessions', json={'name': 's'}, headers=headers).get_json()['session']
+    item = client.post('/api/writing/items', json={'title': 't', 'content': 'a\n', 'session_id': session['id']},
+                       headers=headers).get_json()['item']
+    assert client.put(f'/api/writing/items/{item["id"]}', json={'content': 'b\n'}, headers=headers).status_code == 200
+
+    assert client.delete('/api/writing/sessions', headers=headers).status_code == 200
+
+    items = client.get('/api/writing/items', headers=headers).get_json()['items']
+    assert [(i['id'], i['session_id']) for i in items] == [(item['id'], None)]
+    with app.app_context():
+        assert ContentRevision.query.filter_by(target_type='writing_item', target_id=item['id']).count() == 2
@@ -0,0 +1,115 @@
+"""
+文本提取：并行时的文档副本数上限和只解析一次的共享文档
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.utils.extractors.base import TextExtractor
+
+
+class CountingExtractor(TextExtractor):
+    """每次open都解析一份新文档，记录打开次数和同时存活的副本数"""
+
+    units = 8
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.opened = 0
+        self.alive = 0
+        self.peak = 0
+
+    def open(self, path):
+        with self.lock:
+            self.opened += 1
+            self.alive += 1
+            self.peak = max(self.peak, self.alive)
+        return {'path': path}
+
+    def unit_count(self, doc):
+        return self.units
+
+    def extract_unit(self, doc, index):
+        time.sleep(0.01)
+        return f'unit-{index}'
+
+    def close(self, doc):
+        with self.lock:
+            self.alive -= 1
+
+
+class SharedExtractor(CountingExtractor):
+    shared_document = True
+
+
+@pytest.fixture
+def executor():
+    pool = ThreadPoolExecutor(max_workers=4)
+    yield pool
+    pool.shutdown(wait=True)
+
+
+def test_document_copies_capped_by_max_docs(executor):
+    extractor = CountingExtractor()
+    chunks = list(extractor.iter_text('doc', executor=executor, window=4, max_docs=2))
+
+    assert chunks == [f'unit-{i}' for i in range(8)]
+    assert extractor.peak <= 2
+    assert extractor.alive == 0
+
+
+def test_single_copy_extracts_serially(executor):
+    extractor = CountingExtractor()
+    chunks = list(extractor.iter_text('doc', executor=executor, window=4, max_docs=1))
+
+    assert chunks == [f'unit-{i}' for i in range(8)]
+    assert extractor.opened == 1
+
+
+def test_shared_document_opened_once(executor):
+    extractor = SharedExtractor()
+    chunks = list(extractor.iter_text('doc', executor=executor, window=4))
+
+    assert chunks == [f'unit-{i}' for i in range(8)]
+    assert extractor.opened == 1
+    assert extractor.alive == 0
+
+
+def test_presentation_parsed_once(tmp_path, executor, monkeypatch):
+    pptx = pytest.importorskip('pptx')
+    from app.utils.extractors.presentation import PresentationExtractor
+
+    prs = pptx.Presentation()
+    for i in range(6):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = f'slide {i}'
+    path = tmp_path / 'deck.pptx'
+    prs.save(path)
+
+    opened = []
+    real_presentation = pptx.Presentation
+
+    def counting_presentation(*args, **kwargs):
+        opened.append(1)
+        return real_presentation(*args, **kwargs)
+
+    monkeypatch.setattr(pptx, 'Presentation', counting_presentation)
+    chunks = list(PresentationExtractor().iter_text(str(path), executor=executor, window=4))
+
+    assert chunks == [f'slide {i}' for i in range(6)]
+    assert len(opened) == 1
+
+
+def test_registry_caps_copies_for_large_files(app, tmp_path):
+    from app.utils.extractors.registry import max_documents
+
+    path = tmp_path / 'big.bin'
+    path.write_bytes(b'x' * 1024)
+
+    with app.app_context():
+        app.config['EXTRACT_PARALLEL_MAX_BYTES'] = 4096
+        assert max_documents(str(path)) == 4
+        app.config['EXTRACT_PARALLEL_MAX_BYTES'] = 512
+        assert max_documents(str(path)) == 1
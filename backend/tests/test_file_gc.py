@@ -0,0 +1,101 @@
+"""
+孤立文件对账：旧文件记录保存的路径未规范化，内容块按哈希判断引用
+"""
+import hashlib
+import io
+import os
+from datetime import datetime, timedelta
+
+from app.models import db, Assignment, AssignmentFile, FileTombstone
+from app.utils import blob_store, file_gc
+
+
+def _legacy_file(app, user_id, relative):
+    """按旧上传代码的方式写入文件和记录：路径直接拼接在配置的UPLOAD_FOLDER之后"""
+    path = os.path.join(app.config['UPLOAD_FOLDER'], relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'%PDF-1.4 legacy')
+    old = (datetime.utcnow() - timedelta(days=2)).timestamp()
+    os.utime(path, (old, old))
+
+    with app.app_context():
+        assignment = Assignment(user_id=user_id, title='a', due_date=datetime.utcnow())
+        db.session.add(assignment)
+        db.session.flush()
+        db.session.add(AssignmentFile(
+            assignment_id=assignment.id, user_id=user_id, filename=os.path.basename(path),
+            file_path=path, file_size=15
+        ))
+        db.session.commit()
+    return path
+
+
+def test_referenced_legacy_file_under_dotdot_upload_folder_is_kept(make_app, tmp_path):
+    # 与默认配置相同形式的路径: <app目录>/../uploads
+    (tmp_path / 'app').mkdir()
+    app = make_app(UPLOAD_FOLDER=os.path.join(str(tmp_path / 'app'), '../uploads'))
+    with app.app_context():
+        from app.models import User
+        user = User(username='u', email='u@example.com')
+        user.set_password('secret123')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    kept = _legacy_file(app, user_id, 'assignments/1/x.pdf')
+    orphan = os.path.join(app.config['UPLOAD_FOLDER'], 'assignments/1/orphan.pdf')
+    with open(orphan, 'wb') as f:
+        f.write(b'orphan')
+    old = (datetime.utcnow() - timedelta(days=2)).timestamp()
+    os.utime(orphan, (old, old))
+
+    with app.app_context():
+        report = file_gc.reconcile_upload_folder(clean=True)
+        assert [o['path'] for o in report['orphans']] == [os.path.abspath(orphan)]
+
+        # 直接排队一个被引用的路径，清理任务仍须保留
+        db.session.add(FileTombstone(path=os.path.abspath(kept), reason='orphan'))
+        db.session.commit()
+        assert file_gc.is_referenced(os.path.abspath(kept))
+        file_gc.sweep_deleted_files()
+
+    assert os.path.exists(kept)
+    assert not os.path.exists(orphan)
+
+
+def test_orphan_blob_reuploaded_before_sweep_is_kept(make_app, make_user, tmp_path):
+    (tmp_path / 'app').mkdir()
+    app = make_app(UPLOAD_FOLDER=os.path.join(str(tmp_path / 'app'), '../uploads'), FILE_GC_GRACE_PERIOD=0)
+    _, headers = make_user()
+    client = app.test_client()
+    data = b'%PDF-1.4 orphan blob'
+
+    with app.app_context():
+        # 没有内容块记录的内容块文件（如上次回收中途失败）
+        content_hash = hashlib.sha256(data).hexdigest()
+        path = blob_store.blob_path(content_hash)
+        os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as f:
+            f.write(data)
+        report = file_gc.reconcile_upload_folder(clean=True)
+        assert report['queued_for_removal'] == 1
+        queued = FileTombstone.query.one().path
+
+    assignment = client.post('/api/assignments', json={'title': 'a', 'due_date': '2030-01-01T00:00:00'},
+                             headers=headers).get_json()
+    assignment_id = (assignment.get('assignment') or assignment)['id']
+    assert client.post(f'/api/assignments/{assignment_id}/files', data={'file': (io.BytesIO(data), 'a.pdf')},
+                       headers=headers, content_type='multipart/form-data').status_code == 201
+
+    with app.app_context():
+        # 重新上传复用了文件，排队的删除被撤销
+        assert FileTombstone.query.count() == 0
+        # 即使删除仍在排队，清理任务也按内容块记录判断为仍被引用
+        db.session.add(FileTombstone(path=queued, reason='orphan'))
+        db.session.commit()
+        assert file_gc.is_referenced(queued)
+        file_gc.sweep_deleted_files()
+        assert FileTombstone.query.count() == 0
+
+    assert os.path.exists(path)
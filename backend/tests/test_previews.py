@@ -0,0 +1,49 @@
+"""
+预览图地址：返回签名链接，不带Authorization头也能加载（用于<img src>）
+"""
+import io
+import time
+
+from PIL import Image
+
+
+def _png_bytes():
+    buffer = io.BytesIO()
+    Image.new('RGB', (300, 200), (200, 40, 40)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def _ready_file(client, headers, assignment_id):
+    """等待后台线程生成预览图"""
+    for _ in range(100):
+        files = client.get(f'/api/assignments/{assignment_id}/files', headers=headers).get_json()['files']
+        if files[0]['preview_status'] != 'pending':
+            return files[0]
+        time.sleep(0.05)
+    raise AssertionError('预览图未生成')
+
+
+def test_preview_urls_load_without_auth_header(app, make_user):
+    _, headers = make_user()
+    client = app.test_client()
+    assignment = client.post('/api/assignments', json={'title': 'a', 'due_date': '2030-01-01T00:00:00'},
+                             headers=headers).get_json()
+    assignment_id = (assignment.get('assignment') or assignment)['id']
+    resp = client.post(f'/api/assignments/{assignment_id}/files', data={'file': (io.BytesIO(_png_bytes()), 'photo.png')},
+                       headers=headers, content_type='multipart/form-data')
+    assert resp.status_code == 201
+
+    assignment_file = _ready_file(client, headers, assignment_id)
+    assert assignment_file['preview_status'] == 'ready'
+    assert set(assignment_file['previews']) == {'thumb_128', 'thumb_256', 'preview'}
+
+    for variant, url in assignment_file['previews'].items():
+        rv = client.get(url)
+        assert rv.status_code == 200, variant
+        assert rv.mimetype == 'image/webp'
+        assert Image.open(io.BytesIO(rv.data)).format == 'WEBP'
+
+    # 规格纳入签名，改成原图或其他规格都会被拒绝
+    url = assignment_file['previews']['thumb_128']
+    assert client.get(url.replace('thumb_128', 'preview')).status_code == 403
+    assert client.get(url.replace('&variant=thumb_128', '')).status_code == 403
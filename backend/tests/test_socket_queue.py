@@ -0,0 +1,102 @@
+"""
+Socket.IO消息队列：一个工作进程向房间广播的事件经由队列到达连接在另一个进程上的客户端，
+被移出小组的用户在所有进程中离开聊天室
+"""
+import threading
+import time
+
+import pytest
+import socketio
+from flask import Flask
+from flask_socketio import SocketIO, join_room
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from app.utils import membership_cache  # noqa: F401  注册移出通知的处理函数
+from app.utils.socket_queue import publish_control, socketio_options
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+@pytest.fixture
+def make_worker():
+    """启动一个独立的Flask应用和SocketIO实例（模拟一个工作进程），客户端连接后加入认证信息中的房间（默认room1）"""
+    servers = []
+
+    def make(queue_url):
+        app = Flask(__name__)
+        app.config['SOCKETIO_MESSAGE_QUEUE'] = queue_url
+        server_io = SocketIO(app, async_mode='threading', **socketio_options(app.config))
+
+        @server_io.on('connect')
+        def on_connect(auth=None):
+            for room in (auth or {}).get('rooms', ['room1']):
+                join_room(room)
+
+        server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=_QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server_io, f'http://127.0.0.1:{server.server_port}'
+
+    yield make
+    for server in servers:
+        server.shutdown()
+
+
+def _connect(url, rooms=None):
+    received = []
+    client = socketio.Client()
+    client.on('hello', received.append)
+    client.connect(url, auth={'rooms': rooms} if rooms else None, transports=['polling'])
+    return client, received
+
+
+def _wait(received, timeout=5):
+    deadline = time.time() + timeout
+    while not received and time.time() < deadline:
+        time.sleep(0.05)
+    return received
+
+
+@pytest.mark.parametrize('shared', [True, False])
+def test_room_broadcast_reaches_other_worker(tmp_path, make_worker, shared):
+    queue_url = f'sqlite:///{tmp_path}/queue.db'
+    worker_a, url_a = make_worker(queue_url if shared else None)
+    worker_b, url_b = make_worker(queue_url if shared else None)
+    client_a, received_a = _connect(url_a)
+    client_b, received_b = _connect(url_b)
+    try:
+        worker_a.emit('hello', {'from': 'a'}, to='room1')
+
+        assert _wait(received_a) == [{'from': 'a'}]
+        if shared:
+            assert _wait(received_b) == [{'from': 'a'}]
+        else:
+            # 对照：没有消息队列时另一个进程上的客户端收不到
+            assert _wait(received_b, timeout=0.5) == []
+    finally:
+        client_a.disconnect()
+        client_b.disconnect()
+
+
+def test_removed_member_leaves_group_room_on_every_worker(tmp_path, make_worker):
+    queue_url = f'sqlite:///{tmp_path}/queue.db'
+    worker_a, url_a = make_worker(queue_url)
+    worker_b, url_b = make_worker(queue_url)
+    removed_a, received_removed_a = _connect(url_a, ['user_1', 'group_7'])
+    removed_b, received_removed_b = _connect(url_b, ['user_1', 'group_7'])
+    member_b, received_member_b = _connect(url_b, ['user_2', 'group_7'])
+    try:
+        # 成员关系变更提交的进程发布移出通知，另一个进程中的连接也离开聊天室
+        publish_control(worker_a.server, 'membership_evict', {'user_id': 1, 'group_id': 7})
+        worker_a.emit('hello', {'from': 'a'}, to='group_7')
+
+        # 队列中的消息按顺序处理，其他成员收到广播时移出通知已经处理过
+        assert _wait(received_member_b) == [{'from': 'a'}]
+        assert received_removed_a == []
+        assert received_removed_b == []
+    finally:
+        for client in (removed_a, removed_b, member_b):
+            client.disconnect()
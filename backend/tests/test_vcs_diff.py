@@ -0,0 +1,70 @@
+"""
+行级差异：Myers编辑脚本、超过编辑距离上限时的回退、差异缓存和三方合并
+"""
+import random
+
+import pytest
+
+from app.utils.vcs import diff, objects
+from app.utils.vcs.merge import MergeConflict, merge3
+
+
+def _apply(old_lines, new_lines, opcodes):
+    out = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == 'equal':
+            assert old_lines[i1:i2] == new_lines[j1:j2]
+            out.extend(old_lines[i1:i2])
+        else:
+            out.extend(new_lines[j1:j2])
+    return out
+
+
+def _cost(opcodes):
+    return sum(i2 - i1 + j2 - j1 for tag, i1, i2, j1, j2 in opcodes if tag != 'equal')
+
+
+def test_opcodes_are_minimal_and_fall_back_past_the_cap():
+    rng = random.Random(38)
+    for _ in range(300):
+        old_lines = [rng.choice('abc') + '\n' for _ in range(rng.randint(0, 20))]
+        new_lines = [rng.choice('abc') + '\n' for _ in range(rng.randint(0, 20))]
+        opcodes = diff.get_opcodes(old_lines, new_lines, max_edits=100)
+        assert _apply(old_lines, new_lines, opcodes) == new_lines
+        # 超过上限时回退的结果仍然正确，但不会比最短编辑脚本更短
+        capped = diff.get_opcodes(old_lines, new_lines, max_edits=2)
+        assert _apply(old_lines, new_lines, capped) == new_lines
+        assert _cost(opcodes) <= _cost(capped)
+
+    assert diff.get_opcodes(['a\n', 'b\n', 'c\n'], ['a\n', 'x\n', 'c\n']) == [
+        ('equal', 0, 1, 0, 1), ('replace', 1, 2, 1, 2), ('equal', 2, 3, 2, 3)
+    ]
+
+    # 整个文件改写：超过上限后改用difflib，不会按编辑距离平方分配内存
+    old_lines = [f'line {i}\n' for i in range(3000)]
+    new_lines = [f'changed {i}\n' for i in range(3000)]
+    assert diff.get_opcodes(old_lines, new_lines, max_edits=50) == [('replace', 0, 3000, 0, 3000)]
+
+
+def test_diff_cache_renders_each_path(app):
+    with app.app_context():
+        before = objects.store_text('one\ntwo\n')
+        after = objects.store_text('one\nthree\n')
+        entry = {'kind': 'text', 'size': 8}
+
+        first = diff.diff_entries('one.txt', dict(entry, hash=before), dict(entry, hash=after))
+        second = diff.diff_entries('two.txt', dict(entry, hash=before), dict(entry, hash=after))
+
+        assert first['diff'].startswith('--- a/one.txt\n+++ b/one.txt\n')
+        assert second['diff'].startswith('--- a/two.txt\n+++ b/two.txt\n')
+        assert (second['additions'], second['deletions']) == (1, 1)
+
+
+def test_merge3_combines_disjoint_edits_and_reports_conflicts():
+    base = 'a\nb\nc\nd\n'
+    assert merge3(base, 'A\nb\nc\nd\n', 'a\nb\nc\nD\n') == 'A\nb\nc\nD\n'
+
+    with pytest.raises(MergeConflict) as excinfo:
+        merge3(base, 'a\nB\nc\nd\n', 'a\nX\nc\nd\n')
+    assert excinfo.value.conflicts[0]['ours'] == ['B']
+    assert excinfo.value.conflicts[0]['theirs'] == ['X']
@@ -0,0 +1,75 @@
+"""
+版本快照回收：项目删除后释放二进制历史版本的内容块引用，提交数量不受SQL参数个数限制
+"""
+import io
+import os
+import sqlite3
+
+from sqlalchemy import event, insert
+
+from app.models import db, Blob, Commit, SnapshotBlob
+from app.utils import blob_store, file_gc, vcs
+
+
+def _project(client, headers):
+    group = client.post('/api/groups', json={'name': 'g'}, headers=headers).get_json()
+    group_id = (group.get('group') or group)['id']
+    project = client.post(f'/api/projects/groups/{group_id}/projects', json={'name': 'p'}, headers=headers).get_json()
+    return (project.get('project') or project)['id']
+
+
+def test_deleted_project_binary_history_is_released(app, make_user):
+    app.config['FILE_GC_GRACE_PERIOD'] = 0
+    _, headers = make_user()
+    client = app.test_client()
+    project_id = _project(client, headers)
+
+    data = os.urandom(4096)
+    response = client.post(f'/api/projects/{project_id}/files', data={
+        'filename': 'image.bin', 'file': (io.BytesIO(data), 'image.bin')
+    }, headers=headers, content_type='multipart/form-data')
+    assert response.status_code == 201
+    content_hash = response.get_json()['file']['blob_hash']
+    assert client.post(f'/api/projects/{project_id}/commits', json={'message': 'add'}, headers=headers).status_code == 201
+
+    with app.app_context():
+        # 提交仍在时快照不回收
+        assert vcs.collect_unreachable()['blobs'] == 0
+        assert db.session.get(Blob, content_hash).ref_count == 2
+
+    assert client.delete(f'/api/projects/{project_id}', headers=headers).status_code == 200
+
+    with app.app_context():
+        assert vcs.collect_unreachable() == {'trees': 1, 'blobs': 1, 'texts': 0}
+        assert db.session.get(SnapshotBlob, content_hash) is None
+        assert db.session.get(Blob, content_hash).ref_count == 0
+        path = blob_store.blob_path(content_hash)
+        file_gc.sweep_deleted_files()
+        assert db.session.get(Blob, content_hash) is None
+    assert not os.path.exists(path)
+
+
+def test_collect_handles_more_commits_than_bound_parameters(app, make_user):
+    user_id, headers = make_user()
+    project_id = _project(app.test_client(), headers)
+
+    def limit_variables(dbapi_connection, connection_record):
+        # 3.32之前SQLite的默认上限，本机编译的上限更高
+        dbapi_connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+
+    with app.app_context():
+        event.listen(db.engine, 'connect', limit_variables)
+        db.engine.dispose()
+        try:
+            tree_hash = vcs.write_tree([])
+            db.session.execute(insert(Commit), [
+                {'project_id': project_id, 'committer_id': user_id, 'message': 'm',
+                 'hash': f'{i:064x}', 'tree_hash': tree_hash if i == 0 else f'{i:064x}'}
+                for i in range(1500)
+            ])
+            db.session.commit()
+            assert vcs.collect_unreachable() == {'trees': 0, 'blobs': 0, 'texts': 0}
+        finally:
+            db.session.remove()
+            event.remove(db.engine, 'connect', limit_variables)
+            db.engine.dispose()
@@ -6,7 +6,7 @@ import { analyzeFile, extractFileText } from '../services/ai';
 import type { FileAnalysisResult } from '../services/ai';
 import { getGroups } from '../services/groups';
 import { getProjects } from '../services/projects';
-import { getProjectCommits, getProjectFile } from '../services/projects';
+import { getProjectCommits, getCommitFileContent } from '../services/projects';
 import type { Group, Project, Commit, FileChange } from '../types';
 
 const FileAnalyzer = () => {
@@ -97,17 +97,23 @@ const FileAnalyzer = () => {
   }, [selectedProject]);
 
   // 从提交历史选择文件
-  const handleSelectCommitFile = async (fileChange: FileChange) => {
+  const handleSelectCommitFile = async (commit: Commit, fileChange: FileChange) => {
     if (!selectedProject) return;
+    const filename = fileChange.filename || fileChange.file?.filename;
+    if (!filename || fileChange.change_type === 'delete') {
+      setError('该文件在此提交中已删除');
+      return;
+    }
     try {
       setLoading(true);
       setError(null);
       
-      const fileData = await getProjectFile(selectedProject.id, fileChange.file_id);
-      if (fileData.content) {
-        setContent(fileData.content);
+      // 读取该提交时的文件版本
+      const content = await getCommitFileContent(selectedProject.id, commit.hash, filename);
+      if (content) {
+        setContent(content);
         // 根据文件名判断类型
-        const ext = fileData.filename?.split('.').pop()?.toLowerCase() || 'text';
+        const ext = filename.split('.').pop()?.toLowerCase() || 'text';
         setFileType(ext === 'md' ? 'text' : ext === 'py' || ext === 'js' || ext === 'ts' ? 'code' : 'text');
         setShowCommitSelector(false);
       } else {
@@ -273,11 +279,11 @@ const FileAnalyzer = () => {
                               {commit.file_changes.map(fileChange => (
                                 <button
                                   key={fileChange.id}
-                                  onClick={() => handleSelectCommitFile(fileChange)}
+                                  onClick={() => handleSelectCommitFile(commit, fileChange)}
                                   className="w-full text-left px-2 py-1 text-xs text-indigo-600 hover:bg-indigo-50 rounded flex items-center justify-between"
                                 >
                                   <span>
-                                    {fileChange.file?.filename || `文件 #${fileChange.file_id}`}
+                                    {fileChange.filename || fileChange.file?.filename || `文件 #${fileChange.file_id}`}
                                     <span className="ml-2 text-gray-500">
                                       ({fileChange.change_type === 'add' ? '新增' : fileChange.change_type === 'modify' ? '修改' : '删除'})
                                     </span>
@@ -11,6 +11,8 @@ import {
   deleteProjectFile,
   getProjectCommits,
   createCommit,
+  getCommitFileContent,
+  downloadCommitArchive,
 } from '../services/projects';
 import { useAuth } from '../contexts/AuthContext';
 import type { Group, Project, ProjectFile, Commit } from '../types';
@@ -219,7 +221,8 @@ const GroupDetail = ({ group, onClose }: GroupDetailProps) => {
       const updated = await updateProjectFile(
         selectedProject.id,
         editingFile.id,
-        fileFormData
+        fileFormData,
+        editingFile.version
       );
       setProjectFiles(projectFiles.map(f => f.id === updated.id ? updated : f));
       setShowFileForm(false);
@@ -247,13 +250,20 @@ const GroupDetail = ({ group, onClose }: GroupDetailProps) => {
   };
 
   // 打开文件编辑表单
-  const openEditFile = (file: ProjectFile) => {
-    setEditingFile(file);
-    setFileFormData({
-      filename: file.filename,
-      content: file.content || '',
-    });
-    setShowFileForm(true);
+  const openEditFile = async (file: ProjectFile) => {
+    if (!selectedProject) return;
+    try {
+      // 文件列表不包含内容，编辑前单独获取
+      const fullFile = await getProjectFile(selectedProject.id, file.id);
+      setEditingFile(fullFile);
+      setFileFormData({
+        filename: fullFile.filename,
+        content: fullFile.content || '',
+      });
+      setShowFileForm(true);
+    } catch (err: any) {
+      setError(err.response?.data?.error || '加载文件失败');
+    }
   };
 
   // 下载文件
@@ -286,21 +296,32 @@ const GroupDetail = ({ group, onClose }: GroupDetailProps) => {
     }
   };
 
+  // 下载提交时的项目归档
+  const handleDownloadArchive = async (commit: Commit) => {
+    if (!selectedProject) return;
+    try {
+      const blob = await downloadCommitArchive(selectedProject.id, commit.hash);
+      const url = window.URL.createObjectURL(blob);
+      const link = document.createElement('a');
+      link.href = url;
+      link.download = `${selectedProject.name}-${commit.hash.substring(0, 8)}.tar.gz`;
+      document.body.appendChild(link);
+      link.click();
+      document.body.removeChild(link);
+      window.URL.revokeObjectURL(url);
+    } catch (err: any) {
+      setError('归档下载失败: ' + (err.message || '未知错误'));
+    }
+  };
+
   // 创建提交
   const handleCreateCommit = async (e: React.FormEvent) => {
     e.preventDefault();
     if (!selectedProject) return;
     try {
-      // 获取所有修改的文件
-      const fileChanges = projectFiles.map(file => ({
-        file_id: file.id,
-        change_type: 'modify' as const,
-        diff_content: `更新了文件 ${file.filename}`,
-      }));
-      
-      const newCommit = await createCommit(selectedProject.id, {
+      // 文件变更由服务器根据项目文件快照生成
+      await createCommit(selectedProject.id, {
         message: commitFormData.message,
-        file_changes: fileChanges,
       });
       
       // 刷新提交历史
@@ -566,18 +587,21 @@ const GroupDetail = ({ group, onClose }: GroupDetailProps) => {
                                                 : 'bg-blue-100 text-blue-700'
                                             }`}
                                           >
-                                            {fc.file?.filename || `文件 ${fc.file_id}`}
+                                            {fc.filename || fc.file?.filename || `文件 ${fc.file_id}`}
                                           </span>
-                                          {fc.file && fc.change_type !== 'delete' && (
+                                          {fc.diff_status === 'text' && (
+                                            <span className="text-xs">
+                                              <span className="text-green-600">+{fc.additions}</span>{' '}
+                                              <span className="text-red-600">-{fc.deletions}</span>
+                                            </span>
+                                          )}
+                                          {fc.filename && fc.change_type !== 'delete' && fc.diff_status !== 'binary' && (
                                             <button
-                                              onClick={() => {
-                                                if (fc.file?.content) {
-                                                  handleDownloadFile(
-                                                    fc.file.content,
-                                                    fc.file.filename,
-                                                    fc.file.file_type
-                                                  );
-                                                }
+                                              onClick={async () => {
+                                                // 下载该提交时的文件版本
+                                                if (!selectedProject || !fc.filename) return;
+                                                const content = await getCommitFileContent(selectedProject.id, commit.hash, fc.filename);
+                                                handleDownloadFile(content, fc.filename);
                                               }}
                                               className="text-green-600 hover:text-green-800 text-xs"
                                               title="下载"
@@ -591,15 +615,24 @@ const GroupDetail = ({ group, onClose }: GroupDetailProps) => {
                                   </div>
                                 )}
                               </div>
-                              <span className="text-xs text-gray-500 ml-2">
-                                {new Date(commit.created_at).toLocaleString('zh-CN', { 
-                                  year: 'numeric',
-                                  month: '2-digit',
-                                  day: '2-digit',
-                                  hour: '2-digit',
-                                  minute: '2-digit'
-                                })}
-                              </span>
+                              <div className="flex flex-col items-end ml-2">
+                                <span className="text-xs text-gray-500">
+                                  {new Date(commit.created_at).toLocaleString('zh-CN', { 
+                                    year: 'numeric',
+                                    month: '2-digit',
+                                    day: '2-digit',
+                                    hour: '2-digit',
+                                    minute: '2-digit'
+                                  })}
+                                </span>
+                                <button
+                                  onClick={() => handleDownloadArchive(commit)}
+                                  className="text-green-600 hover:text-green-800 text-xs mt-1"
+                                  title="下载该版本的全部文件"
+                                >
+                                  📦 归档
+                                </button>
+                              </div>
                             </div>
                           </div>
                         ))}
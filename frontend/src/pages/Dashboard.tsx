@@ -13,7 +13,8 @@ import AIChatApp from '../components/AIChatApp';
 import ClappingHand from '../components/ClappingHand';
 import { CardSkeleton, ListSkeleton } from '../components/Skeleton';
 import { getDashboardStats, getNotifications, markNotificationRead, generateNotifications, getOverview } from '../services/dashboard';
-import type { Notification as NotificationType, OverviewResponse } from '../services/dashboard';
+import type { Notification as NotificationType, NotificationPushEvent, OverviewResponse } from '../services/dashboard';
+import { connectSocket } from '../services/socket';
 
 const Dashboard = () => {
   const { user, logout } = useAuth();
@@ -133,7 +134,7 @@ const Dashboard = () => {
     loadStats();
   }, []);
 
-  // 加载消息提醒
+  // 加载消息提醒：首次加载读取列表，之后的新提醒和未读数由服务端实时推送
   useEffect(() => {
     const loadNotifications = async () => {
       setLoadingNotifications(true);
@@ -155,9 +156,31 @@ const Dashboard = () => {
     };
     
     loadNotifications();
-    // 每30秒刷新一次消息提醒
-    const interval = setInterval(loadNotifications, 30000);
-    return () => clearInterval(interval);
+
+    const socket = connectSocket();
+    socket.on('notification', (data: NotificationPushEvent) => {
+      // 按ID去重（首次加载与推送可能重叠）
+      setNotifications(prev => [
+        data.notification,
+        ...prev.filter(n => n.id !== data.notification.id),
+      ].slice(0, 10));
+      setUnreadCount(data.unread_count);
+    });
+    socket.on('notification_count', (data: { unread_count: number }) => {
+      setUnreadCount(data.unread_count);
+    });
+    // 断线期间的推送会丢失，重连后重新读取一次列表
+    socket.io.on('reconnect', () => {
+      getNotifications({ limit: 10 }).then(result => {
+        if (result.success && result.notifications) {
+          setNotifications(result.notifications);
+          setUnreadCount(result.unread_count || 0);
+        }
+      });
+    });
+    return () => {
+      socket.disconnect();
+    };
   }, []);
 
   // 标记消息为已读
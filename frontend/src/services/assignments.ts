@@ -117,3 +117,23 @@ export const downloadAssignmentFile = async (
   return response.data;
 };
 
+
+export interface SignedFileUrl {
+  file_id: number;
+  url: string;
+  expires_at: number | null;
+}
+
+/**
+ * 批量获取作业文件的短期签名链接（可直接用于img src，无需携带登录凭证）
+ */
+export const getSignedFileUrls = async (
+  fileIds: number[],
+  asAttachment = false
+): Promise<SignedFileUrl[]> => {
+  const response = await api.post('/assignments/files/signed-urls', {
+    file_ids: fileIds,
+    as_attachment: asAttachment,
+  });
+  return response.data.urls;
+};
@@ -67,6 +67,12 @@ export interface Notification {
   created_at: string;
 }
 
+// 新提醒推送（socket事件notification）
+export interface NotificationPushEvent {
+  notification: Notification;
+  unread_count: number;
+}
+
 export interface NotificationsResponse {
   success: boolean;
   notifications?: Notification[];
@@ -1,5 +1,5 @@
 import api from './api';
-import type { Project, ProjectFile, Commit } from '../types';
+import type { Project, ProjectFile, Commit, FileBlame, FileDiff, SnapshotEntry } from '../types';
 
 /**
  * 获取小组的所有项目
@@ -92,9 +92,12 @@ export const updateProjectFile = async (
   fileData: {
     content?: string;
     filename?: string;
-  }
+  },
+  version?: number
 ): Promise<ProjectFile> => {
-  const response = await api.put(`/projects/${projectId}/files/${fileId}`, fileData);
+  // 带上编辑时的版本，已被他人修改时由服务器合并或返回409冲突
+  const headers = version ? { 'If-Match': `"v${version}"` } : undefined;
+  const response = await api.put(`/projects/${projectId}/files/${fileId}`, fileData, { headers });
   return response.data.file;
 };
 
@@ -106,11 +109,44 @@ export const deleteProjectFile = async (projectId: number, fileId: number): Prom
 };
 
 /**
- * 获取项目提交历史
+ * 获取项目提交历史（最新的一页）
  */
 export const getProjectCommits = async (projectId: number): Promise<Commit[]> => {
-  const response = await api.get(`/projects/${projectId}/commits`);
-  return response.data.commits;
+  const page = await getProjectCommitPage(projectId);
+  return page.commits;
+};
+
+/**
+ * 分页获取项目提交历史（不含差异内容）
+ */
+export const getProjectCommitPage = async (
+  projectId: number,
+  cursor?: number | null,
+  limit: number = 50
+): Promise<{ commits: Commit[]; next_cursor: number | null }> => {
+  const response = await api.get(`/projects/${projectId}/commits`, {
+    params: { limit, ...(cursor ? { cursor } : {}) },
+  });
+  return response.data;
+};
+
+/**
+ * 获取单个提交的详细信息（包括差异）
+ */
+export const getCommitDetail = async (projectId: number, ref: string): Promise<Commit> => {
+  const response = await api.get(`/projects/${projectId}/commits/${ref}`);
+  return response.data.commit;
+};
+
+/**
+ * 下载某个提交时项目的tar.gz归档
+ */
+export const downloadCommitArchive = async (projectId: number, ref: string): Promise<Blob> => {
+  const response = await api.get(`/projects/${projectId}/archive`, {
+    params: { commit: ref },
+    responseType: 'blob',
+  });
+  return response.data;
 };
 
 /**
@@ -120,14 +156,57 @@ export const createCommit = async (
   projectId: number,
   commitData: {
     message: string;
-    file_changes?: Array<{
-      file_id: number;
-      change_type: 'add' | 'modify' | 'delete';
-      diff_content?: string;
-    }>;
   }
 ): Promise<Commit> => {
   const response = await api.post(`/projects/${projectId}/commits`, commitData);
   return response.data.commit;
 };
 
+/**
+ * 获取某个提交时的文件列表
+ */
+export const getCommitTree = async (projectId: number, ref: string): Promise<SnapshotEntry[]> => {
+  const response = await api.get(`/projects/${projectId}/commits/${ref}/tree`);
+  return response.data.entries;
+};
+
+/**
+ * 获取某个提交时的文本文件内容
+ */
+export const getCommitFileContent = async (projectId: number, ref: string, path: string): Promise<string> => {
+  const response = await api.get(`/projects/${projectId}/commits/${ref}/file`, { params: { path } });
+  return response.data.content;
+};
+
+/**
+ * 获取提交相对于父提交的文件差异
+ */
+export const getCommitDiff = async (
+  projectId: number,
+  ref: string,
+  options: { path?: string; context?: number } = {}
+): Promise<FileDiff[]> => {
+  const response = await api.get(`/projects/${projectId}/commits/${ref}/diff`, { params: options });
+  return response.data.files;
+};
+
+/**
+ * 获取文件在某个提交时每一行的来源（ref为HEAD时查询最新版本）
+ */
+export const getFileBlame = async (projectId: number, ref: string, path: string): Promise<FileBlame> => {
+  const response = await api.get(`/projects/${projectId}/commits/${ref}/blame`, { params: { path } });
+  return response.data.blame;
+};
+
+/**
+ * 把项目文件恢复为某个提交时的内容
+ */
+export const restoreCommit = async (
+  projectId: number,
+  ref: string,
+  options: { paths?: string[]; commit_message?: string } = {}
+): Promise<{ restored: string[]; created: string[]; deleted: string[] }> => {
+  const response = await api.post(`/projects/${projectId}/commits/${ref}/restore`, options);
+  return response.data.result;
+};
+
@@ -0,0 +1,15 @@
+import { io, Socket } from 'socket.io-client';
+
+// Socket.IO服务地址（与API同源，去掉/api前缀）
+const SOCKET_URL = (import.meta.env.VITE_API_BASE_URL || 'http://localhost:5000/api').replace(/\/api\/?$/, '');
+
+/**
+ * 建立Socket.IO连接
+ * 连接时携带登录token（服务端在connect时验证），每次（重）连都读取最新的token
+ */
+export const connectSocket = (): Socket => {
+  return io(SOCKET_URL, {
+    auth: (cb) => cb({ token: localStorage.getItem('token') }),
+    transports: ['websocket', 'polling'],
+  });
+};
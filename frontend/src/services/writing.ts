@@ -22,6 +22,7 @@ export interface WritingItem {
   position_y: number;
   width: number;
   height: number;
+  version: number;
   created_at: string;
   updated_at: string;
 }
@@ -142,9 +143,11 @@ export const updateWritingItem = async (itemId: number, updates: {
   position_y?: number;
   width?: number;
   height?: number;
-}): Promise<{ success: boolean; item?: WritingItem; error?: string }> => {
+}, version?: number): Promise<{ success: boolean; item?: WritingItem; merged?: boolean; error?: string }> => {
   try {
-    const response = await api.put(`/writing/items/${itemId}`, updates);
+    // 带上编辑时的版本，已被修改时由服务器合并或返回409冲突
+    const headers = version ? { 'If-Match': `"v${version}"` } : undefined;
+    const response = await api.put(`/writing/items/${itemId}`, updates, { headers });
     return response.data;
   } catch (error: any) {
     console.error('更新项目失败:', error);
@@ -30,6 +30,9 @@ export interface AssignmentFile {
   file_size: number;
   file_type?: string;
   file_category?: 'image' | 'document' | 'other';
+  content_hash?: string | null;
+  preview_status?: 'pending' | 'ready' | 'failed' | null;
+  previews?: Record<string, string> | null; // 规格名（thumb_128、thumb_256、preview）到地址的映射
   created_at: string;
 }
 
@@ -108,6 +111,7 @@ export interface Project {
   updated_at?: string;
   file_count?: number;
   commit_count?: number;
+  head_commit_hash?: string | null;
 }
 
 // 项目文件类型
@@ -119,6 +123,8 @@ export interface ProjectFile {
   file_path?: string;
   file_type?: string;
   file_size?: number;
+  content_hash?: string | null;
+  version?: number;
   creator_id: number;
   created_at: string;
   updated_at?: string;
@@ -131,24 +137,69 @@ export interface Commit {
   committer_id: number;
   message: string;
   hash: string;
+  parent_hash?: string | null;
+  tree_hash?: string | null;
   created_at: string;
   committer?: User;
   file_changes?: FileChange[];
+  stats?: { files: number; additions: number; deletions: number };
 }
 
 // 文件变更类型
 export interface FileChange {
   id: number;
   commit_id: number;
-  file_id: number;
+  file_id: number | null;
+  filename?: string;
   change_type: 'add' | 'modify' | 'delete';
-  diff_content?: string;
+  old_hash?: string | null;
+  new_hash?: string | null;
+  diff_status?: 'text' | 'binary' | 'too_large' | null;
+  diff_content?: string | null;
+  additions?: number | null;
+  deletions?: number | null;
   file?: ProjectFile;
 }
 
+// 提交时的文件快照条目
+export interface SnapshotEntry {
+  path: string;
+  hash: string;
+  size: number;
+  kind: 'text' | 'binary';
+  file_type?: string;
+}
+
+// 提交中单个文件的差异
+export interface FileDiff {
+  filename: string;
+  change_type: 'add' | 'modify' | 'delete';
+  old_hash?: string | null;
+  new_hash?: string | null;
+  status?: 'text' | 'binary' | 'too_large' | null;
+  diff?: string | null;
+  additions?: number | null;
+  deletions?: number | null;
+}
+
+// 文件逐行来源
+export interface FileBlame {
+  path: string;
+  content_hash: string;
+  line_count: number;
+  lines: string[];
+  ranges: Array<{ start: number; end: number; commit_id: number }>;
+  commits: Record<string, {
+    hash: string;
+    message: string;
+    created_at: string | null;
+    committer: { id: number; username: string | null };
+  }>;
+}
+
 // 消息类型
 export interface Message {
-  id: number;
+  id: string; // 雪花ID，超过Number.MAX_SAFE_INTEGER，以字符串传输
   group_id: number;
   sender_id: number;
   content: string;
@@ -157,3 +208,20 @@ export interface Message {
   sender?: User;
 }
 
+// 历史消息中的发送者（精简信息）
+export interface ChatSender {
+  id: number;
+  username: string;
+  avatar_url?: string | null;
+}
+
+// 消息历史分页（socket事件message_history）
+export interface MessageHistoryPage {
+  group_id: number;
+  messages: Message[];
+  senders: Record<string, ChatSender>;
+  next_cursor: string | null;
+  resync?: boolean; // 重连补发：只包含缺少的消息，按ID去重合并
+  gap?: boolean; // 缺少的消息过多，改为最新一页，与已有消息之间有缺口
+}
+